@@ -1,14 +1,136 @@
-from sqlalchemy import create_engine
+import logging
+from contextlib import contextmanager
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 import os
 
 
+logger = logging.getLogger(__name__)
+
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# Pool settings apply to each engine (sync for jobs/scripts, async for the API)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+_ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def async_database_url(url: str) -> str:
+    """Same database, async driver (postgresql:// -> postgresql+asyncpg://)"""
+    scheme, sep, rest = url.partition("://")
+    return _ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
 
-engine = create_engine(DATABASE_URL)
+def _pool_options(url: str) -> dict:
+    # SQLite uses its own single-connection pools that take no sizing
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+engine = create_engine(DATABASE_URL, **_pool_options(DATABASE_URL))
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
+async_engine = create_async_engine(async_database_url(DATABASE_URL), **_pool_options(DATABASE_URL))
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
+# Arbitrary key for the Postgres advisory lock held during schema setup
+SCHEMA_LOCK_ID = 7_201_015
+
+
+def add_missing_columns(bind=None):
+    """
+    create_all() only creates missing tables. Add nullable columns that
+    models gained since their table was created, so existing databases pick
+    them up without a migration.
+    """
+    bind = bind or engine
+    inspector = inspect(bind)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=bind.dialect)
+            try:
+                with bind.begin() as conn:
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+            except DBAPIError:
+                # Another process (without the schema lock) added it first
+                if column.name in {c["name"] for c in inspect(bind).get_columns(table.name)}:
+                    continue
+                raise
+            logger.info(f"🛠️  Added column {table.name}.{column.name}")
+
+
+@contextmanager
+def _schema_lock(bind):
+    """
+    Hold a cross-process lock while the schema is set up. Every uvicorn
+    worker imports the app at once, and create_all() checks then creates,
+    so unguarded workers fail with "table already exists". Postgres gets an
+    advisory lock (covers workers on every host); a SQLite file gets a lock
+    file beside it.
+    """
+    if bind.dialect.name == "postgresql":
+        with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": SCHEMA_LOCK_ID})
+            try:
+                yield
+            finally:
+                conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": SCHEMA_LOCK_ID})
+    elif bind.dialect.name == "sqlite" and bind.url.database not in (None, "", ":memory:"):
+        import fcntl
+        with open(f"{bind.url.database}.schema-lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    else:
+        yield
+
+
+def init_schema(bind=None):
+    """Create missing tables and columns, one process at a time"""
+    bind = bind or engine
+    with _schema_lock(bind):
+        Base.metadata.create_all(bind=bind)
+        add_missing_columns(bind)
+
+
+def get_db():
+    """FastAPI dependency: sync session for handlers that run in the threadpool"""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    """FastAPI dependency: async session for handlers on the event loop"""
+    async with AsyncSessionLocal() as db:
+        yield db
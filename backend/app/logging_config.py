@@ -0,0 +1,137 @@
+"""
+Logging Setup
+Leveled logging with per-call context (call_sid, business_id, stream_sid),
+sampling for hot-path events, and a queue-based handler so request
+handlers and the audio bridge never block on log I/O.
+"""
+import os
+import sys
+import time
+import queue
+import atexit
+import logging
+import threading
+from collections import OrderedDict
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv(
+    "LOG_FORMAT",
+    "%(asctime)s %(levelname)-7s %(name)s [call=%(call_sid)s biz=%(business_id)s stream=%(stream_sid)s] %(message)s"
+)
+# Minimum seconds between two logs of the same hot-path event
+LOG_SAMPLE_INTERVAL = float(os.getenv("LOG_SAMPLE_INTERVAL", "5"))
+# Sampling keys remembered; keys include the call, so old calls' keys age out
+LOG_SAMPLE_MAX_KEYS = int(os.getenv("LOG_SAMPLE_MAX_KEYS", "10000"))
+
+call_sid_var = ContextVar("call_sid", default="-")
+business_id_var = ContextVar("business_id", default="-")
+stream_sid_var = ContextVar("stream_sid", default="-")
+
+_listener = None
+
+
+class CallContextFilter(logging.Filter):
+    """Stamp records with the call context of the task that logged them"""
+
+    def filter(self, record):
+        record.call_sid = call_sid_var.get()
+        record.business_id = business_id_var.get()
+        record.stream_sid = stream_sid_var.get()
+        return True
+
+
+def bind_call_context(call_sid=None, business_id=None, stream_sid=None):
+    """
+    Attach call identifiers to every log record from the current task.
+
+    asyncio tasks copy the context when created, so bind before spawning
+    a call's sub-tasks.
+    """
+    if call_sid is not None:
+        call_sid_var.set(str(call_sid))
+    if business_id is not None:
+        business_id_var.set(str(business_id))
+    if stream_sid is not None:
+        stream_sid_var.set(str(stream_sid))
+
+
+class _Sampler:
+    """Per-key rate limiter that counts what it drops, keeping the most recently logged keys"""
+
+    def __init__(self, max_keys: int = None):
+        self.max_keys = max_keys or LOG_SAMPLE_MAX_KEYS
+        self._last = OrderedDict()
+        self._suppressed = {}
+        self._lock = threading.Lock()
+
+    def check(self, key, interval: float):
+        """Returns the number of suppressed events to report, or None to drop this one"""
+        now = time.monotonic()
+        with self._lock:
+            last = self._last.get(key)
+            if last is not None and now - last < interval:
+                self._suppressed[key] = self._suppressed.get(key, 0) + 1
+                return None
+            self._last[key] = now
+            self._last.move_to_end(key)
+            while len(self._last) > self.max_keys:
+                oldest, _ = self._last.popitem(last=False)
+                self._suppressed.pop(oldest, None)
+            return self._suppressed.pop(key, 0)
+
+
+_sampler = _Sampler()
+
+
+def log_sampled(logger: logging.Logger, level: int, key, msg: str, *args, interval: float = None):
+    """
+    Log a hot-path event at most once per `interval` seconds per key.
+
+    Use a key that includes the call (e.g. (stream_sid, "media")) so one
+    noisy call doesn't hide another's events.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    suppressed = _sampler.check(key, LOG_SAMPLE_INTERVAL if interval is None else interval)
+    if suppressed is None:
+        return
+    if suppressed:
+        msg = f"{msg} (+{suppressed} suppressed)"
+    logger.log(level, msg, *args)
+
+
+def setup_logging():
+    """Route all logging through a background writer thread (idempotent)"""
+    global _listener
+    if _listener is not None:
+        return
+
+    log_queue = queue.SimpleQueue()
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    # The filter runs on the logging side, where the call context is visible
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(CallContextFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(LOG_LEVEL)
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
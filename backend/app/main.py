@@ -1,3 +1,4 @@
+import logging
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
@@ -6,21 +7,38 @@ from contextlib import asynccontextmanager
 import os
 
 from app.routers import business, rag, call, stream
-from app.db import Base, engine
-from app.models import business as business_model, document  # ensure models are imported
-from app.services.business_sync import sync_all_businesses
+from app.db import async_engine, init_schema
+from app.models import business as business_model, document, ingestion, crawl  # ensure models are imported
+from app.services.business_sync import enqueue_all_business_syncs
+from app.services.rag_service import close_weaviate_client
+from app.services import jobs, business_directory, realtime_pool, cluster
+from app.logging_config import setup_logging
 
 
-Base.metadata.create_all(bind=engine)
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+init_schema()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Run business sync on startup"""
-    print("\n🚀 Starting AI Receptionist Backend...")
-    sync_all_businesses()
+    """Load the call routing table, start background workers and queue business sync"""
+    logger.info("🚀 Starting AI Receptionist Backend...")
+    business_directory.warm()
+    jobs.start()
+    # Pre-open Realtime sessions so the first caller doesn't wait on a handshake
+    realtime_pool.start()
+    cluster.start()
+    # Sync runs in the background so the server can answer webhooks right away
+    enqueue_all_business_syncs()
     yield
-    # Cleanup code can go here if needed
+    jobs.shutdown()
+    await realtime_pool.shutdown()
+    await cluster.shutdown()
+    close_weaviate_client()
+    await async_engine.dispose()
 
 
 app = FastAPI(title="AI Receptionist Backend", lifespan=lifespan)
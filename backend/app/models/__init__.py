@@ -1,5 +1,6 @@
 from app.models.business import Business
 from app.models.document import BusinessDocument
+from app.models.ingestion import IngestedChunk
+from app.models.crawl import CrawlCache
 
-__all__ = ["Business", "BusinessDocument"]
-
+__all__ = ["Business", "BusinessDocument", "IngestedChunk", "CrawlCache"]
@@ -14,4 +14,5 @@ class Business(Base):
     business_hours = Column(JSON)
     allowed_actions = Column(JSON)
     appointment_credentials = Column(JSON)
+    embedding_provider = Column(String(50))   # None = EMBEDDING_PROVIDER
 
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, JSON, Float, UniqueConstraint
+from app.db import Base
+
+
+class CrawlCache(Base):
+    """HTTP validators and links per crawled page, for conditional re-crawls"""
+    __tablename__ = "crawl_cache"
+    __table_args__ = (
+        UniqueConstraint("business_id", "url", name="uq_crawl_cache_page"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    business_id = Column(Integer, nullable=False, index=True)
+    url = Column(String(500), nullable=False)
+    etag = Column(String(500))
+    last_modified = Column(String(100))
+    links = Column(JSON)
+    fetched_at = Column(Float)
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, UniqueConstraint, Index
+from app.db import Base
+
+
+class IngestedChunk(Base):
+    """Ledger of stored chunks, keyed by content hash per business and source"""
+    __tablename__ = "ingestion_ledger"
+    __table_args__ = (
+        UniqueConstraint("business_id", "source", "content_hash", name="uq_ledger_chunk"),
+        Index("ix_ledger_business_source", "business_id", "source"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    business_id = Column(Integer, nullable=False)
+    source = Column(String(500), nullable=False)
+    content_hash = Column(String(64), nullable=False)   # sha256 of chunk text
+    vector_id = Column(String(36), nullable=False)      # Weaviate object uuid
+    document_id = Column(Integer)                       # business_documents.id
+    embedding_model = Column(String(100))
@@ -1,45 +1,60 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.schemas.business import BusinessCreate, BusinessOut
-from app.services.business_service import create_business, get_business_by_id, list_businesses
-from app.services.business_sync import sync_all_businesses
-from app.db import SessionLocal
+from app.services.business_service import (
+    create_business_async,
+    get_business_by_id_async,
+    list_businesses_async,
+)
+from app.services.business_sync import enqueue_all_business_syncs, enqueue_business_sync
+from app.services import jobs
+from app.db import get_async_db
 
 
 router = APIRouter(prefix="/business", tags=["Business"])
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 @router.post("/create", response_model=BusinessOut)
-def create_business_route(data: BusinessCreate, db: Session = Depends(get_db)):
-    return create_business(db, data)
+async def create_business_route(data: BusinessCreate, db: AsyncSession = Depends(get_async_db)):
+    return await create_business_async(db, data)
 
 
 @router.get("/{business_id}", response_model=BusinessOut)
-def get_business_route(business_id: int, db: Session = Depends(get_db)):
-    return get_business_by_id(db, business_id)
+async def get_business_route(business_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await get_business_by_id_async(db, business_id)
 
 
 @router.get("/", response_model=list[BusinessOut])
-def list_businesses_route(db: Session = Depends(get_db)):
-    return list_businesses(db)
+async def list_businesses_route(db: AsyncSession = Depends(get_async_db)):
+    return await list_businesses_async(db)
 
 
-@router.post("/sync")
+@router.post("/sync", status_code=202)
 def sync_businesses_route():
-    """Manually trigger sync of all businesses from files to database"""
-    try:
-        sync_all_businesses()
-        return {"message": "Business sync completed"}
-    except Exception as e:
-        import traceback
-        error_details = traceback.format_exc()
-        return {"error": str(e), "details": error_details}, 500
+    """Queue a background sync of all businesses from files to database"""
+    queued = enqueue_all_business_syncs()
+    return {"jobs": [job.to_dict() for job in queued]}
+
+
+@router.get("/sync/jobs")
+def list_sync_jobs_route():
+    """Status and progress of recent business sync jobs"""
+    return {"jobs": [job.to_dict() for job in jobs.list_jobs("business_sync")]}
+
+
+@router.get("/sync/jobs/{job_id}")
+def get_sync_job_route(job_id: str):
+    job = jobs.get_job(job_id)
+    if not job or job.kind != "business_sync":
+        raise HTTPException(status_code=404, detail="Sync job not found")
+    return job.to_dict()
+
+
+@router.post("/sync/{folder_name}", status_code=202)
+def sync_business_route(folder_name: str):
+    """Queue a background sync for a single business folder"""
+    job = enqueue_business_sync(folder_name)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Business folder '{folder_name}' not found")
+    return job.to_dict()
@@ -1,13 +1,16 @@
-from fastapi import APIRouter, Request, Depends, HTTPException
+from fastapi import APIRouter, Request, HTTPException
 from fastapi.responses import Response
-from sqlalchemy.orm import Session
 from twilio.request_validator import RequestValidator
 from twilio.rest import Client
-from app.db import SessionLocal
-from app.services.business_service import get_business_by_phone
+from app.services import admission, business_directory, inbound_vad, playback, rag_prefetch, realtime_pool
+from xml.sax.saxutils import escape
+from app.logging_config import bind_call_context
 import os
+import logging
 
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/call", tags=["Calls"])
 
 
@@ -18,17 +21,31 @@ ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
 validator = RequestValidator(AUTH_TOKEN)
 client = Client(ACCOUNT_SID, AUTH_TOKEN)
 
+# What overflow callers get when the worker or business is at capacity:
+# "forward" dials the business's forwarding_number (voicemail if it has none),
+# "voicemail" always records a message
+CALL_OVERFLOW_ACTION = os.getenv("CALL_OVERFLOW_ACTION", "forward")
+VOICEMAIL_MAX_LENGTH = int(os.getenv("VOICEMAIL_MAX_LENGTH", "120"))
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+
+def overflow_twiml(business, api_url: str) -> str:
+    """TwiML for a call that can't get an AI receptionist right now"""
+    if CALL_OVERFLOW_ACTION == "forward" and business.forwarding_number:
+        return f"""<?xml version="1.0" encoding="UTF-8"?>
+<Response>
+    <Say>Please hold while we connect you.</Say>
+    <Dial>{escape(business.forwarding_number)}</Dial>
+</Response>"""
+
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<Response>
+    <Say>Thanks for calling {escape(business.name or 'us')}. All of our lines are busy right now. Please leave a message after the tone.</Say>
+    <Record maxLength="{VOICEMAIL_MAX_LENGTH}" playBeep="true" recordingStatusCallback="{api_url}/call/recording-status" />
+</Response>"""
 
 
 @router.post("/inbound")
-async def inbound_call(request: Request, db: Session = Depends(get_db)):
+async def inbound_call(request: Request):
     """
     Handle incoming phone calls from Twilio.
     """
@@ -56,20 +73,17 @@ async def inbound_call(request: Request, db: Session = Depends(get_db)):
     if not to_number:
         raise HTTPException(status_code=400, detail="Missing 'To' number")
 
-    # Clean number format
-    to_number = to_number.strip()
-    
-    # Normalize phone number: add + if missing
-    if to_number and not to_number.startswith('+'):
-        to_number = '+' + to_number
+    # Normalize phone number ('+' can arrive decoded as a space)
+    to_number = business_directory.normalize_phone(to_number)
     
-    print(f"📞 Inbound call: To={to_number}, From={from_number}, CallSid={call_sid}")
+    bind_call_context(call_sid=call_sid)
+    logger.info("📞 Inbound call: To=%s, From=%s", to_number, from_number)
 
     # --------------------------
-    # 3. Find business by phone number
+    # 3. Find business by phone number (in-memory routing table)
     # --------------------------
-    business = get_business_by_phone(db, to_number)
-    print(f"🔍 Business lookup result: {business}")
+    business = await business_directory.resolve_by_phone(to_number)
+    logger.debug("🔍 Business lookup result: %s", business.id if business else None)
 
     if not business:
         twiml = """<?xml version="1.0" encoding="UTF-8"?>
@@ -78,12 +92,19 @@ async def inbound_call(request: Request, db: Session = Depends(get_db)):
 </Response>"""
         return Response(content=twiml, media_type="application/xml")
 
+    api_url = os.getenv('API_URL')
+
+    # --------------------------
+    # 4. Admission control: reserve a bridge slot or fall back
+    # --------------------------
+    if not await admission.admit(call_sid, business.id):
+        return Response(content=overflow_twiml(business, api_url), media_type="application/xml")
+
     # --------------------------
-    # 4. Return TwiML for media streaming
+    # 5. Return TwiML for media streaming
     # --------------------------
     # Twilio will stream audio to /call/stream
     # Convert HTTPS to WSS for WebSocket
-    api_url = os.getenv('API_URL')
     # Extract base URL (remove any path components)
     from urllib.parse import urlparse, urlunparse
     parsed_url = urlparse(api_url)
@@ -91,8 +112,7 @@ async def inbound_call(request: Request, db: Session = Depends(get_db)):
     ws_url = base_url.replace('https://', 'wss://').replace('http://', 'ws://')
     stream_url = f"{ws_url}/call/stream"
     
-    print(f"🔗 Generated stream URL: {stream_url}")
-    print(f"   (from API_URL: {api_url})")
+    logger.debug("🔗 Generated stream URL: %s (from API_URL: %s)", stream_url, api_url)
 
     # Use <Start><Recording> TwiML to record calls with streams
     twiml = f"""<?xml version="1.0" encoding="UTF-8"?>
@@ -111,6 +131,18 @@ async def inbound_call(request: Request, db: Session = Depends(get_db)):
     return Response(content=twiml, media_type="application/xml")
 
 
+@router.get("/stats")
+async def call_stats():
+    """Admission limits, active/reserved calls (worker and cluster), warm Realtime sessions, RAG prefetches, barge-ins and inbound silence suppression"""
+    return {
+        **await admission.stats(),
+        "realtime_pool": realtime_pool.stats(),
+        "rag_prefetch": rag_prefetch.stats(),
+        "barge_in": playback.stats(),
+        "inbound_vad": inbound_vad.stats(),
+    }
+
+
 @router.post("/recording-status")
 async def recording_status(request: Request):
     """
@@ -123,10 +155,10 @@ async def recording_status(request: Request):
     try:
         form = await request.form()
         data = dict(form)
-        print("📼 Recording status callback received:", data)
+        logger.info("📼 Recording status callback received: %s", data)
     except Exception as e:
         # Log but don't fail the webhook; always return 200 to Twilio
-        print(f"⚠️ Error parsing recording status callback: {e}")
+        logger.warning("⚠️ Error parsing recording status callback: %s", e)
 
     # Twilio is fine with an empty 200 OK response
     return Response(content="", media_type="text/plain")
@@ -1,33 +1,78 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
-from app.db import SessionLocal
+from app.db import get_db
 from app.schemas.rag import RAGIngest, RAGSearch
-from app.services.rag_service import ingest_text, search_knowledge
-from app.services.crawler import crawl_website
+from app.services.rag_service import ingest_text, search_knowledge, IngestionError
+from app.services.business_sync import enqueue_website_crawl, enqueue_reembed
+from app.services import jobs, uploads
 
 
 router = APIRouter(prefix="/rag", tags=["RAG"])
 
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+JOB_KINDS = ("website_crawl", "reembed", uploads.JOB_KIND)
 
 
 @router.post("/ingest")
 def ingest_route(data: RAGIngest, db: Session = Depends(get_db)):
-    ingest_text(db, data.business_id, data.text, data.source)
-    return {"status": "ingested"}
+    try:
+        result = ingest_text(db, data.business_id, data.text, data.source)
+    except IngestionError as e:
+        raise HTTPException(
+            status_code=502,
+            detail={"error": str(e), "failures": e.failures}
+        )
+    return {"status": "ingested", "chunks": result["chunks"]}
+
+
+@router.post("/upload", status_code=202)
+async def upload_route(request: Request, business_id: int, source: str = None, filename: str = None):
+    """
+    Upload a document (txt, md, html, pdf) as multipart/form-data or as the
+    raw request body with ?filename=. Returns a job; ingestion runs in the
+    background.
+    """
+    upload = await uploads.receive_upload(request, filename)
+    return uploads.enqueue_upload(business_id, upload, source).to_dict()
+
+
+@router.post("/crawl", status_code=202)
+def crawl_route(business_id: int, url: str):
+    """Queue a crawl of the site; each page is ingested as it is fetched"""
+    job = enqueue_website_crawl(business_id, url)
+    return job.to_dict()
+
+
+@router.post("/reembed", status_code=202)
+def reembed_route(business_id: int):
+    """Queue re-embedding of the business's chunks with its current embedding provider"""
+    job = enqueue_reembed(business_id)
+    return job.to_dict()
+
+
+@router.get("/jobs")
+def list_jobs_route(business_id: int = None):
+    """Status and progress of recent crawl and upload jobs"""
+    found = [job for job in jobs.list_jobs() if job.kind in JOB_KINDS]
+    if business_id is not None:
+        found = [job for job in found if job.progress.get("business_id") == business_id]
+    return {"jobs": [job.to_dict() for job in found]}
+
+
+@router.get("/jobs/{job_id}")
+def get_job_route(job_id: str):
+    job = jobs.get_job(job_id)
+    if not job or job.kind not in JOB_KINDS:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
 
 
-@router.post("/crawl")
-def crawl_route(business_id: int, url: str, db: Session = Depends(get_db)):
-    text = crawl_website(url)
-    ingest_text(db, business_id, text, "website")
-    return {"status": "website ingested"}
+@router.delete("/jobs/{job_id}")
+def cancel_job_route(job_id: str):
+    job = jobs.get_job(job_id)
+    if not job or job.kind not in JOB_KINDS:
+        raise HTTPException(status_code=404, detail="Job not found")
+    jobs.cancel_job(job_id)
+    return job.to_dict()
 
 
 @router.post("/search")
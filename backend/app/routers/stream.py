@@ -1,76 +1,83 @@
 from fastapi import APIRouter, WebSocket, Request
 from typing import Optional
+import json
+import logging
+from app.logging_config import bind_call_context
+from app.services import admission
 from app.services.llm_realtime import handle_realtime_audio
 
-print("=" * 80, flush=True)
-print("🟢 STREAM.PY MODULE LOADED", flush=True)
-print("=" * 80, flush=True)
 
-router = APIRouter(prefix="/call", tags=["Streaming"])
+logger = logging.getLogger(__name__)
 
-print("🟢 STREAM ROUTER CREATED", flush=True)
+router = APIRouter(prefix="/call", tags=["Streaming"])
 
 
 @router.websocket("/stream")
 async def stream_audio(websocket: WebSocket):
     """
     WebSocket endpoint for Twilio Media Streams.
-    
+
     Twilio will connect directly to this WebSocket endpoint
     and stream audio bidirectionally.
     """
-    print("\n" + "="*80, flush=True)
-    print("🔵🔵🔵 WEBSOCKET HANDLER CALLED 🔵🔵🔵", flush=True)
-    print("="*80 + "\n", flush=True)
-    print("🔵 WebSocket connection attempt...", flush=True)
+    logger.debug("🔵 WebSocket connection attempt...")
     try:
-        print("🔵 Accepting WebSocket...", flush=True)
         await websocket.accept()
-        print("✅ WebSocket ACCEPTED", flush=True)
-        
+        logger.debug("✅ WebSocket accepted")
+
         # Wait for Twilio's "start" event which contains custom parameters
-        print("🔵 Waiting for Twilio start event with business_id...", flush=True)
-        import json
         business_id = 0
         stream_sid = None
-        
+        call_sid = None
+
         async for message in websocket.iter_text():
             data = json.loads(message)
             event = data.get("event")
-            print(f"📨 Received event: {event}", flush=True)
-            
+            logger.debug("📨 Received event: %s", event)
+
             if event == "start":
                 # Extract business_id from custom parameters
-                custom_params = data.get("start", {}).get("customParameters", {})
+                start = data.get("start", {})
+                custom_params = start.get("customParameters", {})
                 business_id = int(custom_params.get("business_id", 0))
-                stream_sid = data.get('start', {}).get('streamSid') or data.get('streamSid')
-                print(f"✅ Got business_id={business_id}, streamSid={stream_sid}", flush=True)
+                stream_sid = start.get('streamSid') or data.get('streamSid')
+                call_sid = start.get("callSid") or stream_sid
+                bind_call_context(
+                    call_sid=call_sid,
+                    business_id=business_id,
+                    stream_sid=stream_sid
+                )
+                logger.info("✅ Twilio stream started (business_id=%s)", business_id)
                 break
-        
+
         if business_id == 0:
-            print("❌ NO BUSINESS ID RECEIVED - REJECT", flush=True)
+            logger.warning("❌ No business_id received in start event, closing stream")
+            await websocket.close()
+            return
+
+        # Normally reserved by /call/inbound; only refused if over capacity
+        if not await admission.start_bridge(call_sid, business_id, stream_sid):
             await websocket.close()
             return
-        
-        print(f"🚀 Calling handle_realtime_audio...", flush=True)
-        await handle_realtime_audio(websocket, business_id, stream_sid)
-        print("✅ handle_realtime_audio completed", flush=True)
+
+        try:
+            await handle_realtime_audio(websocket, business_id, stream_sid)
+        finally:
+            await admission.finish_bridge(call_sid)
+        logger.info("✅ Stream finished")
     except Exception as e:
-        print(f"❌ WebSocket error: {e}", flush=True)
-        import traceback
-        traceback.print_exc()
+        logger.error("❌ WebSocket error: %s", e, exc_info=True)
 
-print("🟢 WEBSOCKET ROUTE REGISTERED", flush=True)
 
 @router.get("/stream")
 async def stream_preflight(request: Request, business_id: Optional[int] = None):
     """
-    Twilio performs a GET request to the Stream URL before 
+    Twilio performs a GET request to the Stream URL before
     establishing the WebSocket connection.
-    
+
     This MUST return 200 OK or Twilio will not proceed.
-    FastAPI automatically routes WebSocket upgrades to the 
+    FastAPI automatically routes WebSocket upgrades to the
     @router.websocket() handler above.
     """
-    print(f"🟢 Twilio preflight GET /call/stream (business_id={business_id})")
+    logger.debug("🟢 Twilio preflight GET /call/stream (business_id=%s)", business_id)
     return {"status": "ok"}
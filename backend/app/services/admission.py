@@ -0,0 +1,147 @@
+"""
+Call Admission Control
+Caps how many audio bridges run at once on this worker, overall and per
+business, so a traffic spike degrades into voicemail / forwarding for the
+overflow instead of slowing down every call.
+
+A call is admitted at /call/inbound, which reserves a slot before the
+TwiML that opens the media stream is returned. The stream claims the
+reservation when it starts and frees the slot when it ends. Reservations
+whose stream never arrives (caller hung up, stream landed on another
+worker) expire after CALL_RESERVATION_TTL seconds.
+
+All state is touched from the event loop only, so no locking is needed.
+In cluster mode the same slots are also claimed in Redis, so the limits
+hold across workers (see cluster.py).
+"""
+import logging
+import os
+import time
+from collections import Counter
+from app.services import cluster
+
+
+logger = logging.getLogger(__name__)
+
+
+MAX_ACTIVE_CALLS = int(os.getenv("MAX_ACTIVE_CALLS", "50"))
+MAX_CALLS_PER_BUSINESS = int(os.getenv("MAX_CALLS_PER_BUSINESS", "10"))
+CALL_RESERVATION_TTL = float(os.getenv("CALL_RESERVATION_TTL", "20"))
+
+_reserved = {}    # call_sid -> (business_id, expires_at)
+_active = {}      # call_sid -> business_id
+_per_business = Counter()
+_counters = Counter()
+
+
+def _expire_reservations():
+    now = time.monotonic()
+    for call_sid, (business_id, expires_at) in list(_reserved.items()):
+        if expires_at < now:
+            del _reserved[call_sid]
+            _release(business_id)
+            _counters["expired"] += 1
+
+
+def _has_capacity(business_id: int) -> bool:
+    if len(_reserved) + len(_active) >= MAX_ACTIVE_CALLS:
+        return False
+    # With shared state the per-business limit is enforced cluster-wide;
+    # counting it here too would double-count calls whose stream landed
+    # on another worker
+    if cluster.available():
+        return True
+    return _per_business[business_id] < MAX_CALLS_PER_BUSINESS
+
+
+async def admit(call_sid: str, business_id: int) -> bool:
+    """Reserve a slot for an inbound call; False means send it to the fallback"""
+    _expire_reservations()
+    if call_sid in _reserved or call_sid in _active:
+        return True
+    if not _has_capacity(business_id):
+        _counters["rejected"] += 1
+        logger.warning(
+            f"🚦 Call rejected for business {business_id}: "
+            f"{len(_reserved) + len(_active)}/{MAX_ACTIVE_CALLS} on worker, "
+            f"{_per_business[business_id]}/{MAX_CALLS_PER_BUSINESS} for business"
+        )
+        return False
+    _reserved[call_sid] = (business_id, time.monotonic() + CALL_RESERVATION_TTL)
+    _per_business[business_id] += 1
+
+    if await cluster.reserve(call_sid, business_id, CALL_RESERVATION_TTL) is False:
+        if _reserved.pop(call_sid, None) is not None:
+            _release(business_id)
+        _counters["rejected"] += 1
+        return False
+
+    _counters["admitted"] += 1
+    return True
+
+
+async def start_bridge(call_sid: str, business_id: int, stream_sid: str = None) -> bool:
+    """
+    Claim the call's slot when its media stream starts. Streams without a
+    reservation (e.g. the reservation expired) are admitted only if there
+    is capacity.
+    """
+    _expire_reservations()
+    if call_sid in _active:
+        return True
+
+    reservation = _reserved.pop(call_sid, None)
+    if reservation is not None:
+        # The reserved slot carries over, already counted for its business
+        business_id = reservation[0]
+    elif _has_capacity(business_id):
+        _per_business[business_id] += 1
+    else:
+        _counters["rejected"] += 1
+        logger.warning(f"🚦 Stream rejected for business {business_id}: no capacity")
+        return False
+
+    # Claims the cluster-wide reservation, whichever worker made it
+    if await cluster.activate(call_sid, business_id, stream_sid) is False:
+        _release(business_id)
+        _counters["rejected"] += 1
+        return False
+
+    if reservation is None:
+        _counters["admitted"] += 1
+    _active[call_sid] = business_id
+    return True
+
+
+def _release(business_id: int):
+    _per_business[business_id] -= 1
+    if _per_business[business_id] <= 0:
+        del _per_business[business_id]
+
+
+async def finish_bridge(call_sid: str):
+    business_id = _active.pop(call_sid, None)
+    if business_id is not None:
+        _release(business_id)
+        await cluster.release(call_sid, business_id)
+
+
+async def stats() -> dict:
+    _expire_reservations()
+    per_business = {}
+    for business_id in _per_business:
+        active = sum(1 for b in _active.values() if b == business_id)
+        per_business[business_id] = {"active": active, "reserved": _per_business[business_id] - active}
+    return {
+        "limits": {
+            "max_active_calls": MAX_ACTIVE_CALLS,
+            "max_calls_per_business": MAX_CALLS_PER_BUSINESS,
+        },
+        "active_calls": len(_active),
+        "reserved_calls": len(_reserved),
+        "per_business": per_business,
+        "admitted": _counters["admitted"],
+        "rejected": _counters["rejected"],
+        "expired_reservations": _counters["expired"],
+        "cluster": await cluster.stats(),
+    }
@@ -0,0 +1,171 @@
+"""
+Business Directory
+In-memory routing table of phone number -> business settings, so call setup
+(/call/inbound and the media stream) never waits on the database.
+
+The table is warmed at startup and refreshed whenever a business is created
+or synced. Entries are immutable snapshots; readers never take a lock.
+"""
+import itertools
+import logging
+import re
+import threading
+from sqlalchemy import select
+from app.db import SessionLocal, AsyncSessionLocal
+from app.models.business import Business
+from app.services import cluster, session_config
+
+
+logger = logging.getLogger(__name__)
+
+
+_PHONE_JUNK = re.compile(r"[^\d]")
+
+# Bumped for every snapshot built, so caches derived from a snapshot can
+# tell when the business changed
+_versions = itertools.count(1)
+
+
+class BusinessSnapshot:
+    """Read-only copy of the Business columns needed during a call"""
+
+    FIELDS = (
+        "id",
+        "name",
+        "phone_number",
+        "forwarding_number",
+        "tone",
+        "instructions",
+        "business_hours",
+        "allowed_actions",
+        "appointment_credentials",
+        "embedding_provider",
+    )
+    __slots__ = FIELDS + ("version",)
+
+    def __init__(self, business: Business):
+        for field in self.FIELDS:
+            object.__setattr__(self, field, getattr(business, field))
+        object.__setattr__(self, "version", next(_versions))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("BusinessSnapshot is read-only")
+
+
+_by_phone = {}
+_by_id = {}
+_write_lock = threading.Lock()
+
+
+def normalize_phone(phone: str):
+    """E.164-style key: '+' followed by digits only ('+1 (555) 010-0000' -> '+15550100000')"""
+    if not phone:
+        return None
+    digits = _PHONE_JUNK.sub("", phone)
+    return "+" + digits if digits else None
+
+
+def _publish(by_id: dict):
+    """Swap in new tables; readers see either the old or the new ones"""
+    global _by_phone, _by_id
+    by_phone = {}
+    for snapshot in by_id.values():
+        key = normalize_phone(snapshot.phone_number)
+        if key:
+            by_phone[key] = snapshot
+    _by_id = by_id
+    _by_phone = by_phone
+
+
+def warm(db=None) -> int:
+    """Load every business into the routing table"""
+    own_session = db is None
+    db = db or SessionLocal()
+    try:
+        by_id = {business.id: BusinessSnapshot(business) for business in db.query(Business).all()}
+    finally:
+        if own_session:
+            db.close()
+
+    with _write_lock:
+        _publish(by_id)
+    session_config.clear()
+    logger.info(f"📇 Business directory loaded ({len(by_id)} businesses)")
+    return len(by_id)
+
+
+def refresh_business(business: Business, publish: bool = True) -> BusinessSnapshot:
+    """
+    Add or replace one business after it was created or updated. With
+    publish, other workers are told to reload it too (cluster mode).
+    """
+    snapshot = BusinessSnapshot(business)
+    with _write_lock:
+        by_id = dict(_by_id)
+        by_id[snapshot.id] = snapshot
+        _publish(by_id)
+    session_config.invalidate(snapshot.id)
+    if publish:
+        cluster.publish_business_change(snapshot.id, snapshot.version)
+    return snapshot
+
+
+async def refresh_business_async(business: Business) -> BusinessSnapshot:
+    """refresh_business() for handlers on the event loop: publishes without blocking it"""
+    snapshot = refresh_business(business, publish=False)
+    await cluster.publish_business_change_async(snapshot.id, snapshot.version)
+    return snapshot
+
+
+def remove_business(business_id: int):
+    with _write_lock:
+        if business_id in _by_id:
+            by_id = dict(_by_id)
+            del by_id[business_id]
+            _publish(by_id)
+    session_config.invalidate(business_id)
+
+
+def get_by_phone(phone: str):
+    """O(1) lookup; None if the number isn't routed to a business"""
+    return _by_phone.get(normalize_phone(phone))
+
+
+def get_by_id(business_id: int):
+    return _by_id.get(business_id)
+
+
+async def _load_one(query):
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(query.limit(1))
+        business = result.scalars().first()
+        return refresh_business(business, publish=False) if business else None
+
+
+async def resolve_by_phone(phone: str):
+    """
+    Routing-table lookup for the call path. Only on a miss (e.g. a business
+    added by another worker) is the database consulted, asynchronously.
+    """
+    snapshot = get_by_phone(phone)
+    if snapshot is None and normalize_phone(phone):
+        raw = phone.strip()
+        snapshot = await _load_one(
+            select(Business).where(Business.phone_number.in_({raw, normalize_phone(raw)}))
+        )
+    return snapshot
+
+
+async def resolve_by_id(business_id: int):
+    snapshot = get_by_id(business_id)
+    if snapshot is None:
+        snapshot = await _load_one(select(Business).where(Business.id == business_id))
+    return snapshot
+
+
+async def reload_business(business_id: int):
+    """Re-read one business after another worker changed it"""
+    snapshot = await _load_one(select(Business).where(Business.id == business_id))
+    if snapshot is None:
+        remove_business(business_id)
+    return snapshot
@@ -1,10 +1,21 @@
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 from app.models.business import Business
 from app.schemas.business import BusinessCreate
+from app.services import business_directory, embeddings
 from fastapi import HTTPException
 
 
+def _check_embedding_provider(data: BusinessCreate):
+    if data.embedding_provider and data.embedding_provider not in embeddings.PROVIDERS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown embedding provider '{data.embedding_provider}' (one of {', '.join(embeddings.PROVIDERS)})"
+        )
+
+
 def create_business(db: Session, data: BusinessCreate):
     # Check if phone number already exists (if provided)
     if data.phone_number:
@@ -14,6 +25,7 @@ def create_business(db: Session, data: BusinessCreate):
                 status_code=400,
                 detail=f"Business with phone number {data.phone_number} already exists"
             )
+    _check_embedding_provider(data)
     
     business = Business(
         name=data.name,
@@ -23,12 +35,14 @@ def create_business(db: Session, data: BusinessCreate):
         instructions=data.instructions,
         business_hours=data.business_hours,
         allowed_actions=data.allowed_actions,
-        appointment_credentials=data.appointment_credentials
+        appointment_credentials=data.appointment_credentials,
+        embedding_provider=data.embedding_provider
     )
     try:
         db.add(business)
         db.commit()
         db.refresh(business)
+        business_directory.refresh_business(business)
         return business
     except IntegrityError as e:
         db.rollback()
@@ -49,3 +63,55 @@ def get_business_by_phone(db: Session, phone: str):
 def list_businesses(db: Session):
     return db.query(Business).all()
 
+
+
+# Async versions for handlers running on the event loop
+
+async def create_business_async(db: AsyncSession, data: BusinessCreate):
+    # Check if phone number already exists (if provided)
+    if data.phone_number:
+        existing = await get_business_by_phone_async(db, data.phone_number)
+        if existing:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Business with phone number {data.phone_number} already exists"
+            )
+    _check_embedding_provider(data)
+
+    business = Business(
+        name=data.name,
+        phone_number=data.phone_number,
+        forwarding_number=data.forwarding_number,
+        tone=data.tone,
+        instructions=data.instructions,
+        business_hours=data.business_hours,
+        allowed_actions=data.allowed_actions,
+        appointment_credentials=data.appointment_credentials,
+        embedding_provider=data.embedding_provider
+    )
+    try:
+        db.add(business)
+        await db.commit()
+        await db.refresh(business)
+        await business_directory.refresh_business_async(business)
+        return business
+    except IntegrityError as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail=f"Database integrity error: {str(e)}"
+        )
+
+
+async def get_business_by_id_async(db: AsyncSession, business_id: int):
+    return await db.get(Business, business_id)
+
+
+async def get_business_by_phone_async(db: AsyncSession, phone: str):
+    result = await db.execute(select(Business).where(Business.phone_number == phone).limit(1))
+    return result.scalars().first()
+
+
+async def list_businesses_async(db: AsyncSession):
+    result = await db.execute(select(Business))
+    return result.scalars().all()
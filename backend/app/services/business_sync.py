@@ -2,17 +2,25 @@
 Business File Sync Service
 Automatically syncs business configs from files to database on startup
 """
+import logging
 import os
+import time
 import yaml
 from pathlib import Path
 from sqlalchemy.orm import Session
 from app.models.business import Business
-from app.services.rag_service import ingest_text
-from app.services.crawler import crawl_website
+from app.models.crawl import CrawlCache
+from app.services.rag_service import sync_source, delete_source, list_sources, reembed_business, warm_search
+from app.services.crawler import iter_site_pages
+from app.services.jobs import JobCancelled
+from app.services import jobs, business_directory, crawler, embeddings
 from app.db import SessionLocal
 
 
-BUSINESSES_DIR = Path(__file__).parent.parent.parent / "businesses"
+logger = logging.getLogger(__name__)
+
+
+BUSINESSES_DIR = Path(os.getenv("BUSINESSES_DIR", Path(__file__).parent.parent.parent / "businesses"))
 
 
 def load_business_config(business_folder: Path) -> dict:
@@ -20,7 +28,7 @@ def load_business_config(business_folder: Path) -> dict:
     config_path = business_folder / "config.yaml"
     
     if not config_path.exists():
-        print(f"⚠️  No config.yaml found in {business_folder.name}")
+        logger.warning(f"⚠️  No config.yaml found in {business_folder.name}")
         return None
     
     with open(config_path, 'r') as f:
@@ -34,7 +42,7 @@ def load_prompt(business_folder: Path) -> str:
     prompt_path = business_folder / "prompt.md"
     
     if not prompt_path.exists():
-        print(f"⚠️  No prompt.md found in {business_folder.name}")
+        logger.warning(f"⚠️  No prompt.md found in {business_folder.name}")
         return ""
     
     with open(prompt_path, 'r') as f:
@@ -64,6 +72,10 @@ def load_knowledge_files(business_folder: Path) -> list:
 def sync_business_to_db(db: Session, config: dict, prompt: str) -> Business:
     """Create or update business in database"""
     
+    provider = config.get('embedding_provider')
+    if provider and provider not in embeddings.PROVIDERS:
+        raise Exception(f"Unknown embedding_provider '{provider}' (one of {', '.join(embeddings.PROVIDERS)})")
+    
     # Check if business already exists (by phone number)
     business = db.query(Business).filter(
         Business.phone_number == config['phone_number']
@@ -76,7 +88,7 @@ def sync_business_to_db(db: Session, config: dict, prompt: str) -> Business:
     
     if business:
         # Update existing
-        print(f"🔄 Updating business: {config['name']}")
+        logger.info(f"🔄 Updating business: {config['name']}")
         business.name = config['name']
         business.forwarding_number = config.get('forwarding_number')
         business.tone = config.get('tone', 'friendly')
@@ -84,9 +96,10 @@ def sync_business_to_db(db: Session, config: dict, prompt: str) -> Business:
         business.business_hours = config.get('business_hours', {})
         business.allowed_actions = config.get('allowed_actions', {})
         business.appointment_credentials = config.get('appointment_credentials', {})
+        business.embedding_provider = config.get('embedding_provider')
     else:
         # Create new
-        print(f"✨ Creating new business: {config['name']}")
+        logger.info(f"✨ Creating new business: {config['name']}")
         business = Business(
             name=config['name'],
             phone_number=config['phone_number'],
@@ -95,170 +108,335 @@ def sync_business_to_db(db: Session, config: dict, prompt: str) -> Business:
             instructions=full_instructions,
             business_hours=config.get('business_hours', {}),
             allowed_actions=config.get('allowed_actions', {}),
-            appointment_credentials=config.get('appointment_credentials', {})
+            appointment_credentials=config.get('appointment_credentials', {}),
+            embedding_provider=config.get('embedding_provider')
         )
         db.add(business)
     
     db.commit()
     db.refresh(business)
+    business_directory.refresh_business(business)
     
     return business
 
 
-def crawl_and_ingest_website(db: Session, business_id: int, website_url: str):
-    """Crawl website and ingest content into RAG system"""
-    
-    print(f"   🌐 Crawling website: {website_url}")
+def _is_weaviate_error(error_msg: str) -> bool:
+    lowered = error_msg.lower()
+    return "weaviate" in lowered or "timed out" in lowered or "connection" in lowered
+
+
+def _sync_page(db: Session, business_id: int, page, max_retries: int = 3) -> bool:
+    """Ingest one crawled page as its own source (with retry logic)"""
+    for attempt in range(1, max_retries + 1):
+        try:
+            result = sync_source(db=db, business_id=business_id, source=f"website:{page.url}", text=page.text)
+            if result['added'] or result['removed']:
+                logger.info(f"✅ {page.url} ({result['added']} new, {result['removed']} removed chunks)")
+            return True
+        except Exception as ingest_error:
+            error_msg = str(ingest_error)
+            if attempt < max_retries:
+                logger.info(f"⏳ Ingestion attempt {attempt}/{max_retries} failed, retrying... ({error_msg[:100]})")
+                time.sleep(2)  # Wait 2 seconds before retry
+            elif _is_weaviate_error(error_msg):
+                logger.warning(f"⚠️  {page.url} crawled but Weaviate ingestion skipped after {max_retries} attempts")
+                logger.info(f"💡 Error: {error_msg[:150]}")
+            else:
+                logger.warning(f"⚠️  {page.url}: ingestion error after {max_retries} attempts: {error_msg[:150]}")
+    return False
+
+
+def _load_validators(db: Session, business_id: int) -> dict:
+    return {
+        row.url: {"etag": row.etag, "last_modified": row.last_modified, "links": row.links or []}
+        for row in db.query(CrawlCache).filter(CrawlCache.business_id == business_id)
+    }
+
+
+def _remember_page(db: Session, business_id: int, page):
+    """Store the page's validators once its content is safely ingested"""
+    row = db.query(CrawlCache).filter(
+        CrawlCache.business_id == business_id,
+        CrawlCache.url == page.url
+    ).first()
+    if row is None:
+        row = CrawlCache(business_id=business_id, url=page.url)
+        db.add(row)
+    row.etag = page.etag
+    row.last_modified = page.last_modified
+    row.links = page.links
+    row.fetched_at = time.time()
+    db.commit()
+
+
+def crawl_and_ingest_website(db: Session, business_id: int, website_url: str, job=None) -> dict:
+    """
+    Crawl a website and ingest each page as its own "website:{url}" source.
+
+    Pages are ingested as they arrive. Pages that answer 304 Not Modified
+    are left as they are; pages that fail keep their previous content.
+    Sources for pages no longer reachable from the site are removed, but
+    only after a crawl that finished without errors.
+    """
+    logger.info(f"🌐 Crawling website: {website_url}")
+    summary = {"pages": 0, "ingested": 0, "not_modified": 0, "skipped": 0, "errors": 0, "removed": 0}
+    seen = set()
     
     try:
-        content = crawl_website(website_url)
-        
-        if content.startswith("ERROR"):
-            print(f"      ❌ Failed to crawl: {content}")
-            return
-        
-        # Try to ingest the crawled content (with retry logic)
-        max_retries = 3
-        ingested = False
-        for attempt in range(1, max_retries + 1):
-            try:
-                ingest_text(
-                    db=db,
-                    business_id=business_id,
-                    text=content,
-                    source=f"website:{website_url}"
-                )
-                print(f"      ✅ Website content ingested ({len(content)} characters)")
-                ingested = True
-                break
-            except Exception as ingest_error:
-                error_msg = str(ingest_error)
-                if attempt < max_retries:
-                    print(f"      ⏳ Ingestion attempt {attempt}/{max_retries} failed, retrying... ({error_msg[:100]})")
-                    import time
-                    time.sleep(2)  # Wait 2 seconds before retry
+        validators = _load_validators(db, business_id)
+        for page in iter_site_pages(website_url, validators=validators):
+            if job:
+                job.check_cancelled()
+            summary["pages"] += 1
+            seen.add(f"website:{page.url}")
+            
+            if page.status == crawler.OK:
+                if _sync_page(db, business_id, page):
+                    summary["ingested"] += 1
+                    _remember_page(db, business_id, page)
                 else:
-                    # Final attempt failed
-                    if "Weaviate" in error_msg or "weaviate" in error_msg or "timed out" in error_msg.lower() or "connection" in error_msg.lower():
-                        print(f"      ⚠️  Website crawled successfully but Weaviate ingestion skipped after {max_retries} attempts")
-                        print(f"      💡 Error: {error_msg[:150]}")
-                        print(f"      💡 Content will be available via RAG after Weaviate connection is restored")
-                    else:
-                        print(f"      ⚠️  Ingestion error after {max_retries} attempts: {error_msg[:150]}")
-        
-        if not ingested:
-            print(f"      ⚠️  Website content will not be available via RAG until ingestion succeeds")
-        
+                    summary["errors"] += 1
+            elif page.status == crawler.NOT_MODIFIED:
+                summary["not_modified"] += 1
+            elif page.status == crawler.SKIPPED:
+                summary["skipped"] += 1
+                seen.discard(f"website:{page.url}")
+            else:
+                summary["errors"] += 1
+                logger.warning(f"⚠️  {page.url}: {page.error}")
+            
+            if job:
+                job.update(pages_done=summary["pages"])
+    except JobCancelled:
+        raise
     except Exception as e:
-        error_msg = str(e)
-        if "Weaviate" in error_msg or "weaviate" in error_msg or "timed out" in error_msg.lower():
-            print(f"      ⚠️  Website crawl/ingestion skipped due to Weaviate connection issue")
+        summary["errors"] += 1
+        if _is_weaviate_error(str(e)):
+            logger.warning("⚠️  Website crawl/ingestion skipped due to Weaviate connection issue")
         else:
-            print(f"      ❌ Error crawling website: {e}")
+            logger.error(f"❌ Error crawling website: {e}")
+    
+    if summary["pages"] and not summary["errors"]:
+        for source in list_sources(db, business_id, prefix="website:"):
+            if source not in seen:
+                try:
+                    delete_source(db, business_id, source)
+                    summary["removed"] += 1
+                    logger.info(f"🗑️  {source[len('website:'):]} removed")
+                except Exception as e:
+                    logger.error(f"❌ {source}: failed to remove: {e}")
+    
+    logger.info(
+        f"🌐 Crawled {summary['pages']} pages from {website_url}: {summary['ingested']} ingested, "
+        f"{summary['not_modified']} not modified, {summary['errors']} errors, {summary['removed']} removed"
+    )
+    return summary
+
+
+def run_crawl_job(job, business_id: int, website_url: str):
+    """Job entry point: crawl and ingest a website in a worker thread"""
+    db = SessionLocal()
+    try:
+        return crawl_and_ingest_website(db, business_id, website_url, job=job)
+    finally:
+        db.close()
+
+
+def enqueue_website_crawl(business_id: int, website_url: str):
+    """Queue a background crawl; one at a time per business and site"""
+    job = jobs.submit(
+        "website_crawl", run_crawl_job, business_id, website_url,
+        key=f"website_crawl:{business_id}:{website_url}"
+    )
+    job.update(business_id=business_id, url=website_url)
+    return job
+
+
+def run_reembed_job(job, business_id: int):
+    """Job entry point: move a business's stored chunks to its current embedding model"""
+    db = SessionLocal()
+    try:
+        def on_batch(counts):
+            job.update(**counts)
+            job.check_cancelled()
+
+        return reembed_business(db, business_id, on_batch=on_batch)
+    finally:
+        db.close()
 
 
-def ingest_knowledge_files(db: Session, business_id: int, knowledge_files: list):
-    """Ingest all knowledge files into RAG system"""
+def enqueue_reembed(business_id: int):
+    job = jobs.submit("reembed", run_reembed_job, business_id, key=f"reembed:{business_id}")
+    job.update(business_id=business_id)
+    return job
+
+
+def ingest_knowledge_files(db: Session, business_id: int, knowledge_files: list, job=None):
+    """Sync all knowledge files into RAG system, removing files that were deleted"""
+    
+    current_sources = {f"file:{file_data['filename']}" for file_data in knowledge_files}
+    
+    for source in list_sources(db, business_id, prefix="file:"):
+        if source not in current_sources:
+            try:
+                delete_source(db, business_id, source)
+                logger.info(f"🗑️  {source[len('file:'):]} removed")
+            except Exception as e:
+                logger.error(f"❌ {source[len('file:'):]}: failed to remove: {e}")
     
     if not knowledge_files:
-        print(f"   📚 No knowledge files to ingest")
+        logger.info("📚 No knowledge files to ingest")
         return
     
-    print(f"   📚 Ingesting {len(knowledge_files)} knowledge files...")
+    logger.info(f"📚 Syncing {len(knowledge_files)} knowledge files...")
     
-    for file_data in knowledge_files:
+    for done, file_data in enumerate(knowledge_files):
+        if job:
+            job.check_cancelled()
+            job.update(knowledge_files_done=done)
         try:
-            ingest_text(
+            result = sync_source(
                 db=db,
                 business_id=business_id,
-                text=file_data['content'],
-                source=f"file:{file_data['filename']}"
+                source=f"file:{file_data['filename']}",
+                text=file_data['content']
             )
-            print(f"      ✅ {file_data['filename']}")
+            if result['added'] or result['removed']:
+                logger.info(f"✅ {file_data['filename']} ({result['added']} new, {result['removed']} removed chunks)")
+            else:
+                logger.info(f"✅ {file_data['filename']} (unchanged)")
         except Exception as e:
-            print(f"      ❌ {file_data['filename']}: {e}")
+            logger.error(f"❌ {file_data['filename']}: {e}")
+
+
+def list_business_folders() -> list:
+    """All business folders under BUSINESSES_DIR"""
+    if not BUSINESSES_DIR.exists():
+        return []
+    return sorted(f for f in BUSINESSES_DIR.iterdir() if f.is_dir())
+
+
+def sync_business_folder(db: Session, folder: Path, job=None):
+    """Sync one business folder: config, website and knowledge files"""
+    
+    def progress(stage, **extra):
+        if job:
+            job.check_cancelled()
+            job.update(business=folder.name, stage=stage, **extra)
+    
+    logger.info(f"📁 Processing: {folder.name}")
+    
+    # Load config
+    progress("config")
+    config = load_business_config(folder)
+    if not config:
+        return None
+    
+    # Load prompt
+    prompt = load_prompt(folder)
+    
+    # Load knowledge files
+    knowledge_files = load_knowledge_files(folder)
+    
+    # Sync to database
+    business = sync_business_to_db(db, config, prompt)
+    logger.info(f"✅ Business ID: {business.id}")
+    logger.info(f"📞 Phone: {business.phone_number}")
+    
+    # Auto-crawl website if enabled
+    if config.get('auto_crawl_website') and config.get('website_url'):
+        progress("website", business_id=business.id)
+        crawl_and_ingest_website(db, business.id, config['website_url'], job=job)
+    
+    # Ingest knowledge files
+    progress("knowledge", business_id=business.id, knowledge_files=len(knowledge_files))
+    ingest_knowledge_files(db, business.id, knowledge_files, job=job)
+    
+    # Anything not re-synced above (uploads, unchanged pages) after a provider change
+    progress("reembed", business_id=business.id)
+    reembed_business(db, business.id)
+    
+    progress("done", business_id=business.id, knowledge_files_done=len(knowledge_files))
+    
+    return business
+
+
+def run_sync_job(job, folder_name: str):
+    """Job entry point: sync a single business folder in a worker thread"""
+    folder = BUSINESSES_DIR / folder_name
+    
+    db = SessionLocal()
+    try:
+        business = sync_business_folder(db, folder, job=job)
+        if not business:
+            raise Exception(f"No config.yaml found in {folder_name}")
+        # Also after a sync that changed nothing, e.g. at startup
+        warm_search(business.id)
+        return {"business_id": business.id, "name": business.name}
+    finally:
+        db.close()
+
+
+def enqueue_business_sync(folder_name: str):
+    """Queue a background sync for one business folder"""
+    if not (BUSINESSES_DIR / folder_name).is_dir():
+        return None
+    
+    job = jobs.submit("business_sync", run_sync_job, folder_name, key=f"business_sync:{folder_name}")
+    job.update(business=folder_name, stage=job.progress.get("stage", "queued"))
+    return job
+
+
+def enqueue_all_business_syncs() -> list:
+    """Queue one background sync job per business folder"""
+    business_folders = list_business_folders()
+    
+    if not business_folders:
+        logger.warning(f"⚠️  No business folders found in {BUSINESSES_DIR}")
+        return []
+    
+    logger.info(f"📂 Queued sync for {len(business_folders)} business folder(s)")
+    return [enqueue_business_sync(folder.name) for folder in business_folders]
 
 
 def sync_all_businesses():
     """Main sync function - syncs all businesses from files to database"""
     
-    print("\n" + "="*60)
-    print("🔄 SYNCING BUSINESSES FROM FILES TO DATABASE")
-    print("="*60 + "\n")
+    logger.info("🔄 Syncing businesses from files to database")
     
     if not BUSINESSES_DIR.exists():
-        print(f"⚠️  Businesses directory not found: {BUSINESSES_DIR}")
-        print(f"   Create it with: mkdir -p {BUSINESSES_DIR}")
+        logger.warning(f"⚠️  Businesses directory not found: {BUSINESSES_DIR}")
+        logger.info(f"Create it with: mkdir -p {BUSINESSES_DIR}")
         return
     
     # Get all business folders
-    business_folders = [f for f in BUSINESSES_DIR.iterdir() if f.is_dir()]
+    business_folders = list_business_folders()
     
     if not business_folders:
-        print(f"⚠️  No business folders found in {BUSINESSES_DIR}")
+        logger.warning(f"⚠️  No business folders found in {BUSINESSES_DIR}")
         return
     
-    print(f"📂 Found {len(business_folders)} business folder(s)\n")
+    logger.info(f"📂 Found {len(business_folders)} business folder(s)")
     
     db = SessionLocal()
     
     try:
         for folder in business_folders:
-            print(f"📁 Processing: {folder.name}")
-            print("-" * 40)
-            
-            # Load config
-            config = load_business_config(folder)
-            if not config:
-                continue
-            
-            # Load prompt
-            prompt = load_prompt(folder)
-            
-            # Load knowledge files
-            knowledge_files = load_knowledge_files(folder)
-            
-            # Sync to database
-            business = sync_business_to_db(db, config, prompt)
-            print(f"   ✅ Business ID: {business.id}")
-            print(f"   📞 Phone: {business.phone_number}")
-            
-            # Auto-crawl website if enabled
-            if config.get('auto_crawl_website') and config.get('website_url'):
-                crawl_and_ingest_website(db, business.id, config['website_url'])
-            
-            # Ingest knowledge files
-            ingest_knowledge_files(db, business.id, knowledge_files)
-            
-            print()
+            sync_business_folder(db, folder)
     
     except Exception as e:
-        print(f"\n❌ Error during sync: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error(f"❌ Error during sync: {e}", exc_info=True)
     
     finally:
         db.close()
-        
-        # Close Weaviate connection to prevent resource leak
-        try:
-            from app.services.rag_service import get_weaviate_client
-            weaviate_client = get_weaviate_client()
-            if weaviate_client:
-                weaviate_client.close()
-        except Exception:
-            pass
     
-    print("="*60)
-    print("✅ SYNC COMPLETE")
-    print("="*60 + "\n")
-    
-    # Flush stdout to ensure logs appear
-    import sys
-    sys.stdout.flush()
+    logger.info("✅ Sync complete")
 
 
 if __name__ == "__main__":
     # Can be run standalone for testing
+    from app.logging_config import setup_logging
+    from app.services.rag_service import close_weaviate_client
+    setup_logging()
     sync_all_businesses()
-
+    close_weaviate_client()
@@ -1,13 +1,301 @@
-def chunk_text(text: str, chunk_size=600, overlap=100):
-    words = text.split()
-    chunks = []
+"""
+Token-Aware Chunker
+Splits documents into chunks sized by token count for embedding. Chunks
+break at structural boundaries first (headings, list items, paragraphs),
+then between sentences, and only cut inside a sentence that is longer
+than a whole chunk on its own. Overlap is carried as whole trailing
+sentences, up to CHUNK_OVERLAP_TOKENS.
 
+Everything is a generator: a document can be passed as one string or as
+an iterable of text pieces (e.g. an open file or a streamed response), and
+chunks are yielded as soon as they fill up.
+"""
+import os
+import re
+from html.parser import HTMLParser
+from app.services.tokenizer import count_tokens, get_encoding, APPROX_CHARS_PER_TOKEN
+
+
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "500"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "50"))
+
+HEADING = "heading"
+BLOCK = "block"
+SENTENCE = "sentence"
+
+_HEADING_LINE = re.compile(r"^\s{0,3}#{1,6}\s+\S")
+_LIST_ITEM = re.compile(r"^\s*(?:[-*+•]|\d{1,3}[.)])\s+\S")
+_FENCE = re.compile(r"^\s*(```|~~~)")
+# A sentence ends at . ! or ? (optionally followed by quotes/brackets) and whitespace
+_SENTENCE_END = re.compile(r"(?<=[.!?])[\"')\]]*\s+")
+
+_HTML_BLOCK_TAGS = {
+    "p", "div", "section", "article", "main", "header", "footer", "aside",
+    "table", "tr", "ul", "ol", "dl", "dt", "dd", "blockquote", "pre",
+    "form", "fieldset", "address", "figure", "figcaption", "br", "hr",
+}
+_HTML_HEADINGS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+_HTML_SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "head"}
+
+
+def _iter_lines(source):
+    """Lines from a string or an iterable of text pieces, without splitting everything up front"""
+    pieces = [source] if isinstance(source, str) else source
+    pending = ""
+    for piece in pieces:
+        pending += piece
+        start = 0
+        while True:
+            end = pending.find("\n", start)
+            if end < 0:
+                break
+            yield pending[start:end]
+            start = end + 1
+        pending = pending[start:]
+    if pending:
+        yield pending
+
+
+class _HTMLText(HTMLParser):
+    """Turns HTML into markdown-style lines: headings, list items, paragraphs"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.lines = []
+        self._text = []
+        self._prefix = ""
+        self._skip_depth = 0
+
+    def _flush(self):
+        text = " ".join("".join(self._text).split())
+        if text:
+            self.lines.append(self._prefix + text)
+            self.lines.append("")
+        self._text = []
+        self._prefix = ""
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _HTML_SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in _HTML_HEADINGS:
+            self._flush()
+            self._prefix = "#" * _HTML_HEADINGS[tag] + " "
+        elif tag == "li":
+            self._flush()
+            self._prefix = "- "
+        elif tag in _HTML_BLOCK_TAGS:
+            self._flush()
+        elif tag in ("td", "th"):
+            self._text.append(" ")
+
+    def handle_endtag(self, tag):
+        if tag in _HTML_SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in _HTML_HEADINGS or tag == "li" or tag in _HTML_BLOCK_TAGS:
+            self._flush()
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self._text.append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def _iter_html_lines(source):
+    pieces = [source] if isinstance(source, str) else source
+    parser = _HTMLText()
+    for piece in pieces:
+        parser.feed(piece)
+        yield from parser.lines
+        parser.lines.clear()
+    parser.close()
+    yield from parser.lines
+
+
+def html_to_markdown(html: str) -> str:
+    """Visible text of an HTML page, with headings and list items as markdown lines"""
+    return "\n".join(_iter_html_lines(html))
+
+
+def detect_format(text: str) -> str:
+    """'html' if the text looks like markup, else 'text' (markdown-aware)"""
+    head = text[:2048].lstrip().lower()
+    if head.startswith(("<!doctype html", "<html")) or (head.startswith("<") and "</" in head):
+        return "html"
+    return "text"
+
+
+def _iter_sentences(paragraph: str):
     start = 0
-    while start < len(words):
-        end = start + chunk_size
-        chunk_words = words[start:end]
-        chunks.append(" ".join(chunk_words))
-        start += chunk_size - overlap
+    for match in _SENTENCE_END.finditer(paragraph):
+        yield paragraph[start:match.end()].strip()
+        start = match.end()
+    tail = paragraph[start:].strip()
+    if tail:
+        yield tail
+
+
+def iter_units(source, fmt: str = "text"):
+    """
+    Yield (kind, text) units in document order: HEADING and BLOCK start a
+    new structural block, SENTENCE continues the current one.
+    """
+    lines = _iter_html_lines(source) if fmt == "html" else _iter_lines(source)
+
+    paragraph = []
+    in_fence = False
+
+    def flush():
+        if paragraph:
+            first = True
+            for sentence in _iter_sentences(" ".join(paragraph)):
+                yield (BLOCK if first else SENTENCE), sentence
+                first = False
+            paragraph.clear()
+
+    for line in lines:
+        if _FENCE.match(line):
+            yield from flush()
+            in_fence = not in_fence
+            continue
+        if in_fence:
+            # Code keeps its lines; never split into "sentences"
+            if line.strip():
+                yield BLOCK, line.rstrip()
+            continue
+
+        stripped = line.strip()
+        if not stripped:
+            yield from flush()
+        elif _HEADING_LINE.match(line):
+            yield from flush()
+            yield HEADING, stripped
+        elif _LIST_ITEM.match(line):
+            yield from flush()
+            paragraph.append(stripped)
+        else:
+            paragraph.append(stripped)
+
+    yield from flush()
+
+
+def _split_long(text: str, max_tokens: int, first_max: int = None):
+    """Cut a single over-long unit into pieces of at most max_tokens (first_max for the first)"""
+    size = first_max or max_tokens
+    encoding = get_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        start = 0
+        while start < len(tokens):
+            yield encoding.decode(tokens[start:start + size]).strip()
+            start += size
+            size = max_tokens
+        return
+
+    while len(text) > size * APPROX_CHARS_PER_TOKEN:
+        max_chars = size * APPROX_CHARS_PER_TOKEN
+        cut = text.rfind(" ", 0, max_chars)
+        if cut <= 0:
+            cut = max_chars
+        yield text[:cut].strip()
+        text = text[cut:].lstrip()
+        size = max_tokens
+    if text:
+        yield text
+
+
+def _join(units: list) -> str:
+    parts = []
+    for kind, text, _ in units:
+        if parts:
+            parts.append(" " if kind == SENTENCE else "\n")
+        parts.append(text)
+    return "".join(parts)
+
+
+def iter_chunks(source, max_tokens: int = None, overlap_tokens: int = None, fmt: str = None):
+    """
+    Yield chunks of at most max_tokens tokens from a string or an iterable
+    of text pieces. fmt is 'text' (plain or markdown) or 'html'; detected
+    from the first piece if not given.
+    """
+    max_tokens = max_tokens or CHUNK_MAX_TOKENS
+    overlap_tokens = CHUNK_OVERLAP_TOKENS if overlap_tokens is None else overlap_tokens
+    overlap_tokens = min(overlap_tokens, max_tokens // 2)
+
+    if fmt is None:
+        if isinstance(source, str):
+            fmt = detect_format(source)
+        else:
+            source = iter(source)
+            first = next(source, "")
+            fmt = detect_format(first)
+            source = _prepend(first, source)
+
+    current = []          # (kind, text, tokens)
+    current_tokens = 0
+    fresh = 0             # units in `current` that aren't overlap from the previous chunk
+
+    def carry_overlap():
+        """Trailing whole sentences of the last chunk, up to overlap_tokens"""
+        carried = []
+        total = 0
+        for unit in reversed(current):
+            cost = unit[2] + (1 if carried else 0)
+            if unit[0] == HEADING or total + cost > overlap_tokens:
+                break
+            carried.append(unit)
+            total += cost
+        carried.reverse()
+        return carried, total
+
+    for kind, text in iter_units(source, fmt):
+        tokens = count_tokens(text)
+
+        if tokens > max_tokens:
+            # A heading stays with the start of its section: its tokens come
+            # out of the first piece's budget
+            reserve = current_tokens + 1 if current and current[-1][0] == HEADING else 0
+            first_max = max_tokens - reserve if reserve < max_tokens // 2 else None
+            pieces = [(kind, piece) for piece in _split_long(text, max_tokens, first_max)]
+        else:
+            pieces = [(kind, text)]
+
+        for piece_kind, piece in pieces:
+            piece_tokens = tokens if len(pieces) == 1 else count_tokens(piece)
+
+            # A heading always opens a new chunk, without overlap across sections
+            if piece_kind == HEADING and fresh:
+                yield _join(current)
+                current, current_tokens, fresh = [], 0, 0
+
+            if fresh and current_tokens + piece_tokens + (1 if current else 0) > max_tokens:
+                yield _join(current)
+                current, current_tokens = carry_overlap()
+                fresh = 0
+                # Overlap must never push the next unit over the limit
+                while current and current_tokens + piece_tokens + 1 > max_tokens:
+                    # The unit and the separator after it
+                    current_tokens -= current.pop(0)[2] + (1 if current else 0)
+
+            current.append((piece_kind, piece, piece_tokens))
+            current_tokens += piece_tokens + (1 if len(current) > 1 else 0)
+            fresh += 1
+
+    if fresh:
+        yield _join(current)
+
+
+def _prepend(first: str, rest):
+    yield first
+    yield from rest
 
-    return chunks
 
+def chunk_text(text: str, chunk_size: int = None, overlap: int = None, fmt: str = None) -> list:
+    """
+    Split text into token-bounded chunks (sizes in tokens; defaults from
+    CHUNK_MAX_TOKENS / CHUNK_OVERLAP_TOKENS).
+    """
+    return list(iter_chunks(text, max_tokens=chunk_size, overlap_tokens=overlap, fmt=fmt))
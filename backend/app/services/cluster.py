@@ -0,0 +1,410 @@
+"""
+Cluster State (Redis)
+Shared state for running several uvicorn workers or containers behind a
+load balancer. Enabled with CLUSTER_MODE=true; uses REDIS_URL.
+
+  - Active-call registry: rx:call:{call_sid} hashes (business, stream,
+    worker, state), so any worker can see where a call lives.
+  - Global concurrency counters: sorted sets of call sids scored by
+    expiry, cluster-wide (rx:calls) and per business (rx:calls:biz:{id}).
+    Workers heartbeat their calls, so slots held by a crashed worker
+    expire on their own instead of leaking.
+  - Config invalidation: business changes are published on
+    rx:business_config and every other worker reloads that business into
+    its routing table and session config cache. Knowledge changes go out
+    on the same channel; other workers drop their cached search results
+    and rebuild the business's lexical index.
+  - Job locks: a keyed background job (sync, crawl, upload) holds
+    rx:job:{key} while it runs, so the same job queued on several workers
+    (every worker queues the startup sync) runs on one of them. A copy
+    that finds the key taken doesn't wait for it.
+
+If Redis is unreachable, admission falls back to the worker's own limits.
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+CLUSTER_MODE = os.getenv("CLUSTER_MODE", "false").lower() == "true"
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+CLUSTER_MAX_CALLS = int(os.getenv("CLUSTER_MAX_CALLS", "500"))
+CLUSTER_MAX_CALLS_PER_BUSINESS = int(os.getenv("CLUSTER_MAX_CALLS_PER_BUSINESS", os.getenv("MAX_CALLS_PER_BUSINESS", "10")))
+CALL_STATE_TTL = int(os.getenv("CALL_STATE_TTL", "60"))
+CALL_HEARTBEAT_INTERVAL = float(os.getenv("CALL_HEARTBEAT_INTERVAL", "15"))
+JOB_LOCK_TTL = int(os.getenv("JOB_LOCK_TTL", "60"))
+# How long a job start is remembered, so duplicates queued before it skip
+JOB_STARTED_TTL = 3600
+
+CALLS_KEY = "rx:calls"
+CONFIG_CHANNEL = "rx:business_config"
+
+# Don't retry a broken Redis on every call
+REDIS_RETRY_AFTER = 30
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+_redis = None
+_sync_redis = None
+_redis_down_until = 0.0
+_local_calls = {}    # call_sid -> business_id for bridges running on this worker
+_tasks = []
+
+
+def _business_key(business_id: int) -> str:
+    return f"rx:calls:biz:{business_id}"
+
+
+def _call_key(call_sid: str) -> str:
+    return f"rx:call:{call_sid}"
+
+
+def _get_redis():
+    """Async client for the call path, or None if disabled or unreachable"""
+    global _redis
+    if not CLUSTER_MODE or time.monotonic() < _redis_down_until:
+        return None
+    if _redis is None:
+        import redis.asyncio
+        _redis = redis.asyncio.Redis.from_url(REDIS_URL, socket_timeout=0.2, socket_connect_timeout=0.2)
+    return _redis
+
+
+def _get_sync_redis():
+    """Sync client for publishing from worker threads and sync handlers"""
+    global _sync_redis
+    if not CLUSTER_MODE or time.monotonic() < _redis_down_until:
+        return None
+    if _sync_redis is None:
+        import redis
+        _sync_redis = redis.Redis.from_url(REDIS_URL, socket_timeout=0.2, socket_connect_timeout=0.2)
+    return _sync_redis
+
+
+def available() -> bool:
+    """True when cluster mode is on and Redis hasn't recently failed"""
+    return CLUSTER_MODE and time.monotonic() >= _redis_down_until
+
+
+def _redis_failed(e: Exception):
+    global _redis_down_until
+    _redis_down_until = time.monotonic() + REDIS_RETRY_AFTER
+    logger.warning(f"⚠️  Cluster Redis unavailable, using per-worker limits only: {e}")
+
+
+async def _claim(r, call_sid: str, business_id: int, ttl: float, state: str, stream_sid: str = None) -> bool:
+    """
+    Add the call to the global counters, then check the limits. Adding
+    first means two workers racing for the last slot can both back off,
+    but never both get in.
+    """
+    now = time.time()
+    business_key = _business_key(business_id)
+
+    pipe = r.pipeline(transaction=True)
+    pipe.zremrangebyscore(CALLS_KEY, "-inf", now)
+    pipe.zremrangebyscore(business_key, "-inf", now)
+    pipe.zadd(CALLS_KEY, {call_sid: now + ttl})
+    pipe.zadd(business_key, {call_sid: now + ttl})
+    pipe.zcard(CALLS_KEY)
+    pipe.zcard(business_key)
+    results = await pipe.execute()
+    total, for_business = results[4], results[5]
+
+    if total > CLUSTER_MAX_CALLS or for_business > CLUSTER_MAX_CALLS_PER_BUSINESS:
+        await _forget(r, call_sid, business_id)
+        logger.warning(
+            f"🚦 Cluster at capacity for business {business_id}: "
+            f"{total - 1}/{CLUSTER_MAX_CALLS} total, "
+            f"{for_business - 1}/{CLUSTER_MAX_CALLS_PER_BUSINESS} for business"
+        )
+        return False
+
+    fields = {"business_id": business_id, "worker": WORKER_ID, "state": state, "updated_at": now}
+    if stream_sid:
+        fields["stream_sid"] = stream_sid
+    pipe = r.pipeline(transaction=True)
+    pipe.hset(_call_key(call_sid), mapping=fields)
+    pipe.hsetnx(_call_key(call_sid), "started_at", now)
+    pipe.expire(_call_key(call_sid), int(ttl) + 1)
+    await pipe.execute()
+    return True
+
+
+async def _forget(r, call_sid: str, business_id: int):
+    pipe = r.pipeline(transaction=True)
+    pipe.zrem(CALLS_KEY, call_sid)
+    pipe.zrem(_business_key(business_id), call_sid)
+    pipe.delete(_call_key(call_sid))
+    await pipe.execute()
+
+
+async def reserve(call_sid: str, business_id: int, ttl: float):
+    """
+    Hold a cluster-wide slot for an inbound call until its stream starts.
+    Returns True/False, or None if cluster state is unavailable.
+    """
+    r = _get_redis()
+    if r is None:
+        return None
+    try:
+        return await _claim(r, call_sid, business_id, ttl, "reserved")
+    except Exception as e:
+        _redis_failed(e)
+        return None
+
+
+async def activate(call_sid: str, business_id: int, stream_sid: str = None):
+    """
+    Turn a reservation (made by any worker) into a running call on this
+    worker. Calls without a reservation must pass the limits again.
+    """
+    r = _get_redis()
+    if r is None:
+        return None
+    try:
+        admitted = await _claim(r, call_sid, business_id, CALL_STATE_TTL, "active", stream_sid)
+    except Exception as e:
+        _redis_failed(e)
+        return None
+    if admitted:
+        _local_calls[call_sid] = business_id
+    return admitted
+
+
+async def release(call_sid: str, business_id: int):
+    _local_calls.pop(call_sid, None)
+    r = _get_redis()
+    if r is None:
+        return
+    try:
+        await _forget(r, call_sid, business_id)
+    except Exception as e:
+        _redis_failed(e)
+
+
+async def _heartbeat():
+    """Keep this worker's calls from expiring out of the global counters"""
+    while True:
+        await asyncio.sleep(CALL_HEARTBEAT_INTERVAL)
+        r = _get_redis()
+        if r is None or not _local_calls:
+            continue
+        expires_at = time.time() + CALL_STATE_TTL
+        try:
+            pipe = r.pipeline(transaction=False)
+            for call_sid, business_id in list(_local_calls.items()):
+                pipe.zadd(CALLS_KEY, {call_sid: expires_at}, xx=True)
+                pipe.zadd(_business_key(business_id), {call_sid: expires_at}, xx=True)
+                pipe.expire(_call_key(call_sid), CALL_STATE_TTL + 1)
+            await pipe.execute()
+        except Exception as e:
+            _redis_failed(e)
+
+
+def _config_change(business_id: int, version: int = None, kind: str = "config") -> str:
+    return json.dumps({"business_id": business_id, "version": version, "kind": kind, "worker": WORKER_ID})
+
+
+def publish_business_change(business_id: int, version: int = None):
+    """Tell the other workers a business's config changed (from threads; blocks)"""
+    r = _get_sync_redis()
+    if r is None:
+        return
+    try:
+        r.publish(CONFIG_CHANNEL, _config_change(business_id, version))
+    except Exception as e:
+        _redis_failed(e)
+
+
+def publish_knowledge_change(business_id: int):
+    """Tell the other workers a business's knowledge was re-ingested (from threads; blocks)"""
+    r = _get_sync_redis()
+    if r is None:
+        return
+    try:
+        r.publish(CONFIG_CHANNEL, _config_change(business_id, kind="knowledge"))
+    except Exception as e:
+        _redis_failed(e)
+
+
+async def publish_business_change_async(business_id: int, version: int = None):
+    """publish_business_change() for code on the event loop"""
+    r = _get_redis()
+    if r is None:
+        return
+    try:
+        await r.publish(CONFIG_CHANNEL, _config_change(business_id, version))
+    except Exception as e:
+        _redis_failed(e)
+
+
+def _while_owner(r, name: str, token: str, action) -> bool:
+    """Run action(pipe) in a transaction only if the lock still holds our token"""
+    import redis
+
+    with r.pipeline() as pipe:
+        try:
+            pipe.watch(name)
+            if pipe.get(name) != token:
+                return False
+            pipe.multi()
+            action(pipe)
+            pipe.execute()
+            return True
+        except redis.WatchError:
+            return False
+
+
+class JobLock:
+    """
+    rx:job:{key}, held by one worker at a time while a keyed background job
+    runs. acquire() never waits: a job that finds its key held elsewhere is
+    skipped or requeued by the caller. The lock is renewed while held and
+    expires JOB_LOCK_TTL seconds after its worker dies. rx:job:{key}:started
+    records when the key last started running anywhere. Without Redis every
+    job runs unlocked.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self.name = f"rx:job:{key}"
+        self._redis = None
+        self._token = None
+        self._stop = None
+
+    def started_since(self, since: float) -> bool:
+        """True if the job ran (or is running) on some worker since `since`"""
+        r = _get_sync_redis()
+        if r is None:
+            return False
+        try:
+            started = r.get(f"{self.name}:started")
+        except Exception as e:
+            _redis_failed(e)
+            return False
+        return started is not None and float(started) >= since
+
+    def acquire(self) -> bool:
+        """Take the lock if it's free; False if another worker holds it"""
+        r = _get_sync_redis()
+        if r is None:
+            return True
+        token = f"{WORKER_ID}:{threading.get_ident()}:{time.time()}".encode()
+        try:
+            if not r.set(self.name, token, nx=True, ex=JOB_LOCK_TTL):
+                return False
+            r.set(f"{self.name}:started", time.time(), ex=JOB_STARTED_TTL)
+        except Exception as e:
+            _redis_failed(e)
+            return True
+
+        self._redis, self._token, self._stop = r, token, threading.Event()
+        threading.Thread(target=self._renew, name=f"job-lock-{self.key}", daemon=True).start()
+        return True
+
+    def _renew(self):
+        while not self._stop.wait(JOB_LOCK_TTL / 3):
+            try:
+                if not _while_owner(self._redis, self.name, self._token, lambda pipe: pipe.expire(self.name, JOB_LOCK_TTL)):
+                    logger.warning(f"⚠️  Lost job lock for {self.key}")
+                    return
+            except Exception as e:
+                logger.warning(f"⚠️  Could not renew job lock for {self.key}: {e}")
+
+    def release(self):
+        if self._token is None:
+            return
+        self._stop.set()
+        try:
+            _while_owner(self._redis, self.name, self._token, lambda pipe: pipe.delete(self.name))
+        except Exception as e:
+            logger.warning(f"⚠️  Could not release job lock for {self.key}: {e}")
+        self._token = None
+
+
+async def _listen_for_config_changes():
+    from app.services import business_directory, rag_service
+
+    while True:
+        r = _get_redis()
+        if r is None:
+            await asyncio.sleep(REDIS_RETRY_AFTER if CLUSTER_MODE else 3600)
+            continue
+        pubsub = r.pubsub()
+        try:
+            await pubsub.subscribe(CONFIG_CHANNEL)
+            while True:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=5.0)
+                if message is None:
+                    continue
+                change = json.loads(message["data"])
+                if change.get("worker") == WORKER_ID:
+                    continue
+                if change.get("kind") == "knowledge":
+                    rag_service.on_knowledge_changed(change["business_id"])
+                    continue
+                await business_directory.reload_business(change["business_id"])
+                logger.info(f"🔄 Reloaded business {change['business_id']} after change on {change.get('worker')}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"⚠️  Config change listener error, resubscribing: {e}")
+            await asyncio.sleep(1)
+        finally:
+            try:
+                await pubsub.aclose()
+            except Exception:
+                pass
+
+
+def start():
+    """Start heartbeats and the config listener (called from the app lifespan)"""
+    if CLUSTER_MODE and not _tasks:
+        _tasks.append(asyncio.create_task(_heartbeat()))
+        _tasks.append(asyncio.create_task(_listen_for_config_changes()))
+        logger.info(f"🌐 Cluster mode enabled (worker {WORKER_ID})")
+
+
+async def shutdown():
+    global _redis
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
+
+
+async def stats():
+    if not CLUSTER_MODE:
+        return {"enabled": False}
+    r = _get_redis()
+    result = {
+        "enabled": True,
+        "worker": WORKER_ID,
+        "worker_calls": len(_local_calls),
+        "limits": {
+            "max_calls": CLUSTER_MAX_CALLS,
+            "max_calls_per_business": CLUSTER_MAX_CALLS_PER_BUSINESS,
+        },
+    }
+    if r is None:
+        return {**result, "available": False}
+    try:
+        now = time.time()
+        await r.zremrangebyscore(CALLS_KEY, "-inf", now)
+        result["calls"] = await r.zcard(CALLS_KEY)
+        result["available"] = True
+    except Exception as e:
+        _redis_failed(e)
+        result["available"] = False
+    return result
@@ -1,19 +1,393 @@
-import requests
-from bs4 import BeautifulSoup
+"""
+Website Crawler
+Async, same-site crawler built on httpx:
 
+  - bounded concurrency, depth and page limits
+  - robots.txt rules and crawl-delay, sitemap.xml seeding
+  - ETag / Last-Modified conditional requests, so a re-crawl only
+    downloads pages that changed (unchanged pages come back as
+    "not_modified" with the links remembered from last time)
+  - one CrawledPage per page, yielded as soon as it is fetched
 
-def crawl_website(url: str) -> str:
+Page text keeps headings and list items as markdown-style lines so the
+chunker can split on them.
+"""
+import asyncio
+import logging
+import os
+import queue
+import re
+import threading
+import time
+import xml.etree.ElementTree as ElementTree
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urldefrag, urlsplit, urlunsplit
+from urllib.robotparser import RobotFileParser
+import httpx
+from app.services.chunker import html_to_markdown
+
+
+logger = logging.getLogger(__name__)
+
+
+CRAWL_MAX_PAGES = int(os.getenv("CRAWL_MAX_PAGES", "50"))
+CRAWL_MAX_DEPTH = int(os.getenv("CRAWL_MAX_DEPTH", "3"))
+CRAWL_CONCURRENCY = int(os.getenv("CRAWL_CONCURRENCY", "4"))
+CRAWL_TIMEOUT = float(os.getenv("CRAWL_TIMEOUT", "10"))
+CRAWL_USER_AGENT = os.getenv("CRAWL_USER_AGENT", "AIReceptionistBot/1.0")
+CRAWL_MAX_PAGE_BYTES = int(os.getenv("CRAWL_MAX_PAGE_BYTES", str(5 * 1024 * 1024)))
+
+# Page URLs become "website:{url}" sources, stored in a 200-char column
+CRAWL_MAX_URL_LENGTH = 190
+MAX_SITEMAPS = 10
+
+OK = "ok"
+NOT_MODIFIED = "not_modified"
+SKIPPED = "skipped"
+ERROR = "error"
+
+_SKIP_EXTENSIONS = re.compile(
+    r"\.(?:jpe?g|png|gif|webp|svg|ico|bmp|tiff?|pdf|zip|gz|tar|rar|7z|exe|dmg|mp[34]|m4a|wav|avi|mov|"
+    r"webm|woff2?|ttf|eot|otf|css|js|json|xml|rss|atom|docx?|xlsx?|pptx?|csv)$",
+    re.IGNORECASE,
+)
+
+
+class CrawledPage:
+    def __init__(self, url: str, status: str, depth: int = 0, text: str = "", links: list = None,
+                 etag: str = None, last_modified: str = None, error: str = None):
+        self.url = url
+        self.status = status
+        self.depth = depth
+        self.text = text
+        self.links = links or []
+        self.etag = etag
+        self.last_modified = last_modified
+        self.error = error
+
+
+class _LinkParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.links = []
+        self.base = None
+        self.nofollow = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "a" and attrs.get("href") and "nofollow" not in (attrs.get("rel") or ""):
+            self.links.append(attrs["href"])
+        elif tag == "base" and attrs.get("href") and self.base is None:
+            self.base = attrs["href"]
+        elif tag == "meta" and (attrs.get("name") or "").lower() == "robots":
+            self.nofollow = "nofollow" in (attrs.get("content") or "").lower()
+
+
+def normalize_url(url: str):
+    """Canonical form used for de-duplication; None for URLs we never crawl"""
+    url, _ = urldefrag(url.strip())
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.netloc:
+        return None
+    path = parts.path or "/"
+    if _SKIP_EXTENSIONS.search(path):
+        return None
+    url = urlunsplit((parts.scheme, parts.netloc.lower(), path, parts.query, ""))
+    return url if len(url) <= CRAWL_MAX_URL_LENGTH else None
+
+
+def _site_host(url: str) -> str:
+    host = urlsplit(url).netloc.lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def extract_links(html: str, page_url: str) -> list:
+    parser = _LinkParser()
     try:
-        res = requests.get(url, timeout=10)
-        soup = BeautifulSoup(res.text, "html.parser")
+        parser.feed(html)
+        parser.close()
+    except Exception:
+        pass
+    if parser.nofollow:
+        return []
+    base = urljoin(page_url, parser.base) if parser.base else page_url
+    links = []
+    for href in parser.links:
+        url = normalize_url(urljoin(base, href))
+        if url:
+            links.append(url)
+    return list(dict.fromkeys(links))
+
+
+def _sitemap_locations(xml_text: str):
+    """(page urls, nested sitemap urls) from a sitemap or sitemap index"""
+    try:
+        root = ElementTree.fromstring(xml_text.encode("utf-8") if isinstance(xml_text, str) else xml_text)
+    except ElementTree.ParseError:
+        return [], []
+    pages, sitemaps = [], []
+    for element in root.iter():
+        if element.tag.endswith("}loc") or element.tag == "loc":
+            loc = (element.text or "").strip()
+            if not loc:
+                continue
+            if root.tag.endswith("sitemapindex"):
+                sitemaps.append(loc)
+            else:
+                pages.append(loc)
+    return pages, sitemaps
+
+
+class _Crawler:
+    def __init__(self, start_url: str, max_pages: int, max_depth: int, concurrency: int,
+                 validators: dict, use_sitemap: bool, client: httpx.AsyncClient):
+        self.start_url = normalize_url(start_url) or start_url
+        self.site = _site_host(self.start_url)
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.concurrency = concurrency
+        self.validators = validators or {}
+        self.use_sitemap = use_sitemap
+        self.client = client
+
+        self.robots = None
+        self.crawl_delay = 0.0
+        self._last_request = 0.0
+        self._delay_lock = asyncio.Lock()
 
-        # Remove scripts & styles
-        for tag in soup(["script", "style"]):
-            tag.decompose()
+        self.frontier = asyncio.Queue()
+        self.results = asyncio.Queue()
+        self.seen = set()
 
-        text = soup.get_text(separator=" ", strip=True)
-        return text
+    def _same_site(self, url: str) -> bool:
+        return _site_host(url) == self.site
 
-    except Exception as e:
-        return f"ERROR: {str(e)}"
+    def _allowed(self, url: str) -> bool:
+        return self.robots is None or self.robots.can_fetch(CRAWL_USER_AGENT, url)
 
+    def _schedule(self, url: str, depth: int):
+        if (
+            url in self.seen
+            or len(self.seen) >= self.max_pages
+            or depth > self.max_depth
+            or not self._same_site(url)
+            or not self._allowed(url)
+        ):
+            return
+        self.seen.add(url)
+        self.frontier.put_nowait((url, depth))
+
+    async def _polite_wait(self):
+        if not self.crawl_delay:
+            return
+        async with self._delay_lock:
+            wait = self._last_request + self.crawl_delay - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._last_request = time.monotonic()
+
+    async def _load_robots(self) -> list:
+        """Parse robots.txt; returns the sitemaps it lists"""
+        parts = urlsplit(self.start_url)
+        robots_url = f"{parts.scheme}://{parts.netloc}/robots.txt"
+        try:
+            response = await self.client.get(robots_url)
+        except httpx.HTTPError:
+            return []
+        if response.status_code >= 400:
+            return []
+        self.robots = RobotFileParser()
+        self.robots.parse(response.text.splitlines())
+        self.crawl_delay = float(self.robots.crawl_delay(CRAWL_USER_AGENT) or 0)
+        return list(self.robots.site_maps() or [])
+
+    async def _sitemap_urls(self, sitemaps: list) -> list:
+        parts = urlsplit(self.start_url)
+        pending = sitemaps or [f"{parts.scheme}://{parts.netloc}/sitemap.xml"]
+        fetched = 0
+        pages = []
+        while pending and fetched < MAX_SITEMAPS and len(pages) < self.max_pages:
+            sitemap_url = pending.pop(0)
+            fetched += 1
+            try:
+                response = await self.client.get(sitemap_url)
+            except httpx.HTTPError:
+                continue
+            if response.status_code >= 400:
+                continue
+            found, nested = _sitemap_locations(response.content)
+            pages += found
+            pending += nested
+        return pages
+
+    async def _fetch(self, url: str, depth: int) -> CrawledPage:
+        cached = self.validators.get(url) or {}
+        headers = {}
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+        await self._polite_wait()
+        try:
+            async with self.client.stream("GET", url, headers=headers) as response:
+                if response.status_code == 304:
+                    return CrawledPage(
+                        url, NOT_MODIFIED, depth, links=cached.get("links") or [],
+                        etag=cached.get("etag"), last_modified=cached.get("last_modified")
+                    )
+                if response.status_code >= 400:
+                    return CrawledPage(url, ERROR, depth, error=f"HTTP {response.status_code}")
+
+                content_type = response.headers.get("content-type", "")
+                if "html" not in content_type and "text/plain" not in content_type:
+                    return CrawledPage(url, SKIPPED, depth, error=f"content type {content_type or 'unknown'}")
+
+                body = bytearray()
+                async for piece in response.aiter_bytes():
+                    body += piece
+                    if len(body) > CRAWL_MAX_PAGE_BYTES:
+                        return CrawledPage(url, ERROR, depth, error="Page too large")
+
+                final_url = normalize_url(str(response.url)) or url
+                html = bytes(body).decode(response.encoding or "utf-8", errors="replace")
+                etag = response.headers.get("etag")
+                last_modified = response.headers.get("last-modified")
+        except httpx.HTTPError as e:
+            return CrawledPage(url, ERROR, depth, error=str(e) or type(e).__name__)
+
+        if final_url != url:
+            if final_url in self.seen or not self._same_site(final_url):
+                # Redirected onto a page we already have (or off-site)
+                return CrawledPage(url, SKIPPED, depth, error=f"redirects to {final_url}")
+            self.seen.add(final_url)
+
+        if "html" in content_type:
+            text = html_to_markdown(html)
+            links = extract_links(html, str(response.url))
+        else:
+            text, links = html, []
+        return CrawledPage(url, OK, depth, text=text, links=links, etag=etag, last_modified=last_modified)
+
+    async def _worker(self):
+        while True:
+            url, depth = await self.frontier.get()
+            try:
+                page = await self._fetch(url, depth)
+                if depth < self.max_depth:
+                    for link in page.links:
+                        self._schedule(link, depth + 1)
+                await self.results.put(page)
+            except Exception as e:
+                await self.results.put(CrawledPage(url, ERROR, depth, error=str(e)))
+            finally:
+                self.frontier.task_done()
+
+    async def run(self):
+        sitemaps = await self._load_robots()
+        self._schedule(self.start_url, 0)
+        if self.use_sitemap:
+            for url in await self._sitemap_urls(sitemaps):
+                url = normalize_url(url)
+                if url:
+                    self._schedule(url, 1)
+
+        workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        done = asyncio.create_task(self.frontier.join())
+        try:
+            while True:
+                getter = asyncio.create_task(self.results.get())
+                finished, _ = await asyncio.wait({getter, done}, return_when=asyncio.FIRST_COMPLETED)
+                if getter in finished:
+                    yield getter.result()
+                    continue
+                getter.cancel()
+                while not self.results.empty():
+                    yield self.results.get_nowait()
+                break
+        finally:
+            done.cancel()
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, done, return_exceptions=True)
+
+
+async def crawl_site(start_url: str, max_pages: int = None, max_depth: int = None,
+                     concurrency: int = None, validators: dict = None, use_sitemap: bool = True):
+    """
+    Crawl a site, yielding a CrawledPage per page as soon as it's fetched.
+
+    validators maps page URL -> {"etag", "last_modified", "links"} from a
+    previous crawl; those pages are requested conditionally.
+    """
+    max_pages = max_pages or CRAWL_MAX_PAGES
+    max_depth = CRAWL_MAX_DEPTH if max_depth is None else max_depth
+    concurrency = concurrency or CRAWL_CONCURRENCY
+
+    async with httpx.AsyncClient(
+        follow_redirects=True,
+        timeout=CRAWL_TIMEOUT,
+        headers={"User-Agent": CRAWL_USER_AGENT},
+        limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+    ) as client:
+        crawler = _Crawler(start_url, max_pages, max_depth, concurrency, validators, use_sitemap, client)
+        async for page in crawler.run():
+            yield page
+
+
+def iter_site_pages(start_url: str, buffer: int = 8, **options):
+    """
+    Blocking iterator over crawl_site() for sync callers (jobs, routes in
+    the threadpool). The crawl runs on its own event loop in a background
+    thread; at most `buffer` pages wait for the consumer. Stopping early
+    (break / close) cancels the crawl.
+    """
+    pages = queue.Queue(maxsize=buffer)
+    stop = threading.Event()
+    finished = object()
+
+    async def produce():
+        try:
+            async for page in crawl_site(start_url, **options):
+                # Backpressure: stop fetching while the consumer is behind
+                while not stop.is_set():
+                    try:
+                        pages.put_nowait(page)
+                        break
+                    except queue.Full:
+                        await asyncio.sleep(0.05)
+                if stop.is_set():
+                    return
+        except Exception as e:
+            pages.put(e)
+        finally:
+            pages.put(finished)
+
+    thread = threading.Thread(target=asyncio.run, args=(produce(),), name="crawler", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = pages.get()
+            if item is finished:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        # Unblock the producer if it's waiting on a full queue
+        while thread.is_alive():
+            try:
+                pages.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        thread.join()
+
+
+def crawl_website(url: str) -> str:
+    """Text of a single page (no link following)"""
+    for page in iter_site_pages(url, max_pages=1, max_depth=0, use_sitemap=False):
+        if page.status != OK:
+            return f"ERROR: {page.error}"
+        return page.text
+    return "ERROR: page not crawled"
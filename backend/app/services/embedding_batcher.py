@@ -0,0 +1,120 @@
+"""
+Batched Embedding Pipeline
+Packs chunks into multi-input embeddings requests sized by token budget,
+runs a bounded number of requests in parallel and retries only the batches
+that failed.
+"""
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from app.services.tokenizer import count_tokens, truncate_to_tokens
+
+
+logger = logging.getLogger(__name__)
+
+
+# OpenAI caps a single embeddings request at 2048 inputs / 300k tokens,
+# and a single input at 8191 tokens.
+EMBED_MAX_BATCH_TOKENS = int(os.getenv("EMBED_MAX_BATCH_TOKENS", "100000"))
+EMBED_MAX_BATCH_INPUTS = int(os.getenv("EMBED_MAX_BATCH_INPUTS", "512"))
+EMBED_MAX_INPUT_TOKENS = 8191
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "3"))
+EMBED_RETRY_BACKOFF = float(os.getenv("EMBED_RETRY_BACKOFF", "1.0"))
+
+
+def plan_batches(token_counts: list, max_tokens: int = None, max_inputs: int = None) -> list:
+    """
+    Group input indices into batches that stay under the token and input
+    limits. Returns a list of index lists, preserving input order.
+    """
+    max_tokens = max_tokens or EMBED_MAX_BATCH_TOKENS
+    max_inputs = max_inputs or EMBED_MAX_BATCH_INPUTS
+
+    batches = []
+    current = []
+    current_tokens = 0
+
+    for index, tokens in enumerate(token_counts):
+        if current and (current_tokens + tokens > max_tokens or len(current) >= max_inputs):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(index)
+        current_tokens += tokens
+
+    if current:
+        batches.append(current)
+
+    return batches
+
+
+def _embed_batch(client, model: str, inputs: list) -> list:
+    response = client.embeddings.create(model=model, input=inputs)
+    # The API returns one item per input tagged with its position
+    ordered = sorted(response.data, key=lambda item: item.index)
+    return [item.embedding for item in ordered]
+
+
+def embed_texts(texts: list, client, model: str = None, concurrency: int = None) -> list:
+    """
+    Embed many texts with as few round-trips as possible.
+
+    Returns one vector per input, in input order. Batches that fail are
+    retried with exponential backoff; batches that already succeeded are
+    never re-sent.
+    """
+    if not texts:
+        return []
+
+    model = model or os.getenv("OPENAI_EMBEDDINGS")
+    concurrency = concurrency or EMBED_CONCURRENCY
+
+    # Oversized inputs would fail the whole batch, so clip them up front
+    inputs = []
+    token_counts = []
+    for text in texts:
+        tokens = count_tokens(text)
+        if tokens > EMBED_MAX_INPUT_TOKENS:
+            text = truncate_to_tokens(text, EMBED_MAX_INPUT_TOKENS)
+            tokens = EMBED_MAX_INPUT_TOKENS
+        inputs.append(text)
+        token_counts.append(tokens)
+
+    vectors = [None] * len(inputs)
+    pending = plan_batches(token_counts)
+    last_error = None
+
+    for attempt in range(1, EMBED_MAX_RETRIES + 1):
+        failed = []
+
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(pending))) as pool:
+            futures = {
+                pool.submit(_embed_batch, client, model, [inputs[i] for i in batch]): batch
+                for batch in pending
+            }
+            for future in as_completed(futures):
+                batch = futures[future]
+                try:
+                    batch_vectors = future.result()
+                except Exception as e:
+                    last_error = e
+                    failed.append(batch)
+                    continue
+                for index, vector in zip(batch, batch_vectors):
+                    vectors[index] = vector
+
+        if not failed:
+            return vectors
+
+        pending = failed
+        if attempt < EMBED_MAX_RETRIES:
+            logger.info(f"⏳ {len(failed)} embedding batch(es) failed, retrying ({attempt}/{EMBED_MAX_RETRIES})...")
+            time.sleep(EMBED_RETRY_BACKOFF * (2 ** (attempt - 1)))
+
+    failed_inputs = sum(len(batch) for batch in pending)
+    raise Exception(
+        f"Embedding failed for {failed_inputs} of {len(inputs)} chunks "
+        f"after {EMBED_MAX_RETRIES} attempts: {last_error}"
+    )
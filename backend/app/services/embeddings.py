@@ -0,0 +1,236 @@
+"""
+Embedding Providers
+Turns text into vectors for ingestion and search. Each business can pick
+its provider (the `embedding_provider` column / config.yaml key); the rest
+use EMBEDDING_PROVIDER.
+
+  - openai:  the OpenAI embeddings API (OPENAI_EMBEDDINGS). One WAN
+             round-trip per query; ingestion goes through the batcher.
+  - onnx:    a local sentence-transformer exported to ONNX, e.g.
+             all-MiniLM-L6-v2. LOCAL_EMBEDDING_MODEL_PATH is a directory
+             with model.onnx and tokenizer.json; needs the optional
+             onnxruntime and tokenizers packages. Runs on the CPU in
+             batches, with pooling and normalization done in NumPy.
+  - hashing: hashed word and character-trigram features. No model and no
+             dependencies, for offline development and benchmarks; much
+             weaker than a trained model.
+
+Every provider reports a `model` id, which is stored in the ingestion
+ledger next to each vector. When a business changes provider, its chunks
+no longer match the ledger's model and are re-embedded on the next sync.
+Vectors from different models can't share an index, so each model writes
+to its own Weaviate collection (see collection_name()).
+"""
+import asyncio
+import hashlib
+import importlib.util
+import logging
+import os
+import re
+import threading
+import zlib
+import numpy as np
+from openai import OpenAI, AsyncOpenAI
+from app.services.embedding_batcher import embed_texts
+
+
+logger = logging.getLogger(__name__)
+
+
+client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+async_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "openai")
+OPENAI_EMBEDDINGS = os.getenv("OPENAI_EMBEDDINGS")
+# The model that filled the original, unsuffixed collection. Pin it before
+# changing OPENAI_EMBEDDINGS, so existing vectors are still found.
+LEGACY_EMBEDDING_MODEL = os.getenv("LEGACY_EMBEDDING_MODEL", OPENAI_EMBEDDINGS)
+LOCAL_EMBEDDING_MODEL_PATH = os.getenv("LOCAL_EMBEDDING_MODEL_PATH")
+LOCAL_EMBEDDING_BATCH = int(os.getenv("LOCAL_EMBEDDING_BATCH", "32"))
+LOCAL_EMBEDDING_MAX_TOKENS = int(os.getenv("LOCAL_EMBEDDING_MAX_TOKENS", "256"))
+LOCAL_EMBEDDING_THREADS = int(os.getenv("LOCAL_EMBEDDING_THREADS", "0"))   # 0 = onnxruntime default
+HASHING_DIMENSIONS = int(os.getenv("HASHING_DIMENSIONS", "384"))
+
+# Model ids of local providers start with this; anything else is an OpenAI model
+LOCAL_PREFIX = "local/"
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+class OpenAIProvider:
+    name = "openai"
+
+    def __init__(self, model: str = None):
+        self.model = model or OPENAI_EMBEDDINGS
+
+    def embed(self, texts: list) -> list:
+        # The module-level clients are looked up per call so they can be swapped out
+        return embed_texts(texts, client=client, model=self.model)
+
+    def embed_query(self, text: str) -> list:
+        response = client.embeddings.create(model=self.model, input=text)
+        return response.data[0].embedding
+
+    async def embed_query_async(self, text: str) -> list:
+        response = await async_client.embeddings.create(model=self.model, input=text)
+        return response.data[0].embedding
+
+
+class _LocalProvider:
+    """CPU-bound providers; the async path runs off the event loop"""
+
+    def embed_query(self, text: str) -> list:
+        return self.embed([text])[0]
+
+    async def embed_query_async(self, text: str) -> list:
+        return await asyncio.to_thread(self.embed_query, text)
+
+
+class HashingProvider(_LocalProvider):
+    name = "hashing"
+
+    def __init__(self, dimensions: int = None):
+        self.dimensions = dimensions or HASHING_DIMENSIONS
+        self.model = f"{LOCAL_PREFIX}hashing-{self.dimensions}"
+
+    def embed_array(self, texts: list) -> np.ndarray:
+        rows, columns, signs = [], [], []
+        for row, text in enumerate(texts):
+            for word in _WORD.findall(text.lower()):
+                padded = f" {word} "
+                for feature in [word] + [padded[i:i + 3] for i in range(len(padded) - 2)]:
+                    h = zlib.crc32(feature.encode())
+                    rows.append(row)
+                    columns.append(h % self.dimensions)
+                    signs.append(1.0 if h & 0x80000000 else -1.0)
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        np.add.at(vectors, (np.array(rows, dtype=np.intp), np.array(columns, dtype=np.intp)),
+                  np.array(signs, dtype=np.float32))
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-9)
+
+    def embed(self, texts: list) -> list:
+        return self.embed_array(texts).tolist() if texts else []
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+class OnnxProvider(_LocalProvider):
+    name = "onnx"
+
+    def __init__(self, path: str = None):
+        self.path = path or LOCAL_EMBEDDING_MODEL_PATH
+        if not self.path or not os.path.exists(os.path.join(self.path, "model.onnx")):
+            raise ValueError(f"No model.onnx in LOCAL_EMBEDDING_MODEL_PATH ({self.path})")
+        for package in ("onnxruntime", "tokenizers"):
+            if importlib.util.find_spec(package) is None:
+                raise ValueError(f"The onnx embedding provider needs the {package} package")
+        # The directory name alone could be shared by different models
+        name = os.path.basename(os.path.normpath(self.path)).lower()
+        self.model = f"{LOCAL_PREFIX}onnx/{name}-{_file_digest(os.path.join(self.path, 'model.onnx'))}"
+        self._session = None
+        self._tokenizer = None
+        self._load_lock = threading.Lock()
+
+    def _load(self):
+        with self._load_lock:
+            if self._session is not None:
+                return
+            import onnxruntime
+            from tokenizers import Tokenizer
+
+            options = onnxruntime.SessionOptions()
+            if LOCAL_EMBEDDING_THREADS:
+                options.intra_op_num_threads = LOCAL_EMBEDDING_THREADS
+            session = onnxruntime.InferenceSession(
+                os.path.join(self.path, "model.onnx"), options, providers=["CPUExecutionProvider"]
+            )
+            tokenizer = Tokenizer.from_file(os.path.join(self.path, "tokenizer.json"))
+            tokenizer.enable_truncation(LOCAL_EMBEDDING_MAX_TOKENS)
+            # Pads each batch to its longest input only
+            tokenizer.enable_padding()
+            self._inputs = {node.name for node in session.get_inputs()}
+            self._tokenizer = tokenizer
+            self._session = session
+            logger.info("🧠 Loaded local embedding model %s", self.model)
+
+    def embed_array(self, texts: list) -> np.ndarray:
+        self._load()
+        # Batching similar lengths together keeps padding (wasted compute) low
+        order = np.argsort([len(text) for text in texts], kind="stable")
+        vectors = None
+        for start in range(0, len(texts), LOCAL_EMBEDDING_BATCH):
+            rows = order[start:start + LOCAL_EMBEDDING_BATCH]
+            encodings = self._tokenizer.encode_batch([texts[i] for i in rows])
+            ids = np.array([e.ids for e in encodings], dtype=np.int64)
+            mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+            feeds = {"input_ids": ids, "attention_mask": mask}
+            if "token_type_ids" in self._inputs:
+                feeds["token_type_ids"] = np.zeros_like(ids)
+            output = self._session.run(None, feeds)[0]
+
+            if output.ndim == 3:
+                # Token embeddings: mean over the real (unpadded) tokens
+                weights = mask[..., None].astype(np.float32)
+                output = (output * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+            if vectors is None:
+                vectors = np.empty((len(texts), output.shape[1]), dtype=np.float32)
+            vectors[rows] = output / np.maximum(np.linalg.norm(output, axis=1, keepdims=True), 1e-9)
+        return vectors
+
+    def embed(self, texts: list) -> list:
+        return self.embed_array(texts).tolist() if texts else []
+
+
+_FACTORIES = {
+    "openai": OpenAIProvider,
+    "onnx": OnnxProvider,
+    "hashing": HashingProvider,
+}
+PROVIDERS = tuple(_FACTORIES)
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider(name: str = None):
+    """Shared provider instance by name (default EMBEDDING_PROVIDER)"""
+    name = (name or EMBEDDING_PROVIDER).lower()
+    provider = _providers.get(name)
+    if provider is not None:
+        return provider
+    if name not in _FACTORIES:
+        raise ValueError(f"Unknown embedding provider '{name}' (one of {', '.join(PROVIDERS)})")
+    with _providers_lock:
+        if name not in _providers:
+            _providers[name] = _FACTORIES[name]()
+        return _providers[name]
+
+
+def provider_for_business(business_id: int):
+    """The business's configured provider, from the business directory"""
+    from app.services import business_directory
+
+    snapshot = business_directory.get_by_id(business_id)
+    return get_provider(getattr(snapshot, "embedding_provider", None))
+
+
+def is_local_model(model: str) -> bool:
+    return bool(model) and model.startswith(LOCAL_PREFIX)
+
+
+def collection_name(base: str, model: str) -> str:
+    """
+    Weaviate collection holding vectors from `model`. The legacy model
+    (and ledger rows from before models were recorded) keep the original
+    collection; every other model, OpenAI or local, gets its own.
+    """
+    if not model or model == LEGACY_EMBEDDING_MODEL:
+        return base
+    suffix = model[len(LOCAL_PREFIX):] if is_local_model(model) else f"openai/{model}"
+    return f"{base}_{re.sub(r'[^A-Za-z0-9]+', '_', suffix).strip('_')}"
@@ -0,0 +1,316 @@
+"""
+Hybrid Retrieval
+Lexical (BM25) search over a business's stored chunks, fused with vector
+search results and reranked locally.
+
+Vector search is good at paraphrases ("when do you open") but weak on
+exact tokens: phone numbers, prices, street names, SKUs. BM25 is the
+opposite. Fusion takes both candidate lists:
+
+  - rrf:   reciprocal rank fusion, sum of 1 / (RAG_RRF_K + rank)
+  - alpha: alpha * vector score + (1 - alpha) * BM25 score, each min-max
+           normalized within the candidate list
+
+The rerank step rescores the fused candidates by how many of the query's
+terms each chunk contains (numbers and rare words count double) and
+whether it contains the query's word pairs, so the chunk with the exact
+answer comes first.
+
+The BM25 index for a business is built from business_documents and cached
+(LRU). After the business's knowledge is re-ingested, on this worker or
+(in cluster mode) another, warm() rebuilds it in the background once
+ingestion has been quiet for LEXICAL_INDEX_WARM_DELAY seconds. An index
+older than LEXICAL_INDEX_TTL, or built before the latest re-ingest, keeps
+answering while it is rebuilt. Only a business with no index yet is built
+on the search path, once per business however many searches are waiting.
+"""
+import heapq
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from app.db import SessionLocal
+from app.models.document import BusinessDocument
+from app.services import rag_cache
+
+
+logger = logging.getLogger(__name__)
+
+
+RAG_FUSION = os.getenv("RAG_FUSION", "rrf")    # rrf | alpha
+RAG_HYBRID_ALPHA = float(os.getenv("RAG_HYBRID_ALPHA", "0.5"))
+RAG_RRF_K = int(os.getenv("RAG_RRF_K", "60"))
+RAG_RERANK = os.getenv("RAG_RERANK", "true").lower() == "true"
+RAG_RERANK_WEIGHT = float(os.getenv("RAG_RERANK_WEIGHT", "0.5"))
+LEXICAL_INDEX_MAX_BUSINESSES = int(os.getenv("LEXICAL_INDEX_MAX_BUSINESSES", "100"))
+LEXICAL_INDEX_TTL = int(os.getenv("LEXICAL_INDEX_TTL", "600"))
+LEXICAL_INDEX_WARM_DELAY = float(os.getenv("LEXICAL_INDEX_WARM_DELAY", "2"))
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_WORD = re.compile(r"[a-z0-9]+(?:[-./'][a-z0-9]+)*")
+_JOINERS = re.compile(r"[-./']")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from have how i in is it me my of on or "
+    "our so that the this to was we what when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> list:
+    """
+    Lowercased word tokens without stopwords. Words joined by - . / or '
+    are indexed both as parts and joined, so "555-0123", "5550123" and
+    "SKU AB-12" / "ab12" match each other.
+    """
+    tokens = []
+    for match in _WORD.finditer(text.lower()):
+        word = match.group()
+        parts = _JOINERS.split(word)
+        tokens.extend(part for part in parts if part not in _STOPWORDS)
+        if len(parts) > 1:
+            tokens.append("".join(parts))
+    return tokens
+
+
+class BM25Index:
+    """In-memory inverted index over a list of texts"""
+
+    def __init__(self, texts: list):
+        self.texts = texts
+        self.positions = {}
+        self.tokens = []    # per text, reused by rerank
+        self.lengths = []
+        self.postings = {}
+        for i, text in enumerate(texts):
+            tokens = tokenize(text)
+            self.positions[text] = i
+            self.tokens.append(tokens)
+            self.lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                self.postings.setdefault(term, []).append((i, tf))
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+
+    def tokens_of(self, text: str) -> list:
+        i = self.positions.get(text)
+        return self.tokens[i] if i is not None else tokenize(text)
+
+    def __len__(self):
+        return len(self.texts)
+
+    def search(self, query: str, limit: int) -> list:
+        """[(text, score)] best first"""
+        n = len(self.texts)
+        if not n:
+            return []
+        scores = {}
+        # Query order, not set order: float sums (and so ties) stay the same across runs
+        for term in dict.fromkeys(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for i, tf in postings:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[i] / self.avg_length)
+                scores[i] = scores.get(i, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [(self.texts[i], score) for i, score in best]
+
+
+_indexes = OrderedDict()    # business_id -> (generation, built_at, BM25Index)
+_index_lock = threading.Lock()
+_build_locks = {}           # business_id -> held while its index is built
+_warm_timers = {}           # business_id -> pending rebuild
+_warm_lock = threading.Lock()
+
+
+def _build_index(business_id: int) -> BM25Index:
+    db = SessionLocal()
+    try:
+        rows = db.query(BusinessDocument.text).filter(BusinessDocument.business_id == business_id).all()
+    finally:
+        db.close()
+    # The same chunk can be stored under several sources
+    texts = list(dict.fromkeys(row[0] for row in rows if row[0]))
+    return BM25Index(texts)
+
+
+def _rebuild(business_id: int) -> BM25Index:
+    # Read first: a change committed during the build bumps it again
+    generation = rag_cache.knowledge_generation(business_id)
+    started = time.perf_counter()
+    index = _build_index(business_id)
+    logger.info("🔤 Built lexical index for business %s: %s chunks in %.0fms",
+                business_id, len(index), (time.perf_counter() - started) * 1000)
+    with _index_lock:
+        _indexes[business_id] = (generation, time.monotonic(), index)
+        _indexes.move_to_end(business_id)
+        while len(_indexes) > LEXICAL_INDEX_MAX_BUSINESSES:
+            _indexes.popitem(last=False)
+    return index
+
+
+def _build_lock(business_id: int) -> threading.Lock:
+    with _index_lock:
+        return _build_locks.setdefault(business_id, threading.Lock())
+
+
+def get_index(business_id: int) -> BM25Index:
+    generation = rag_cache.knowledge_generation(business_id)
+    with _index_lock:
+        entry = _indexes.get(business_id)
+        if entry:
+            _indexes.move_to_end(business_id)
+            stale = entry[0] != generation
+            expired = not stale and time.monotonic() - entry[1] >= LEXICAL_INDEX_TTL
+            if expired:
+                # Refreshed once per TTL, in the background
+                _indexes[business_id] = (generation, time.monotonic(), entry[2])
+    if entry is None:
+        # Only a business with no index at all is built on the search path,
+        # once however many searches arrive together
+        with _build_lock(business_id):
+            with _index_lock:
+                entry = _indexes.get(business_id)
+            if entry is None:
+                return _rebuild(business_id)
+        return entry[2]
+    if expired:
+        warm(business_id, delay=0)
+    elif stale:
+        # Re-ingested: keep answering from the old index until the warm
+        # (usually already scheduled by the ingest) replaces it
+        _warm_if_idle(business_id)
+    return entry[2]
+
+
+def _warm_now(business_id: int, timer):
+    with _warm_lock:
+        if _warm_timers.get(business_id) is timer:
+            del _warm_timers[business_id]
+    try:
+        with _build_lock(business_id):
+            _rebuild(business_id)
+    except Exception as e:
+        logger.warning("⚠️  Could not rebuild lexical index for business %s: %s", business_id, e)
+
+
+def _schedule(business_id: int, delay: float):
+    """Start a rebuild timer; call with _warm_lock held"""
+    timer = threading.Timer(delay, lambda: _warm_now(business_id, timer))
+    timer.daemon = True
+    _warm_timers[business_id] = timer
+    timer.start()
+
+
+def warm(business_id: int, delay: float = None):
+    """
+    Rebuild a business's index in the background, so no live call waits
+    for it. Calls within `delay` seconds of each other (one per ingest
+    batch) coalesce into one rebuild after the last.
+    """
+    delay = LEXICAL_INDEX_WARM_DELAY if delay is None else delay
+    with _warm_lock:
+        pending = _warm_timers.get(business_id)
+        if pending is not None:
+            pending.cancel()
+        _schedule(business_id, delay)
+
+
+def _warm_if_idle(business_id: int):
+    """warm(), unless a rebuild is already pending or running"""
+    if _build_lock(business_id).locked():
+        return
+    with _warm_lock:
+        if business_id not in _warm_timers:
+            _schedule(business_id, LEXICAL_INDEX_WARM_DELAY)
+
+
+def invalidate(business_id: int = None):
+    with _index_lock:
+        if business_id is None:
+            _indexes.clear()
+        else:
+            _indexes.pop(business_id, None)
+
+
+def lexical_search(business_id: int, query: str, limit: int) -> list:
+    """[(text, score)] from the business's BM25 index (blocking on first use)"""
+    return get_index(business_id).search(query, limit)
+
+
+def _normalized(scores: dict) -> dict:
+    if not scores:
+        return {}
+    low, high = min(scores.values()), max(scores.values())
+    if high == low:
+        return {key: 1.0 for key in scores}
+    return {key: (value - low) / (high - low) for key, value in scores.items()}
+
+
+def fuse(vector_hits: list, lexical_hits: list, method: str = None, alpha: float = None) -> list:
+    """
+    Merge two [(text, score)] lists (best first) into one, keyed by text.
+    Returns [(text, fused score)] best first.
+    """
+    method = method or RAG_FUSION
+    alpha = RAG_HYBRID_ALPHA if alpha is None else alpha
+
+    fused = {}
+    if method == "alpha":
+        vector_scores = _normalized(dict(vector_hits))
+        lexical_scores = _normalized(dict(lexical_hits))
+        for text in dict.fromkeys([*vector_scores, *lexical_scores]):
+            fused[text] = alpha * vector_scores.get(text, 0.0) + (1 - alpha) * lexical_scores.get(text, 0.0)
+    else:
+        for hits in (vector_hits, lexical_hits):
+            for rank, (text, _) in enumerate(hits, start=1):
+                fused[text] = fused.get(text, 0.0) + 1.0 / (RAG_RRF_K + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+def _term_weight(term: str, index: BM25Index = None) -> float:
+    if any(ch.isdigit() for ch in term):
+        return 2.0
+    if index is not None and len(index) and len(index.postings.get(term, ())) <= max(1, len(index) // 20):
+        return 2.0
+    return 1.0
+
+
+def rerank(query: str, candidates: list, index: BM25Index = None, weight: float = None) -> list:
+    """
+    Reorder [(text, score)] by query-term coverage and word-pair matches,
+    blended with the fused score. Cheap: no model, just set lookups.
+    """
+    weight = RAG_RERANK_WEIGHT if weight is None else weight
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms or not candidates:
+        return candidates
+
+    weights = {term: _term_weight(term, index) for term in terms}
+    total = sum(weights.values())
+    pairs = {(a, b) for a, b in zip(terms, terms[1:])}
+    fused = _normalized(dict(candidates))
+
+    rescored = []
+    for text, _ in candidates:
+        tokens = index.tokens_of(text) if index is not None else tokenize(text)
+        present = set(tokens)
+        coverage = sum(w for term, w in weights.items() if term in present) / total
+        if pairs:
+            text_pairs = set(zip(tokens, tokens[1:]))
+            coverage = 0.8 * coverage + 0.2 * len(pairs & text_pairs) / len(pairs)
+        rescored.append((text, weight * coverage + (1 - weight) * fused[text]))
+    return sorted(rescored, key=lambda item: item[1], reverse=True)
+
+
+def combine(query: str, vector_hits: list, lexical_hits: list, limit: int,
+            index: BM25Index = None, method: str = None, alpha: float = None, use_rerank: bool = None) -> list:
+    """Fuse, optionally rerank, and cut to `limit`; returns texts best first"""
+    candidates = fuse(vector_hits, lexical_hits, method, alpha)
+    if RAG_RERANK if use_rerank is None else use_rerank:
+        candidates = rerank(query, candidates, index)
+    return [text for text, _ in candidates[:limit]]
@@ -0,0 +1,148 @@
+"""
+Inbound Silence Suppression
+Optional local VAD on the caller's audio (INBOUND_VAD=true). Every Twilio
+media frame used to be appended to the Realtime input buffer, including
+long stretches of silence and line noise, which cost bandwidth and input
+audio tokens for nothing.
+
+Each frame's level (dBFS) is computed from its μ-law bytes with a lookup
+table, vectorized over the samples and frames in a payload. A frame is
+speech when it is at or above INBOUND_VAD_THRESHOLD_DB.
+
+  - speech, and silence up to INBOUND_VAD_HANGOVER_MS after it, is
+    forwarded. The hangover must stay above the server VAD's
+    silence_duration_ms (realtime_pool.BASE_SESSION; the default is 300ms
+    more), or OpenAI never sees the caller stop talking and the turn
+    never ends.
+  - silence beyond the hangover is dropped, but the last
+    INBOUND_VAD_PREFIX_MS of it is held back and sent ahead of the next
+    speech, so the start of the first word isn't clipped.
+
+Energy alone can't tell hold music from speech; loud noise is forwarded.
+"""
+import base64
+import logging
+import os
+from collections import Counter, deque
+import numpy as np
+from app.services.realtime_pool import BASE_SESSION
+
+
+logger = logging.getLogger(__name__)
+
+
+INBOUND_VAD = os.getenv("INBOUND_VAD", "false").lower() == "true"
+INBOUND_VAD_THRESHOLD_DB = float(os.getenv("INBOUND_VAD_THRESHOLD_DB", "-45"))
+_SERVER_SILENCE_MS = BASE_SESSION["turn_detection"]["silence_duration_ms"]
+INBOUND_VAD_HANGOVER_MS = int(os.getenv("INBOUND_VAD_HANGOVER_MS", str(_SERVER_SILENCE_MS + 300)))
+INBOUND_VAD_PREFIX_MS = int(os.getenv("INBOUND_VAD_PREFIX_MS", "300"))
+
+if INBOUND_VAD and INBOUND_VAD_HANGOVER_MS <= _SERVER_SILENCE_MS:
+    logger.warning(f"⚠️  INBOUND_VAD_HANGOVER_MS ({INBOUND_VAD_HANGOVER_MS}) is not above the server VAD's "
+                   f"silence_duration_ms ({_SERVER_SILENCE_MS}); caller turns may never end")
+
+# 8kHz μ-law: one byte per sample, 20ms per Twilio frame
+ULAW_BYTES_PER_MS = 8
+FRAME_BYTES = 160
+
+_stats = Counter()
+
+
+def _ulaw_decode_table() -> np.ndarray:
+    """G.711 μ-law byte -> 16-bit linear sample"""
+    u = ~np.arange(256, dtype=np.uint8)
+    exponent = (u >> 4) & 0x07
+    mantissa = u & 0x0F
+    magnitude = ((mantissa.astype(np.int32) << 3) + 0x84) << exponent
+    sample = magnitude - 0x84
+    return np.where(u & 0x80, -sample, sample).astype(np.int16)
+
+
+ULAW_TO_LINEAR = _ulaw_decode_table()
+# Squared sample / full scale², so a mean over a frame is its power
+_ULAW_POWER = (ULAW_TO_LINEAR.astype(np.float64) / 32768.0) ** 2
+
+
+def frame_power(audio: bytes, frame_bytes: int = FRAME_BYTES) -> np.ndarray:
+    """Mean power of each frame_bytes frame of μ-law audio (a short tail is its own frame)"""
+    samples = np.frombuffer(audio, dtype=np.uint8)
+    whole = len(samples) - len(samples) % frame_bytes
+    power = _ULAW_POWER[samples[:whole]].reshape(-1, frame_bytes).mean(axis=1)
+    if whole < len(samples):
+        power = np.append(power, _ULAW_POWER[samples[whole:]].mean())
+    return power
+
+
+def frame_levels(audio: bytes, frame_bytes: int = FRAME_BYTES) -> np.ndarray:
+    """dBFS of each frame"""
+    return 10 * np.log10(frame_power(audio, frame_bytes) + 1e-10)
+
+
+class InboundVad:
+    """Silence suppression state for one call's inbound audio"""
+
+    def __init__(self, threshold_db: float = None, hangover_ms: int = None, prefix_ms: int = None):
+        self.threshold_db = INBOUND_VAD_THRESHOLD_DB if threshold_db is None else threshold_db
+        # Compared against frame power directly, without a log per frame
+        self._threshold_power = 10 ** (self.threshold_db / 10)
+        self.hangover_ms = INBOUND_VAD_HANGOVER_MS if hangover_ms is None else hangover_ms
+        prefix_ms = INBOUND_VAD_PREFIX_MS if prefix_ms is None else prefix_ms
+        # Until the caller first speaks there is nothing to hang over
+        self._silent_ms = self.hangover_ms + 1
+        self._prefix = deque()     # (payload, ms) of held-back silence
+        self._prefix_ms = 0
+        self._max_prefix_ms = prefix_ms
+        self.frames = 0
+        self.suppressed = 0
+
+    def process(self, payload: str) -> list:
+        """Base64 payloads to forward for one inbound media payload, in order"""
+        audio = base64.b64decode(payload)
+        duration_ms = len(audio) // ULAW_BYTES_PER_MS
+        self.frames += 1
+        if audio and self._is_speech(audio):
+            forward = [held for held, _ in self._prefix] + [payload]
+            self._prefix.clear()
+            self._prefix_ms = 0
+            self._silent_ms = 0
+            return forward
+
+        self._silent_ms += duration_ms
+        if self._silent_ms <= self.hangover_ms:
+            return [payload]
+        # Silence past the hangover: keep only the most recent prefix_ms of it
+        self._prefix.append((payload, duration_ms))
+        self._prefix_ms += duration_ms
+        while self._prefix and self._prefix_ms > self._max_prefix_ms:
+            _, dropped_ms = self._prefix.popleft()
+            self._prefix_ms -= dropped_ms
+            self.suppressed += 1
+        return []
+
+    def _is_speech(self, audio: bytes) -> bool:
+        if len(audio) <= FRAME_BYTES:
+            # One frame, as Twilio sends them: a sum against a scaled threshold is the cheapest test
+            samples = np.frombuffer(audio, dtype=np.uint8)
+            return _ULAW_POWER.take(samples).sum() >= self._threshold_power * len(samples)
+        return frame_power(audio).max() >= self._threshold_power
+
+    def close(self):
+        """Count this call's frames into the worker totals"""
+        # Frames still held as prefix were never sent
+        self.suppressed += len(self._prefix)
+        self._prefix.clear()
+        _stats["calls"] += 1
+        _stats["frames"] += self.frames
+        _stats["suppressed"] += self.suppressed
+        if self.frames:
+            logger.info("🔇 Inbound VAD suppressed %d of %d frames (%.0f%%)",
+                        self.suppressed, self.frames, 100 * self.suppressed / self.frames)
+
+
+def stats() -> dict:
+    return {
+        "enabled": INBOUND_VAD,
+        "calls": _stats["calls"],
+        "frames": _stats["frames"],
+        "suppressed": _stats["suppressed"],
+    }
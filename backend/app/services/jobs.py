@@ -0,0 +1,229 @@
+"""
+In-process Background Job Runner
+Runs blocking work (business sync, ingestion) on a bounded worker pool
+so it never holds up request handling, and keeps each job's status and
+progress for the status endpoints.
+
+Jobs with a key are deduplicated within this process; in cluster mode
+they also take a Redis lock on the key, so the same job never runs on two
+workers at once. A job whose key is held by another worker never waits
+in the pool: it is skipped, since that worker is doing the same work, or
+requeued after JOB_RETRY_INTERVAL if it carries its own input (uploads).
+"""
+import logging
+import os
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services import cluster
+
+
+logger = logging.getLogger(__name__)
+
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_HISTORY_LIMIT = int(os.getenv("JOB_HISTORY_LIMIT", "200"))
+JOB_RETRY_INTERVAL = float(os.getenv("JOB_RETRY_INTERVAL", "5"))
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+SKIPPED = "skipped"
+
+# What a job does when another worker holds its key
+SKIP = "skip"
+RETRY = "retry"
+
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job function to stop after a cancel request"""
+
+
+class Job:
+    def __init__(self, kind: str, key: str = None, on_conflict: str = SKIP):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.key = key
+        self.on_conflict = on_conflict
+        self.status = QUEUED
+        self.progress = {}
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def check_cancelled(self):
+        """Call between units of work to honour cancel requests"""
+        if self.cancelled:
+            raise JobCancelled()
+
+    def update(self, **progress):
+        self.progress.update(progress)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "key": self.key,
+            "status": self.status,
+            "progress": dict(self.progress),
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+_executor = None
+_jobs = OrderedDict()
+_lock = threading.Lock()
+
+
+def start():
+    """Start the worker pool (called from the app lifespan)"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+
+
+def shutdown():
+    """Cancel queued jobs and stop accepting new ones"""
+    global _executor
+    with _lock:
+        for job in _jobs.values():
+            if job.status in ACTIVE_STATES:
+                job.cancel()
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _claim(job: Job, lock, fn, args, kwargs) -> bool:
+    """
+    Take the job's cluster lock. False if another worker has the key; the
+    job is then skipped or put back on a timer, never left holding a pool
+    thread while it waits.
+    """
+    if job.on_conflict == SKIP and lock.started_since(job.created_at):
+        reason = "already ran on another worker"
+    elif lock.acquire():
+        return True
+    else:
+        reason = "running on another worker"
+
+    if job.on_conflict == RETRY:
+        job.update(waiting=reason)
+        timer = threading.Timer(JOB_RETRY_INTERVAL, _resubmit, args=(job, fn, args, kwargs))
+        timer.daemon = True
+        timer.start()
+    else:
+        job.status = SKIPPED
+        job.result = {"skipped": reason}
+        job.finished_at = time.time()
+        logger.info(f"⏭️  Job {job.kind} ({job.key}) skipped: {reason}")
+    return False
+
+
+def _resubmit(job: Job, fn, args, kwargs):
+    executor = _executor
+    try:
+        if executor is not None and not job.cancelled:
+            executor.submit(_run, job, fn, args, kwargs)
+            return
+    except RuntimeError:
+        pass    # shut down in between
+    job.status = CANCELLED
+    job.finished_at = time.time()
+
+
+def _run(job: Job, fn, args, kwargs):
+    if job.cancelled:
+        job.status = CANCELLED
+        job.finished_at = time.time()
+        return
+
+    lock = cluster.JobLock(job.key) if job.key else None
+    if lock is not None and not _claim(job, lock, fn, args, kwargs):
+        return
+
+    try:
+        job.progress.pop("waiting", None)
+        job.status = RUNNING
+        job.started_at = time.time()
+        job.result = fn(job, *args, **kwargs)
+        job.status = CANCELLED if job.cancelled else COMPLETED
+    except JobCancelled:
+        job.status = CANCELLED
+    except Exception as e:
+        job.status = FAILED
+        job.error = str(e)
+        logger.error(f"❌ Job {job.kind} ({job.key or job.id}) failed: {e}", exc_info=True)
+    finally:
+        job.finished_at = time.time()
+        if lock is not None:
+            lock.release()
+
+
+def _prune():
+    finished = [job_id for job_id, job in _jobs.items() if job.status not in ACTIVE_STATES]
+    for job_id in finished[:max(0, len(_jobs) - JOB_HISTORY_LIMIT)]:
+        del _jobs[job_id]
+
+
+def submit(kind: str, fn, *args, key: str = None, on_conflict: str = SKIP, **kwargs) -> Job:
+    """
+    Queue fn(job, *args, **kwargs) on the worker pool.
+
+    If a job with the same key is already queued or running, that job is
+    returned instead of starting a duplicate. on_conflict (SKIP or RETRY)
+    says what happens when another worker is running the key.
+    """
+    start()
+    with _lock:
+        if key:
+            for job in _jobs.values():
+                if job.key == key and job.status in ACTIVE_STATES:
+                    return job
+
+        job = Job(kind, key, on_conflict)
+        _jobs[job.id] = job
+        _prune()
+
+    _executor.submit(_run, job, fn, args, kwargs)
+    return job
+
+
+def get_job(job_id: str):
+    return _jobs.get(job_id)
+
+
+def list_jobs(kind: str = None) -> list:
+    with _lock:
+        jobs = list(_jobs.values())
+    if kind:
+        jobs = [job for job in jobs if job.kind == kind]
+    return jobs
+
+
+def cancel_job(job_id: str):
+    job = _jobs.get(job_id)
+    if job and job.status in ACTIVE_STATES:
+        job.cancel()
+    return job
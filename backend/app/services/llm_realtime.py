@@ -2,21 +2,62 @@ import os
 import json
 import asyncio
 import logging
-from openai import AsyncOpenAI
-from app.services.rag_service import search_knowledge
-from app.services.business_service import get_business_by_id
-from app.db import SessionLocal
+from app.services.rag_service import search_knowledge_async
+from app.services.rag_prefetch import CallPrefetcher
+from app.services.playback import CallPlayback
+from app.services import inbound_vad
+from app.services.realtime_pool import realtime_session
+from app.services.session_config import get_session_update, rag_search_enabled
+from app.services.business_directory import resolve_by_id
+from app.services.media_frames import (
+    OutboundMediaEncoder,
+    encode_audio_append,
+    extract_media_payload,
+    iter_realtime_events,
+    send_raw,
+)
+from app.logging_config import bind_call_context, log_sampled
 from fastapi import WebSocket
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
+# Max seconds a caller waits on a knowledge lookup before the model gets a fallback
+RAG_TOOL_TIMEOUT = float(os.getenv("RAG_TOOL_TIMEOUT", "3.0"))
+RAG_TOOL_FALLBACK = (
+    "The knowledge base is not responding right now. Apologize briefly, "
+    "answer from what you already know if you can, or offer to take a message "
+    "or transfer the call."
+)
 
-def log(msg):
-    logger.info(msg)
-    print(msg, flush=True)
+
+async def answer_rag_search(openai_ws, business_id: int, call_id: str, query: str, prefetcher: CallPrefetcher = None):
+    """Run a rag_search tool call and send its output back to the model"""
+    search = prefetcher.search(query) if prefetcher else search_knowledge_async(business_id, query)
+    try:
+        results = await asyncio.wait_for(search, timeout=RAG_TOOL_TIMEOUT)
+        output = {
+            "results": results[:3] if results else [],
+            "count": len(results) if results else 0
+        }
+    except asyncio.TimeoutError:
+        logger.warning("⏱️ rag_search timed out after %ss: %s", RAG_TOOL_TIMEOUT, query)
+        output = {"results": [], "count": 0, "error": RAG_TOOL_FALLBACK}
+    except Exception as e:
+        logger.error("❌ rag_search failed: %s", e, exc_info=True)
+        output = {"results": [], "count": 0, "error": RAG_TOOL_FALLBACK}
+
+    try:
+        await openai_ws.conversation.item.create(
+            item={
+                "type": "function_call_output",
+                "call_id": call_id,
+                "output": json.dumps(output)
+            }
+        )
+        await openai_ws.response.create()
+    except Exception as e:
+        logger.error("❌ Error sending rag_search result: %s", e)
 
 
 async def handle_realtime_audio(websocket: WebSocket, business_id: int, initial_stream_sid: str = None):
@@ -24,24 +65,27 @@ async def handle_realtime_audio(websocket: WebSocket, business_id: int, initial_
     Main pipeline: Twilio WS <-> this function <-> OpenAI Realtime WS
     """
     
-    log(f"🔄 Starting GPT Realtime session for business_id={business_id}...")
+    bind_call_context(business_id=business_id, stream_sid=initial_stream_sid)
+    logger.info("🔄 Starting GPT Realtime session")
 
-    # Load business settings
-    db = SessionLocal()
-    business = get_business_by_id(db, business_id)
-    db.close()
+    # Business settings come from the routing table /call/inbound already used
+    business = await resolve_by_id(business_id)
 
     if not business:
-        log(f"❌ Business {business_id} not found!")
+        logger.warning("❌ Business %s not found", business_id)
         await websocket.close()
         return
     
-    log(f"✅ Business loaded: {business.name}")
+    logger.info("✅ Business loaded: %s", business.name)
+    rag_enabled = rag_search_enabled(business)
 
     # Track Twilio stream
     stream_sid = initial_stream_sid
     twilio_connected = asyncio.Event()
     
+    # Outbound audio position, for barge-in; set once the stream is known
+    playback = None
+    
     # Track call start time for 90 second limit
     import time
     call_start_time = time.time()
@@ -49,106 +93,59 @@ async def handle_realtime_audio(websocket: WebSocket, business_id: int, initial_
     
     # If we already have stream_sid, mark as connected
     if stream_sid:
-        log(f"✅ Twilio already connected (streamSid={stream_sid})")
+        logger.debug("✅ Twilio already connected")
         twilio_connected.set()
 
     try:
-        log("🔌 Connecting to OpenAI Realtime API...")
-        async with client.beta.realtime.connect(
-            model=os.getenv("OPENAI_MODEL_REALTIME", "gpt-4o-realtime-preview-2024-12-17")
-        ) as openai_ws:
-            log("🤖 GPT Realtime session established!")
+        logger.debug("🔌 Connecting to OpenAI Realtime API...")
+        async with realtime_session() as openai_ws:
+            logger.info("🤖 GPT Realtime session established")
             
-            # Configure session
-            log("📝 Configuring OpenAI session with g711_ulaw audio format...")
-            await openai_ws.session.update(
-                session={
-                    "modalities": ["text", "audio"],
-                    "instructions": f"""CRITICAL FIRST MESSAGE: When the call starts, you MUST say EXACTLY: "This is the DEMO for AI Receptionist. Would you like to learn what I can do?" and nothing else first. DO NOT say "thanks for calling" or mention any business name.
-
-You are the AI receptionist for {business.name or 'the business'}.
-Tone: {business.tone or 'friendly and helpful'}
-Instructions: {business.instructions or 'Be helpful and answer questions professionally.'}
-
-If a caller asks business-related questions, check RAG memory using function: rag_search.
-
-Allowed actions: {json.dumps(business.allowed_actions or {})}""",
-                    "voice": "shimmer",
-                    "input_audio_format": "g711_ulaw",
-                    "output_audio_format": "g711_ulaw",
-                    "input_audio_transcription": {"model": "whisper-1"},
-                    "turn_detection": {
-                        "type": "server_vad",
-                        "threshold": 0.6,
-                        "prefix_padding_ms": 500,
-                        "silence_duration_ms": 1000
-                    },
-                    "tools": [
-                        {
-                            "type": "function",
-                            "name": "rag_search",
-                            "description": "Search business knowledge base",
-                            "parameters": {
-                                "type": "object",
-                                "properties": {
-                                    "query": {"type": "string", "description": "Search query"}
-                                },
-                                "required": ["query"]
-                            }
-                        },
-                        {
-                            "type": "function",
-                            "name": "transfer_call",
-                            "description": "Transfer call to forwarding number",
-                            "parameters": {"type": "object", "properties": {}}
-                        },
-                        {
-                            "type": "function",
-                            "name": "end_call",
-                            "description": "End the call when the caller is done or when the demo time limit is reached. Use this when the caller says goodbye, thanks, or indicates they're finished, or when you've reached the 1 minute 30 second time limit.",
-                            "parameters": {"type": "object", "properties": {}}
-                        }
-                    ],
-                    "tool_choice": "auto"
-                }
-            )
-            log("✅ Session configured: g711_ulaw, voice=alloy")
+            # Shared settings (audio formats, voice, VAD) were applied when the
+            # connection was opened; only the business-specific parts go here,
+            # precompiled once per business version
+            await send_raw(openai_ws, get_session_update(business))
+            logger.debug("✅ Session configured for %s", business.name)
 
             async def openai_to_twilio():
                 """AI → Twilio (audio out)"""
-                log("📤 openai_to_twilio loop started")
+                nonlocal playback
                 
                 # Wait for Twilio stream to be ready
                 await twilio_connected.wait()
-                log("✅ Twilio connected, starting to send AI audio")
+                logger.debug("✅ Twilio connected, starting to send AI audio")
+                
+                # In-flight tool calls, kept referenced until they finish
+                pending_tools = set()
                 
-                # Track timestamp for outbound audio
-                import time
-                timestamp_ms = 0
+                # Envelope for outbound audio, encoded once per stream;
+                # playback re-frames and paces it out to Twilio
+                media_encoder = OutboundMediaEncoder(stream_sid)
+                playback = CallPlayback(websocket, openai_ws, media_encoder)
+                
+                # Knowledge lookups started from the caller's transcripts, ahead of the tool call
+                prefetcher = CallPrefetcher(business_id) if rag_enabled else None
                 
                 try:
-                    async for event in openai_ws:
+                    async for event in iter_realtime_events(openai_ws):
                         event_type = event.type
                         
                         # Send audio to Twilio
                         if event_type == "response.audio.delta":
-                            if hasattr(event, 'delta') and event.delta and stream_sid:
-                                # Send as Twilio media message (audio is base64 from OpenAI)
-                                payload = event.delta
-                                print(f"🔊 Sending {len(payload)} bytes at timestamp {timestamp_ms}", flush=True)
-                                
-                                await websocket.send_text(json.dumps({
-                                    "event": "media",
-                                    "streamSid": stream_sid,
-                                    "media": {
-                                        "payload": payload,
-                                        "timestamp": str(timestamp_ms)
-                                    }
-                                }))
-                                
-                                # Increment timestamp (20ms per chunk for 8khz mulaw)
-                                timestamp_ms += 20
-                                print(f"✅ Sent to Twilio", flush=True)
+                            if event.delta:
+                                # Queued as 20ms Twilio media frames (audio is base64 from OpenAI),
+                                # unless the caller already interrupted this item
+                                await playback.send_audio(event.item_id, event.delta)
+                        elif event_type == "response.audio.done":
+                            playback.end_item()
+                        
+                        # Caller started talking over the AI
+                        elif event_type == "input_audio_buffer.speech_started":
+                            await playback.on_speech_started()
+                        elif event_type == "response.created":
+                            playback.on_response_created()
+                        elif event_type == "response.done":
+                            playback.on_response_done()
                         
                         # Handle function calls
                         elif event_type == "response.function_call_arguments.done":
@@ -156,18 +153,12 @@ Allowed actions: {json.dumps(business.allowed_actions or {})}""",
                             args = json.loads(event.arguments)
                             
                             if function_name == "rag_search":
-                                results = search_knowledge(business_id, args.get("query", ""))
-                                await openai_ws.conversation.item.create(
-                                    item={
-                                        "type": "function_call_output",
-                                        "call_id": event.call_id,
-                                        "output": json.dumps({
-                                            "results": results[:3] if results else [],
-                                            "count": len(results) if results else 0
-                                        })
-                                    }
+                                # Answer in the background so this call keeps streaming events
+                                task = asyncio.create_task(
+                                    answer_rag_search(openai_ws, business_id, event.call_id, args.get("query", ""), prefetcher)
                                 )
-                                await openai_ws.response.create()
+                                pending_tools.add(task)
+                                task.add_done_callback(pending_tools.discard)
                             
                             elif function_name == "transfer_call":
                                 if business.forwarding_number:
@@ -177,7 +168,7 @@ Allowed actions: {json.dumps(business.allowed_actions or {})}""",
                                     }))
                             
                             elif function_name == "end_call":
-                                log("📞 AI requested to end the call")
+                                logger.info("📞 AI requested to end the call")
                                 await websocket.send_text(json.dumps({
                                     "event": "stop"
                                 }))
@@ -187,25 +178,39 @@ Allowed actions: {json.dumps(business.allowed_actions or {})}""",
                         
                         # Log transcriptions
                         elif event_type == "conversation.item.input_audio_transcription.completed":
-                            log(f"[USER]: {event.transcript}")
-                        elif event_type == "response.text.delta":
-                            print(f"[AI]: {event.delta}", end="", flush=True)
+                            logger.info("[USER]: %s", event.transcript)
+                            if prefetcher:
+                                prefetcher.on_transcript(event.transcript)
                         elif event_type == "response.text.done":
-                            print()
+                            logger.debug("[AI]: %s", event.text)
                             
                 except Exception as e:
-                    log(f"❌ Error in openai_to_twilio: {e}")
-                    import traceback
-                    traceback.print_exc()
+                    logger.error("❌ Error in openai_to_twilio: %s", e, exc_info=True)
+                finally:
+                    # Lookups still running would only answer a closed socket
+                    for task in list(pending_tools):
+                        task.cancel()
+                    playback.close()
+                    if prefetcher:
+                        prefetcher.close()
 
             async def twilio_to_openai():
                 """Twilio → GPT (audio in)"""
                 nonlocal stream_sid
-                log("📥 twilio_to_openai loop started")
+                
+                # Optional local silence suppression before audio goes to OpenAI
+                vad = inbound_vad.InboundVad() if inbound_vad.INBOUND_VAD else None
+                
+                async def forward_audio(payload: str):
+                    if vad is None:
+                        await send_raw(openai_ws, encode_audio_append(payload))
+                        return
+                    for frame in vad.process(payload):
+                        await send_raw(openai_ws, encode_audio_append(frame))
                 
                 # Send greeting immediately if stream is already ready
                 if stream_sid:
-                    log("📣 Sending greeting trigger...")
+                    logger.debug("📣 Sending greeting trigger...")
                     try:
                         await openai_ws.conversation.item.create(
                             item={
@@ -215,67 +220,83 @@ Allowed actions: {json.dumps(business.allowed_actions or {})}""",
                             }
                         )
                         await openai_ws.response.create()
-                        log("✅ Greeting triggered!")
+                        logger.debug("✅ Greeting triggered")
                     except Exception as e:
-                        log(f"❌ Error sending greeting: {e}")
+                        logger.error("❌ Error sending greeting: %s", e)
                 
                 try:
                     while True:
                         message = await websocket.receive()
                         
                         if "text" in message:
+                            # Media frames skip JSON parsing entirely
+                            payload = extract_media_payload(message["text"])
+                            if payload:
+                                await forward_audio(payload)
+                                continue
+                            
                             try:
                                 data = json.loads(message["text"])
                                 event = data.get("event")
                                 
                                 if event == "connected":
-                                    log("🔗 Twilio connected")
+                                    logger.debug("🔗 Twilio connected")
                                     continue
                                 
                                 if event == "start":
                                     # Update stream_sid if it wasn't set initially
                                     if not stream_sid:
                                         stream_sid = data.get('start', {}).get('streamSid') or data.get('streamSid')
-                                        log(f"▶️ Twilio stream started (streamSid={stream_sid})")
+                                        bind_call_context(stream_sid=stream_sid)
+                                        logger.info("▶️ Twilio stream started")
                                         twilio_connected.set()
                                     continue
                                 
+                                if event == "mark":
+                                    # Audio up to this mark has played
+                                    if playback:
+                                        playback.on_mark(data.get("mark", {}).get("name"))
+                                    continue
+                                
                                 if event == "stop":
-                                    log("⏹ Twilio stream stopped")
+                                    logger.info("⏹ Twilio stream stopped")
                                     break
                                 
                                 if event == "media":
                                     payload = data.get("media", {}).get("payload", "")
                                     if payload:
                                         # Payload is base64 from Twilio
-                                        await openai_ws.input_audio_buffer.append(audio=payload)
+                                        await forward_audio(payload)
                                     continue
                                     
                             except json.JSONDecodeError:
                                 pass
                             except Exception as ex:
-                                log(f"⚠️ Error processing message: {ex}")
-                                import traceback
-                                traceback.print_exc()
+                                # Can repeat for every frame, so sample it
+                                log_sampled(
+                                    logger, logging.WARNING, (stream_sid, "message_error"),
+                                    "⚠️ Error processing message: %s", ex
+                                )
                         
                         elif "bytes" in message:
                             # Handle raw bytes (for testing)
                             import base64
                             audio_bytes = message["bytes"]
                             audio_b64 = base64.b64encode(audio_bytes).decode('utf-8')
-                            await openai_ws.input_audio_buffer.append(audio=audio_b64)
+                            await send_raw(openai_ws, encode_audio_append(audio_b64))
                                 
                 except Exception as e:
-                    log(f"❌ Error in twilio_to_openai: {e}")
-                    import traceback
-                    traceback.print_exc()
+                    logger.error("❌ Error in twilio_to_openai: %s", e, exc_info=True)
+                finally:
+                    if vad:
+                        vad.close()
 
             # Timer task to end call after 90 seconds
             async def call_timer():
                 """End call after 90 seconds"""
                 await asyncio.sleep(CALL_DURATION_LIMIT)
                 elapsed = time.time() - call_start_time
-                log(f"⏰ Call duration limit reached ({elapsed:.1f}s), ending call...")
+                logger.info("⏰ Call duration limit reached (%.1fs), ending call", elapsed)
                 try:
                     await websocket.send_text(json.dumps({
                         "event": "stop"
@@ -284,22 +305,26 @@ Allowed actions: {json.dumps(business.allowed_actions or {})}""",
                 except:
                     pass
             
-            # Run all tasks concurrently
-            log("🚀 Starting audio bridge...")
+            # Run all tasks concurrently. Whichever finishes first ends the
+            # call (Twilio stop or hangup, end_call, the time limit); the
+            # others are cancelled so the call's slot is released right away
+            tasks = [
+                asyncio.create_task(twilio_to_openai()),
+                asyncio.create_task(openai_to_twilio()),
+                asyncio.create_task(call_timer()),
+            ]
             try:
-                await asyncio.gather(
-                    twilio_to_openai(),
-                    openai_to_twilio(),
-                    call_timer(),
-                    return_exceptions=True
-                )
-            except Exception as e:
-                log(f"⚠️ Task completed with exception: {e}")
-            log("✅ Audio bridge completed")
+                await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for task in tasks:
+                    task.cancel()
+                results = await asyncio.gather(*tasks, return_exceptions=True)
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.warning("⚠️ Task completed with exception: %s", result)
+            logger.info("✅ Audio bridge completed")
             
     except Exception as e:
-        log(f"❌ Error in realtime session: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("❌ Error in realtime session: %s", e, exc_info=True)
         await websocket.close()
         
\ No newline at end of file
@@ -0,0 +1,354 @@
+"""
+Local Vector Store
+In-process replacement for the Weaviate client (VECTOR_STORE=local), for
+deployments where every business has a few thousand chunks at most and a
+network hop per search costs more than the search itself.
+
+It implements the part of the weaviate v4 client API rag_service uses
+(collections, tenants, data.insert_many / delete_many, query.near_vector),
+so get_weaviate_client() can return it unchanged. Every business is a
+tenant with its own directory:
+
+    VECTOR_STORE_DIR/<collection>/<tenant>/     (default backend/data/vectors)
+        vectors-<n>.f32   float32 rows, L2-normalized when written, appended to
+        log.jsonl         one line per put/delete; the first line names the
+                          vectors file and dimensions
+        lock              serializes writers across processes
+
+Search memory-maps the vectors file and scores every row with one
+matrix-vector product (exact top-k, cosine distance like Weaviate). A
+tenant is loaded on its first search and kept in an LRU of
+VECTOR_STORE_MAX_TENANTS. Other workers' writes are picked up by replaying
+the log's new lines before each search. When deleted or replaced rows
+outnumber live ones, the tenant is compacted into a new vectors file.
+"""
+import fcntl
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from types import SimpleNamespace
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+# Must survive restarts: the ingestion ledger in Postgres records every
+# chunk as stored, so vectors lost with the directory are never re-embedded
+VECTOR_STORE_DIR = os.getenv(
+    "VECTOR_STORE_DIR", os.path.join(os.path.dirname(__file__), "..", "..", "data", "vectors")
+)
+VECTOR_STORE_MAX_TENANTS = int(os.getenv("VECTOR_STORE_MAX_TENANTS", "500"))
+VECTOR_STORE_COMPACT_MIN = int(os.getenv("VECTOR_STORE_COMPACT_MIN", "1000"))
+
+_ROW_BYTES = np.dtype(np.float32).itemsize
+
+
+class TenantStore:
+    """Vectors and properties of one tenant, backed by its directory"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.dims = None
+        self.vectors_file = None
+        self.matrix = np.empty((0, 0), dtype=np.float32)
+        self.alive = np.zeros(0, dtype=bool)
+        self.rows = {}          # object id -> row
+        self.properties = {}    # row -> properties
+        self._log_inode = None
+        self._log_offset = 0
+
+    @property
+    def _log_path(self):
+        return os.path.join(self.path, "log.jsonl")
+
+    def _apply(self, record: dict):
+        op = record["op"]
+        if op == "init":
+            self.dims = record["dims"]
+            self.vectors_file = record["vectors"]
+        elif op == "put":
+            old = self.rows.pop(record["id"], None)
+            if old is not None:
+                self.properties.pop(old, None)
+            self.rows[record["id"]] = record["row"]
+            self.properties[record["row"]] = record["properties"]
+        elif op == "delete":
+            old = self.rows.pop(record["id"], None)
+            if old is not None:
+                self.properties.pop(old, None)
+
+    def _refresh(self):
+        """Replay log lines written since the last look (by any process)"""
+        try:
+            stat = os.stat(self._log_path)
+        except FileNotFoundError:
+            return
+        if stat.st_ino != self._log_inode:
+            # New tenant, or compacted by another process
+            self._reset()
+            self._log_inode = stat.st_ino
+        elif stat.st_size == self._log_offset:
+            return
+
+        with open(self._log_path, "rb") as f:
+            f.seek(self._log_offset)
+            data = f.read()
+        # A writer may be mid-line; only complete lines are applied
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            self._apply(json.loads(line))
+        self._log_offset += end
+        self._remap()
+
+    def _remap(self):
+        if self.vectors_file is None:
+            return
+        path = os.path.join(self.path, self.vectors_file)
+        count = os.path.getsize(path) // (self.dims * _ROW_BYTES)
+        if count != len(self.matrix):
+            self.matrix = np.memmap(path, dtype=np.float32, mode="r", shape=(count, self.dims)) if count else \
+                np.empty((0, self.dims), dtype=np.float32)
+        alive = np.zeros(count, dtype=bool)
+        if self.rows:
+            alive[np.fromiter(self.rows.values(), dtype=np.intp, count=len(self.rows))] = True
+        self.alive = alive
+
+    def search(self, vector, limit: int) -> list:
+        """[(properties, cosine distance)] nearest first"""
+        with self._lock:
+            self._refresh()
+            matrix, alive, properties = self.matrix, self.alive, self.properties
+        if not len(matrix) or not alive.any():
+            return []
+
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-9)
+        scores = np.asarray(matrix @ query)
+        scores[~alive] = -np.inf
+        limit = min(limit, int(alive.sum()))
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+        # put/delete pop rows from the dict in place; rows gone since the
+        # snapshot were deleted or replaced meanwhile and are left out
+        with self._lock:
+            hits = [(properties.get(row), 1.0 - float(scores[row])) for row in top.tolist()]
+        return [(props, distance) for props, distance in hits if props is not None]
+
+    def _locked(self):
+        os.makedirs(self.path, exist_ok=True)
+        lock = open(os.path.join(self.path, "lock"), "a")
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        return lock
+
+    def _append_log(self, records: list):
+        with open(self._log_path, "ab") as f:
+            f.write(b"".join(json.dumps(record).encode() + b"\n" for record in records))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def put(self, objects: list) -> dict:
+        """Write (id, properties, vector) triples; returns {index: error} for rejected ones"""
+        errors = {}
+        with self._lock, self._locked():
+            self._refresh()
+            records = []
+            if self.dims is None and objects:
+                self.dims = len(objects[0][2])
+                self.vectors_file = "vectors-0.f32"
+                records.append({"op": "init", "dims": self.dims, "vectors": self.vectors_file})
+
+            accepted = []
+            for index, (object_id, properties, vector) in enumerate(objects):
+                if vector is None or len(vector) != self.dims:
+                    errors[index] = f"vector has {len(vector or ())} dimensions, collection has {self.dims}"
+                    continue
+                accepted.append((object_id, properties, vector))
+
+            if accepted:
+                vectors = np.asarray([vector for _, _, vector in accepted], dtype=np.float32)
+                vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-9)
+                vectors_path = os.path.join(self.path, self.vectors_file)
+                start = os.path.getsize(vectors_path) // (self.dims * _ROW_BYTES) if os.path.exists(vectors_path) else 0
+                # Rows go first: a log line never points past the end of the file.
+                # A writer that died mid-row leaves a partial row; cut it off so rows stay aligned.
+                with open(vectors_path, "ab") as f:
+                    f.truncate(start * self.dims * _ROW_BYTES)
+                    f.write(vectors.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                records += [
+                    {"op": "put", "id": object_id, "row": start + i, "properties": properties}
+                    for i, (object_id, properties, _) in enumerate(accepted)
+                ]
+            if records:
+                self._append_log(records)
+                self._refresh()
+                self._maybe_compact()
+        return errors
+
+    def delete(self, object_ids: list):
+        with self._lock, self._locked():
+            self._refresh()
+            records = [{"op": "delete", "id": object_id} for object_id in object_ids if object_id in self.rows]
+            if records:
+                self._append_log(records)
+                self._refresh()
+                self._maybe_compact()
+
+    def _maybe_compact(self):
+        """Rewrite live rows into a new vectors file once dead rows dominate (writer lock held)"""
+        dead = len(self.matrix) - len(self.rows)
+        if dead < max(VECTOR_STORE_COMPACT_MIN, len(self.rows)):
+            return
+        generation = int(self.vectors_file[len("vectors-"):-len(".f32")]) + 1
+        vectors_file = f"vectors-{generation}.f32"
+        ids = list(self.rows)
+        old_rows = np.fromiter((self.rows[i] for i in ids), dtype=np.intp, count=len(ids))
+        with open(os.path.join(self.path, vectors_file), "wb") as f:
+            for start in range(0, len(old_rows), 10_000):
+                f.write(np.ascontiguousarray(self.matrix[old_rows[start:start + 10_000]]).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+        records = [{"op": "init", "dims": self.dims, "vectors": vectors_file}] + [
+            {"op": "put", "id": object_id, "row": row, "properties": self.properties[old_row]}
+            for row, (object_id, old_row) in enumerate(zip(ids, old_rows.tolist()))
+        ]
+        tmp_path = self._log_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(b"".join(json.dumps(record).encode() + b"\n" for record in records))
+            f.flush()
+            os.fsync(f.fileno())
+        # Readers see the new log's inode and reload; ones still mapping the old file keep it until then
+        os.replace(tmp_path, self._log_path)
+        old_file = self.vectors_file
+        self._refresh()
+        os.unlink(os.path.join(self.path, old_file))
+        logger.info(f"🗜️  Compacted {self.path}: {dead} dead rows dropped, {len(ids)} kept")
+
+
+class _Data:
+    def __init__(self, store: TenantStore):
+        self._store = store
+
+    def insert_many(self, objects: list):
+        errors = self._store.put([
+            (str(obj.uuid), dict(obj.properties or {}), obj.vector)
+            for obj in objects
+        ])
+        return SimpleNamespace(
+            has_errors=bool(errors),
+            errors={index: SimpleNamespace(message=message) for index, message in errors.items()},
+        )
+
+    def delete_many(self, where):
+        # Only Filter.by_id().contains_any(...) is used
+        self._store.delete([str(object_id) for object_id in where.value])
+
+
+class _Query:
+    def __init__(self, store: TenantStore):
+        self._store = store
+
+    def near_vector(self, near_vector, limit: int = 10, filters=None, return_properties=None, return_metadata=None):
+        if filters is not None:
+            raise ValueError("The local vector store is always multi-tenant and takes no filters")
+        objects = []
+        for properties, distance in self._store.search(near_vector, limit):
+            if return_properties:
+                properties = {key: properties.get(key) for key in return_properties}
+            objects.append(SimpleNamespace(properties=properties, metadata=SimpleNamespace(distance=distance)))
+        return SimpleNamespace(objects=objects)
+
+
+class _Tenants:
+    def __init__(self, collection):
+        self._collection = collection
+
+    def exists(self, tenant: str) -> bool:
+        return os.path.isdir(self._collection._tenant_path(tenant))
+
+    def create(self, tenants: list):
+        for tenant in tenants:
+            os.makedirs(self._collection._tenant_path(tenant.name), exist_ok=True)
+
+
+class LocalCollection:
+    def __init__(self, client, name: str, tenant: str = None):
+        self._client = client
+        self.name = name
+        self.tenant = tenant
+        self.tenants = _Tenants(self)
+        self.config = SimpleNamespace(
+            get=lambda: SimpleNamespace(multi_tenancy_config=SimpleNamespace(enabled=True))
+        )
+
+    def _tenant_path(self, tenant: str) -> str:
+        return os.path.join(self._client.root, self.name, tenant)
+
+    def with_tenant(self, tenant: str):
+        return LocalCollection(self._client, self.name, tenant)
+
+    def _store(self) -> TenantStore:
+        if self.tenant is None:
+            raise ValueError("The local vector store needs a tenant")
+        return self._client.store(self._tenant_path(self.tenant))
+
+    @property
+    def data(self):
+        return _Data(self._store())
+
+    @property
+    def query(self):
+        return _Query(self._store())
+
+
+class _Collections:
+    def __init__(self, client):
+        self._client = client
+
+    def exists(self, name: str) -> bool:
+        return os.path.isdir(os.path.join(self._client.root, name))
+
+    def create(self, name: str, **config):
+        os.makedirs(os.path.join(self._client.root, name), exist_ok=True)
+        return LocalCollection(self._client, name)
+
+    def get(self, name: str):
+        return LocalCollection(self._client, name)
+
+
+class LocalVectorClient:
+    """Stands in for a connected weaviate client"""
+
+    def __init__(self, root: str = None):
+        self.root = os.path.abspath(root or VECTOR_STORE_DIR)
+        os.makedirs(self.root, exist_ok=True)
+        if self.root.startswith(os.path.abspath(tempfile.gettempdir()) + os.sep):
+            logger.warning(f"⚠️  VECTOR_STORE_DIR {self.root} is a temporary directory; if it is wiped, "
+                           f"stored knowledge is not re-embedded and vector search returns nothing")
+        self.collections = _Collections(self)
+        self._stores = OrderedDict()    # tenant path -> TenantStore
+        self._stores_lock = threading.Lock()
+
+    def store(self, path: str) -> TenantStore:
+        with self._stores_lock:
+            store = self._stores.get(path)
+            if store is None:
+                store = self._stores[path] = TenantStore(path)
+                while len(self._stores) > VECTOR_STORE_MAX_TENANTS:
+                    self._stores.popitem(last=False)
+            self._stores.move_to_end(path)
+            return store
+
+    def close(self):
+        with self._stores_lock:
+            self._stores.clear()
@@ -0,0 +1,143 @@
+"""
+Media Frame Fast Path
+Encoding and decoding helpers for the per-frame messages in the
+Twilio <-> OpenAI Realtime bridge. Audio frames are by far the most
+frequent messages (50/sec per direction per call), so they skip the JSON
+encoder, the JSON parser and the SDK's event models. Any message that
+doesn't match the expected compact shape falls back to the regular path.
+"""
+import json
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+_sdk_fallback_logged = False
+
+
+class OutboundMediaEncoder:
+    """Pre-encoded Twilio media envelope for one stream"""
+
+    def __init__(self, stream_sid: str):
+        sid = json.dumps(stream_sid)
+        self._prefix = '{"event":"media","streamSid":' + sid + ',"media":{"payload":"'
+        self._mark_prefix = '{"event":"mark","streamSid":' + sid + ',"mark":{"name":"'
+        self._clear = '{"event":"clear","streamSid":' + sid + '}'
+
+    def encode(self, payload: str, timestamp_ms: int) -> str:
+        # Base64 payloads never need JSON escaping
+        return self._prefix + payload + '","timestamp":"' + str(timestamp_ms) + '"}}'
+
+    def mark(self, name: str) -> str:
+        """Twilio echoes a mark back once the audio sent before it has played"""
+        return self._mark_prefix + name + '"}}'
+
+    def clear(self) -> str:
+        """Drops the audio Twilio has buffered but not played yet"""
+        return self._clear
+
+
+def encode_audio_append(payload: str) -> str:
+    """input_audio_buffer.append event for a base64 audio payload"""
+    return '{"type":"input_audio_buffer.append","audio":"' + payload + '"}'
+
+
+_TWILIO_MEDIA_MARKER = '"event":"media"'
+_TWILIO_PAYLOAD_KEY = '"payload":"'
+
+
+def extract_media_payload(message: str):
+    """
+    Base64 payload of a Twilio media event, without parsing the JSON.
+
+    Returns None if the message isn't a compact media event, in which
+    case the caller should json.loads it as usual.
+    """
+    if _TWILIO_MEDIA_MARKER not in message:
+        return None
+    start = message.find(_TWILIO_PAYLOAD_KEY)
+    if start < 0:
+        return None
+    start += len(_TWILIO_PAYLOAD_KEY)
+    end = message.find('"', start)
+    if end < 0:
+        return None
+    payload = message[start:end]
+    # Escaped characters (e.g. "\/") mean the fast path can't be trusted
+    if "\\" in payload:
+        return None
+    return payload
+
+
+class AudioDelta:
+    """Lightweight stand-in for the SDK's response.audio.delta event"""
+    __slots__ = ("delta", "item_id")
+    type = "response.audio.delta"
+
+    def __init__(self, delta: str, item_id: str = None):
+        self.delta = delta
+        self.item_id = item_id
+
+
+_AUDIO_DELTA_MARKER = b'"type":"response.audio.delta"'
+_DELTA_KEY = b'"delta":"'
+_ITEM_ID_KEY = b'"item_id":"'
+
+
+def _string_field(raw: bytes, key: bytes):
+    start = raw.find(key)
+    if start < 0:
+        return None
+    start += len(key)
+    end = raw.find(b'"', start)
+    if end < 0:
+        return None
+    return raw[start:end]
+
+
+def parse_audio_delta(raw: bytes):
+    """AudioDelta for a compact response.audio.delta message, else None"""
+    if _AUDIO_DELTA_MARKER not in raw:
+        return None
+    delta = _string_field(raw, _DELTA_KEY)
+    if delta is None or b"\\" in delta:
+        return None
+    item_id = _string_field(raw, _ITEM_ID_KEY)
+    return AudioDelta(delta.decode("ascii"), item_id.decode("ascii") if item_id else None)
+
+
+async def send_raw(openai_ws, text: str):
+    """Send a pre-encoded event on a Realtime connection"""
+    global _sdk_fallback_logged
+    if hasattr(openai_ws, "send_raw"):
+        await openai_ws.send_raw(text)
+        return
+    # The beta connection only exposes send(), which re-validates every
+    # event; write to the underlying websocket directly. That attribute is
+    # private to the SDK, so fall back to send() if it goes away.
+    websocket = getattr(openai_ws, "_connection", None)
+    if websocket is not None:
+        await websocket.send(text)
+        return
+    if not _sdk_fallback_logged:
+        _sdk_fallback_logged = True
+        logger.warning("⚠️  Realtime connection has no raw websocket, sending frames through the SDK")
+    await openai_ws.send(json.loads(text))
+
+
+async def iter_realtime_events(openai_ws):
+    """
+    Like `async for event in openai_ws`, but audio deltas are yielded as
+    AudioDelta without going through the SDK's event parsing.
+    """
+    from websockets.exceptions import ConnectionClosedOK
+
+    try:
+        while True:
+            raw = await openai_ws.recv_bytes()
+            if isinstance(raw, str):
+                raw = raw.encode("utf-8")
+            event = parse_audio_delta(raw)
+            yield event if event is not None else openai_ws.parse_event(raw)
+    except ConnectionClosedOK:
+        return
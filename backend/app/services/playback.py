@@ -0,0 +1,242 @@
+"""
+Outbound Playback and Barge-In
+Paces the AI's audio out to Twilio and tracks how much of it the caller
+has actually heard, so the bridge can stop it the moment the caller
+starts talking.
+
+OpenAI generates audio faster than real time, in deltas of any length.
+Rather than forwarding each delta as it arrives, the audio is re-framed
+into 20ms frames (160 bytes of 8kHz μ-law) and queued. A pacer task sends
+the frames at real time, at most OUTBOUND_LEAD_MS ahead of playback, so
+Twilio only ever buffers that much. Media timestamps come from the bytes
+sent so far. Once OUTBOUND_BUFFER_MS of audio is queued, the next delta
+waits for the pacer before it is added, which holds back reading more
+events from OpenAI.
+
+A Twilio mark follows the last frame of every delta; Twilio echoes a mark
+back once everything before it has played. The last echoed mark is the
+playout position.
+
+When input_audio_buffer.speech_started arrives while audio is queued
+here or at Twilio:
+  1. queued frames are dropped and Twilio is sent `clear`, which drops
+     the little audio it has buffered
+  2. the response, if still generating, gets `response.cancel`
+  3. the assistant item is truncated at the playout position
+     (conversation.item.truncate), so the model's transcript of the
+     conversation ends where the caller stopped listening
+  4. deltas of the interrupted item that are still on their way are
+     dropped
+
+Twilio echoes the remaining marks once its buffer is cleared. The time
+from speech_started to that last echo (interrupt-to-silence) is reported
+by stats().
+"""
+import asyncio
+import base64
+import logging
+import os
+import time
+from collections import Counter, deque
+
+
+logger = logging.getLogger(__name__)
+
+
+BARGE_IN = os.getenv("BARGE_IN", "true").lower() == "true"
+OUTBOUND_LEAD_MS = int(os.getenv("OUTBOUND_LEAD_MS", "200"))
+OUTBOUND_BUFFER_MS = int(os.getenv("OUTBOUND_BUFFER_MS", "30000"))
+
+# g711_ulaw output: 8000 one-byte samples per second, sent in 20ms frames
+ULAW_BYTES_PER_MS = 8
+FRAME_MS = 20
+FRAME_BYTES = FRAME_MS * ULAW_BYTES_PER_MS
+ULAW_SILENCE = b"\xff"
+
+_stats = Counter()
+_silence_ms = deque(maxlen=1000)
+
+
+class CallPlayback:
+    """Outbound audio of one call: queued, sent, played and interrupted"""
+
+    def __init__(self, websocket, openai_ws, media_encoder):
+        self.websocket = websocket
+        self.openai_ws = openai_ws
+        self.media_encoder = media_encoder
+        self.item_id = None         # assistant item whose audio is being sent
+        self.sent_bytes = 0         # of that item, sent to Twilio
+        self.played_bytes = 0       # of that item, confirmed played by a mark
+        self.stream_bytes = 0       # sent on this stream; the media timestamps
+        self.response_active = False
+        self._frames = deque()      # (item_id, frame, mark after it) waiting for the pacer
+        self._partial = bytearray() # audio of _partial_item short of a whole frame
+        self._partial_item = None
+        self._max_frames = max(1, OUTBOUND_BUFFER_MS // FRAME_MS)
+        self._ready = asyncio.Event()
+        self._space = asyncio.Event()
+        self._pacer = None
+        self._marks = deque()       # (seq, item_id, sent_bytes) awaiting Twilio's echo
+        self._seq = 0
+        self._interrupted = set()
+        self._interrupted_at = None
+
+    async def send_audio(self, item_id: str, payload: str) -> bool:
+        """Queue one audio delta for Twilio; False if it belongs to an interrupted item"""
+        if item_id in self._interrupted:
+            _stats["dropped_deltas"] += 1
+            return False
+        if item_id != self._partial_item:
+            self.end_item()
+            self._partial_item = item_id
+        self._partial += base64.b64decode(payload)
+        whole = len(self._partial) - len(self._partial) % FRAME_BYTES
+        if whole:
+            # Waits here only once OUTBOUND_BUFFER_MS of audio is queued
+            while len(self._frames) >= self._max_frames:
+                self._space.clear()
+                await self._space.wait()
+                if item_id in self._interrupted:
+                    return False
+            self._enqueue(item_id, self._partial[:whole])
+            del self._partial[:whole]
+        return True
+
+    def end_item(self):
+        """Send the item's last partial frame, padded with silence"""
+        if self._partial:
+            self._partial += ULAW_SILENCE * (FRAME_BYTES - len(self._partial))
+            self._enqueue(self._partial_item, self._partial)
+            self._partial = bytearray()
+
+    def _enqueue(self, item_id: str, audio: bytes):
+        frames = len(audio) // FRAME_BYTES
+        for i in range(frames):
+            self._frames.append((item_id, bytes(audio[i * FRAME_BYTES:(i + 1) * FRAME_BYTES]), i == frames - 1))
+        self._ready.set()
+        if self._pacer is None:
+            self._pacer = asyncio.create_task(self._pace())
+
+    async def _pace(self):
+        """Send queued frames at real time, OUTBOUND_LEAD_MS ahead of playback"""
+        lead = OUTBOUND_LEAD_MS / 1000
+        frame_s = FRAME_MS / 1000
+        started, sent = 0.0, 0
+        try:
+            while True:
+                if not self._frames:
+                    self._ready.clear()
+                    await self._ready.wait()
+                    continue
+                now = time.perf_counter()
+                if started + sent * frame_s < now:
+                    # Twilio has played everything sent: start a new run
+                    # instead of bursting to catch up
+                    started, sent = now, 0
+                wait = started + sent * frame_s - lead - now
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                    continue
+                item_id, frame, mark = self._frames.popleft()
+                if len(self._frames) < self._max_frames:
+                    self._space.set()
+                await self._send_frame(item_id, frame, mark)
+                sent += 1
+        except Exception as e:
+            logger.debug("Outbound audio stopped: %s", e)
+
+    async def _send_frame(self, item_id: str, frame: bytes, mark: bool):
+        if item_id != self.item_id:
+            self.item_id = item_id
+            self.sent_bytes = self.played_bytes = 0
+        payload = base64.b64encode(frame).decode("ascii")
+        await self.websocket.send_text(self.media_encoder.encode(payload, self.stream_bytes // ULAW_BYTES_PER_MS))
+        self.sent_bytes += len(frame)
+        self.stream_bytes += len(frame)
+        if BARGE_IN and mark:
+            self._seq += 1
+            self._marks.append((self._seq, item_id, self.sent_bytes))
+            await self.websocket.send_text(self.media_encoder.mark(str(self._seq)))
+
+    def on_mark(self, name: str):
+        """Twilio played (or, after a clear, discarded) everything up to this mark"""
+        try:
+            seq = int(name)
+        except (TypeError, ValueError):
+            return
+        while self._marks and self._marks[0][0] <= seq:
+            _, item_id, sent_bytes = self._marks.popleft()
+            if item_id == self.item_id and self._interrupted_at is None:
+                self.played_bytes = sent_bytes
+        if self._interrupted_at is not None and not self._marks:
+            elapsed = (time.perf_counter() - self._interrupted_at) * 1000
+            _silence_ms.append(elapsed)
+            self._interrupted_at = None
+            logger.debug("🔇 Caller barge-in silenced the AI in %.0fms", elapsed)
+
+    @property
+    def played_ms(self) -> int:
+        return self.played_bytes // ULAW_BYTES_PER_MS
+
+    @property
+    def queued_ms(self) -> int:
+        """Audio waiting here for the pacer"""
+        return len(self._frames) * FRAME_MS + len(self._partial) // ULAW_BYTES_PER_MS
+
+    async def on_speech_started(self):
+        """The caller started talking: stop the AI's audio where the caller stopped hearing it"""
+        if not BARGE_IN:
+            return
+        at_twilio = bool(self._marks)
+        queued = bool(self._frames or self._partial)
+        if not (at_twilio or queued or self.response_active):
+            return
+        _stats["interruptions"] += 1
+
+        # Silence first; the OpenAI side can follow
+        interrupted = {item_id for item_id, _, _ in self._frames}
+        if self._partial:
+            interrupted.add(self._partial_item)
+        self._frames.clear()
+        self._partial = bytearray()
+        self._space.set()
+        if at_twilio:
+            self._interrupted_at = time.perf_counter()
+            await self.websocket.send_text(self.media_encoder.clear())
+        if self.response_active:
+            self.response_active = False
+            await self.openai_ws.response.cancel()
+        if (at_twilio or queued) and self.item_id is not None:
+            interrupted.add(self.item_id)
+            await self.openai_ws.conversation.item.truncate(
+                item_id=self.item_id, content_index=0, audio_end_ms=self.played_ms
+            )
+            logger.info("✋ Caller barged in; AI audio cut at %dms of %dms",
+                        self.played_ms, self.sent_bytes // ULAW_BYTES_PER_MS)
+        self._interrupted |= interrupted
+
+    def on_response_created(self):
+        self.response_active = True
+
+    def on_response_done(self):
+        self.response_active = False
+
+    def close(self):
+        if self._pacer is not None:
+            self._pacer.cancel()
+            self._pacer = None
+
+
+def stats() -> dict:
+    """Barge-ins, and how long until Twilio's buffer was confirmed empty (ms)"""
+    silence = sorted(_silence_ms)
+
+    def percentile(q):
+        return round(silence[min(len(silence) - 1, int(q * len(silence)))], 1) if silence else None
+
+    return {
+        "interruptions": _stats["interruptions"],
+        "dropped_deltas": _stats["dropped_deltas"],
+        "silence_p50_ms": percentile(0.5),
+        "silence_p99_ms": percentile(0.99),
+    }
@@ -0,0 +1,236 @@
+"""
+RAG Cache
+Two-level cache for live-call retrieval:
+  - query text -> embedding
+  - (business_id, normalized query) -> search results
+
+Each level is an in-process LRU with TTL, optionally backed by Redis as a
+shared tier across workers. Results for a business are invalidated when its
+knowledge is re-ingested, on every worker in cluster mode.
+"""
+import logging
+import os
+import re
+import time
+import json
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+
+
+logger = logging.getLogger(__name__)
+
+
+RAG_CACHE_TTL = int(os.getenv("RAG_CACHE_TTL", "600"))
+RAG_EMBEDDING_CACHE_SIZE = int(os.getenv("RAG_EMBEDDING_CACHE_SIZE", "2048"))
+RAG_RESULT_CACHE_SIZE = int(os.getenv("RAG_RESULT_CACHE_SIZE", "2048"))
+RAG_CACHE_REDIS = os.getenv("RAG_CACHE_REDIS", "false").lower() == "true"
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+
+# Don't retry a broken Redis on every lookup
+REDIS_RETRY_AFTER = 30
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after `ttl` seconds"""
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete_where(self, predicate):
+        with self._lock:
+            for key in [k for k in self._data if predicate(k)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+_embeddings = TTLCache(RAG_EMBEDDING_CACHE_SIZE, RAG_CACHE_TTL)
+_results = TTLCache(RAG_RESULT_CACHE_SIZE, RAG_CACHE_TTL)
+_generations = {}
+
+_redis = None
+_redis_down_until = 0.0
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace"""
+    return _WHITESPACE.sub(" ", _PUNCTUATION.sub(" ", query.lower())).strip()
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _get_redis():
+    """Shared Redis tier, or None if disabled or currently unreachable"""
+    global _redis
+    if not RAG_CACHE_REDIS or time.monotonic() < _redis_down_until:
+        return None
+    if _redis is None:
+        import redis
+        _redis = redis.Redis.from_url(REDIS_URL, socket_timeout=0.2, socket_connect_timeout=0.2)
+    return _redis
+
+
+def _redis_failed(e: Exception):
+    global _redis_down_until
+    _redis_down_until = time.monotonic() + REDIS_RETRY_AFTER
+    logger.warning(f"⚠️  RAG cache Redis tier unavailable, using local cache only: {e}")
+
+
+def _generation(business_id: int) -> int:
+    """Knowledge version for a business; bumped on every re-ingest"""
+    r = _get_redis()
+    if r is not None:
+        try:
+            value = r.get(f"rag:gen:{business_id}")
+            return int(value) if value else 0
+        except Exception as e:
+            _redis_failed(e)
+    return _generations.get(business_id, 0)
+
+
+def knowledge_generation(business_id: int) -> int:
+    """Changes whenever the business's knowledge is re-ingested"""
+    return _generation(business_id)
+
+
+def get_embedding(model: str, query: str):
+    key = (model, normalize_query(query))
+    vector = _embeddings.get(key)
+    if vector is not None:
+        return vector
+
+    r = _get_redis()
+    if r is not None:
+        try:
+            raw = r.get(f"rag:emb:{model}:{_digest(key[1])}")
+            if raw:
+                vector = array("f", raw).tolist()
+                _embeddings.set(key, vector)
+                return vector
+        except Exception as e:
+            _redis_failed(e)
+
+    return None
+
+
+def set_embedding(model: str, query: str, vector: list):
+    key = (model, normalize_query(query))
+    _embeddings.set(key, vector)
+
+    r = _get_redis()
+    if r is not None:
+        try:
+            r.set(f"rag:emb:{model}:{_digest(key[1])}", array("f", vector).tobytes(), ex=RAG_CACHE_TTL)
+        except Exception as e:
+            _redis_failed(e)
+
+
+def get_results(business_id: int, query: str, generation: int = None):
+    """
+    Cached results for a query. Pass the generation read when the search
+    started, and hand the same one to set_results().
+    """
+    if generation is None:
+        generation = _generation(business_id)
+    normalized = normalize_query(query)
+    key = (business_id, generation, normalized)
+
+    results = _results.get(key)
+    if results is not None:
+        return results
+
+    r = _get_redis()
+    if r is not None:
+        try:
+            raw = r.get(f"rag:results:{business_id}:{generation}:{_digest(normalized)}")
+            if raw:
+                results = json.loads(raw)
+                _results.set(key, results)
+                return results
+        except Exception as e:
+            _redis_failed(e)
+
+    return None
+
+
+def set_results(business_id: int, query: str, results: list, generation: int = None):
+    """
+    Cache results under the generation the search started at. If the
+    knowledge changed while searching, the results may predate it and are
+    not stored.
+    """
+    current = _generation(business_id)
+    if generation is None:
+        generation = current
+    elif generation != current:
+        return
+    normalized = normalize_query(query)
+    _results.set((business_id, generation, normalized), results)
+
+    r = _get_redis()
+    if r is not None:
+        try:
+            r.set(
+                f"rag:results:{business_id}:{generation}:{_digest(normalized)}",
+                json.dumps(results),
+                ex=RAG_CACHE_TTL
+            )
+        except Exception as e:
+            _redis_failed(e)
+
+
+def invalidate_business(business_id: int, shared: bool = True):
+    """
+    Drop cached results for a business after its knowledge changed. With
+    shared=False only this worker's cache is dropped, for a change another
+    worker made (and already bumped in Redis).
+    """
+    _generations[business_id] = _generations.get(business_id, 0) + 1
+    _results.delete_where(lambda key: key[0] == business_id)
+
+    r = _get_redis() if shared else None
+    if r is not None:
+        try:
+            # Old result keys become unreachable and expire on their own
+            r.incr(f"rag:gen:{business_id}")
+        except Exception as e:
+            _redis_failed(e)
+
+
+def clear():
+    _embeddings.clear()
+    _results.clear()
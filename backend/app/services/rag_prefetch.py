@@ -0,0 +1,126 @@
+"""
+Speculative RAG Prefetch
+Starts knowledge retrieval as soon as the caller's transcript arrives,
+instead of waiting for the model to call rag_search. By the time the tool
+call comes (a model turn later) the results are usually ready.
+
+One CallPrefetcher per call:
+  - on_transcript() starts search_knowledge_async on the caller's words.
+    Fillers ("yes", "okay") are skipped. A newer transcript cancels
+    prefetches still in flight for older ones, unless a tool call is
+    already waiting on them.
+  - search() answers a rag_search tool call. The model rewrites the
+    question ("what time do you close saturday" -> "Saturday hours"), so
+    a prefetch is used when at least RAG_PREFETCH_MIN_OVERLAP of the tool
+    query's terms appear in its transcript. An in-flight prefetch is
+    awaited rather than started again. Otherwise, or when the prefetch
+    found nothing, the tool query is searched as before.
+
+The last RAG_PREFETCH_KEEP finished prefetches are kept per call, so a
+follow-up tool call about an earlier question is also answered warm.
+"""
+import asyncio
+import logging
+import os
+from collections import Counter
+from app.services import rag_service
+from app.services.hybrid_search import tokenize
+
+
+logger = logging.getLogger(__name__)
+
+
+RAG_PREFETCH = os.getenv("RAG_PREFETCH", "true").lower() == "true"
+RAG_PREFETCH_MIN_TERMS = int(os.getenv("RAG_PREFETCH_MIN_TERMS", "2"))
+RAG_PREFETCH_MIN_OVERLAP = float(os.getenv("RAG_PREFETCH_MIN_OVERLAP", "0.5"))
+RAG_PREFETCH_KEEP = int(os.getenv("RAG_PREFETCH_KEEP", "3"))
+
+_stats = Counter()
+
+
+class _Prefetch:
+    def __init__(self, transcript: str, terms: set, task: asyncio.Task):
+        self.transcript = transcript
+        self.terms = terms
+        self.task = task
+        # A tool call is waiting on it; newer transcripts must not cancel it
+        self.claimed = False
+
+
+class CallPrefetcher:
+    """Prefetched knowledge lookups for one call"""
+
+    def __init__(self, business_id: int):
+        self.business_id = business_id
+        self._recent = []   # oldest first
+
+    def on_transcript(self, transcript: str):
+        if not RAG_PREFETCH:
+            return
+        terms = set(tokenize(transcript or ""))
+        if len(terms) < RAG_PREFETCH_MIN_TERMS:
+            return
+
+        kept = []
+        for prefetch in self._recent:
+            if prefetch.task.done() or prefetch.claimed:
+                kept.append(prefetch)
+            else:
+                # The caller has moved on; this answer would arrive for a stale question
+                prefetch.task.cancel()
+                _stats["cancelled"] += 1
+        task = asyncio.create_task(rag_service.search_knowledge_async(self.business_id, transcript))
+        kept.append(_Prefetch(transcript, terms, task))
+        self._recent = kept[-RAG_PREFETCH_KEEP:]
+        _stats["started"] += 1
+
+    def _match(self, query: str):
+        """Newest prefetch covering enough of the query's terms"""
+        terms = set(tokenize(query or ""))
+        if not terms:
+            return None
+        best, best_overlap = None, 0.0
+        for prefetch in reversed(self._recent):
+            if prefetch.task.cancelled():
+                continue
+            overlap = len(terms & prefetch.terms) / len(terms)
+            if overlap >= RAG_PREFETCH_MIN_OVERLAP and overlap > best_overlap:
+                best, best_overlap = prefetch, overlap
+        return best
+
+    async def search(self, query: str) -> list:
+        """Results for a rag_search tool call, from a prefetch when one matches"""
+        prefetch = self._match(query)
+        if prefetch is not None:
+            prefetch.claimed = True
+            was_done = prefetch.task.done()
+            try:
+                # Shielded: if this tool call times out, the prefetch still finishes and fills the cache
+                results = await asyncio.shield(prefetch.task)
+            except asyncio.CancelledError:
+                if not prefetch.task.cancelled():
+                    raise
+                results = None
+            if results:
+                _stats["hits" if was_done else "joined"] += 1
+                logger.debug("⚡ rag_search answered from prefetch of: %s", prefetch.transcript)
+                return results
+
+        _stats["misses"] += 1
+        return await rag_service.search_knowledge_async(self.business_id, query)
+
+    def close(self):
+        """Cancel this call's unfinished prefetches"""
+        for prefetch in self._recent:
+            if not prefetch.task.done():
+                prefetch.task.cancel()
+                _stats["cancelled"] += 1
+        self._recent = []
+
+
+def stats() -> dict:
+    """
+    started/cancelled prefetches; tool calls answered by a finished
+    prefetch (hits), by one still running (joined), or searched (misses)
+    """
+    return {key: _stats[key] for key in ("started", "cancelled", "hits", "joined", "misses")}
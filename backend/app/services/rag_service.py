@@ -1,21 +1,67 @@
+import logging
 import os
+import asyncio
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import weaviate
 from weaviate.auth import AuthApiKey
-from openai import OpenAI
+from weaviate.classes.config import Configure, Property, DataType
+from weaviate.classes.data import DataObject
+from weaviate.classes.tenants import Tenant
+from weaviate.classes.query import Filter, MetadataQuery
+from weaviate.util import generate_uuid5
+from sqlalchemy import insert, or_
 from sqlalchemy.orm import Session
 from app.services.chunker import chunk_text
+from app.services import rag_cache, hybrid_search, embeddings, local_vectors, cluster
 from app.models.document import BusinessDocument
+from app.models.ingestion import IngestedChunk
 
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+logger = logging.getLogger(__name__)
+
 
 # Lazy initialization of weaviate client
 _weaviate_client = None
+_weaviate_lock = threading.Lock()
 CLASS_NAME = os.getenv("WEAVIATE_CLASS_NAME", "BusinessDocs")
+# weaviate | local (in-process store, see local_vectors.py)
+VECTOR_STORE = os.getenv("VECTOR_STORE", "weaviate")
+WEAVIATE_BATCH_SIZE = int(os.getenv("WEAVIATE_BATCH_SIZE", "100"))
+RAG_SEARCH_LIMIT = int(os.getenv("RAG_SEARCH_LIMIT", "5"))
+# vector | lexical | hybrid (see hybrid_search.py)
+RAG_SEARCH_MODE = os.getenv("RAG_SEARCH_MODE", "hybrid")
+# Candidates each retriever contributes before fusion and rerank
+RAG_CANDIDATES = int(os.getenv("RAG_CANDIDATES", "20"))
+# Chunks embedded and committed together when ingesting a stream
+INGEST_BATCH_CHUNKS = int(os.getenv("INGEST_BATCH_CHUNKS", "64"))
+# New collections get one tenant per business
+WEAVIATE_MULTI_TENANCY = os.getenv("WEAVIATE_MULTI_TENANCY", "true").lower() == "true"
+
+# collection name -> whether it is multi-tenant
+_multi_tenancy = {}
+_known_tenants = set()    # (collection name, tenant)
+
+# Blocking Weaviate/Redis calls made on behalf of live calls run here,
+# off the event loop that carries call audio
+RAG_SEARCH_WORKERS = int(os.getenv("RAG_SEARCH_WORKERS", "8"))
+_search_executor = ThreadPoolExecutor(max_workers=RAG_SEARCH_WORKERS, thread_name_prefix="rag-search")
 
 
 def get_weaviate_client():
+    if _weaviate_client is not None:
+        return _weaviate_client
+    # Sync jobs run in worker threads; connect only once
+    with _weaviate_lock:
+        return _connect_weaviate()
+
+
+def _connect_weaviate():
     global _weaviate_client
+    if _weaviate_client is None and VECTOR_STORE == "local":
+        _weaviate_client = local_vectors.LocalVectorClient()
+        logger.info(f"📦 Using the local vector store in {_weaviate_client.root}")
     if _weaviate_client is None:
         weaviate_url = os.getenv("WEAVIATE_URL")
         weaviate_api_key = os.getenv("WEAVIATE_API_KEY")
@@ -38,23 +84,23 @@ def get_weaviate_client():
         else:
             port = 8080  # Default HTTP port for local Weaviate
         
-        print(f"🔗 Connecting to Weaviate at {scheme}://{host}:{port}")
+        logger.info(f"🔗 Connecting to Weaviate at {scheme}://{host}:{port}")
         
         try:
             # Build authentication if API key is provided
             auth_config = None
             if weaviate_api_key and weaviate_api_key.lower() != "none" and weaviate_api_key.strip():
                 auth_config = AuthApiKey(weaviate_api_key)
-                print(f"🔑 Using API key authentication")
+                logger.info("🔑 Using API key authentication")
             else:
-                print(f"🔓 No API key provided, connecting without authentication")
+                logger.info("🔓 No API key provided, connecting without authentication")
             
             # Check if this is a cloud instance (free tier may not support gRPC)
             is_cloud = "gcp.weaviate.cloud" in weaviate_url or "cloud.weaviate.io" in weaviate_url or "weaviate.cloud" in weaviate_url
             
             if is_cloud:
                 # For cloud instances, skip gRPC initialization checks (free tier may not have gRPC)
-                print(f"☁️  Cloud instance detected, skipping gRPC checks")
+                logger.info("☁️  Cloud instance detected, skipping gRPC checks")
                 _weaviate_client = weaviate.connect_to_custom(
                     http_host=host,
                     http_port=port,
@@ -76,97 +122,643 @@ def get_weaviate_client():
                     grpc_secure=is_secure,
                     auth_credentials=auth_config
                 )
-            print(f"✅ Connected to Weaviate")
+            logger.info("✅ Connected to Weaviate")
         except Exception as e:
-            print(f"❌ Failed to connect to Weaviate: {e}")
+            logger.error(f"❌ Failed to connect to Weaviate: {e}")
             raise
     return _weaviate_client
 
 
-def embed_text(text: str):
-    response = client.embeddings.create(
-        model=os.getenv("OPENAI_EMBEDDINGS"),
-        input=text
+def close_weaviate_client():
+    """Close the shared Weaviate connection (on shutdown)"""
+    global _weaviate_client
+    if _weaviate_client is not None:
+        try:
+            _weaviate_client.close()
+        finally:
+            _weaviate_client = None
+
+
+def embed_text(text: str, business_id: int = None):
+    provider = embeddings.provider_for_business(business_id) if business_id else embeddings.get_provider()
+    return provider.embed_query(text)
+
+
+class IngestionError(Exception):
+    """Ingestion failed and was rolled back; `failures` lists the objects that were rejected"""
+
+    def __init__(self, message: str, failures: list = None, written_ids: list = None):
+        super().__init__(message)
+        self.failures = failures or []
+        self.written_ids = written_ids or []
+
+
+def _base_collection(weaviate_client, name: str = CLASS_NAME):
+    """Get a documents collection, creating it on first use"""
+    if name in _multi_tenancy:
+        return weaviate_client.collections.get(name)
+
+    if not weaviate_client.collections.exists(name):
+        try:
+            weaviate_client.collections.create(
+                name=name,
+                properties=[
+                    Property(name="text", data_type=DataType.TEXT),
+                    Property(name="business_id", data_type=DataType.TEXT),
+                ],
+                multi_tenancy_config=Configure.multi_tenancy(enabled=WEAVIATE_MULTI_TENANCY)
+            )
+        except Exception as e:
+            raise Exception(f"Failed to create Weaviate collection: {e}")
+
+    collection = weaviate_client.collections.get(name)
+
+    # Collections created before multi-tenancy was introduced stay single-tenant
+    _multi_tenancy[name] = bool(collection.config.get().multi_tenancy_config.enabled)
+
+    return collection
+
+
+def get_collection(weaviate_client, business_id: int, create_tenant: bool = True, model: str = None):
+    """
+    Get the collection scoped to one business, for vectors from `model`
+    (see embeddings.collection_name).
+
+    With multi-tenancy each business is its own tenant (a separate shard and
+    index), so queries only touch that business's vectors. Returns None if
+    the business has no tenant yet and create_tenant is False.
+    """
+    name = embeddings.collection_name(CLASS_NAME, model)
+    collection = _base_collection(weaviate_client, name)
+    if not _multi_tenancy[name]:
+        return collection
+
+    tenant = str(business_id)
+    if (name, tenant) not in _known_tenants:
+        if not collection.tenants.exists(tenant):
+            if not create_tenant:
+                return None
+            collection.tenants.create([Tenant(name=tenant)])
+        _known_tenants.add((name, tenant))
+
+    return collection.with_tenant(tenant)
+
+
+def delete_objects(collection, object_ids: list):
+    """Delete Weaviate objects by id, in batches"""
+    for start in range(0, len(object_ids), WEAVIATE_BATCH_SIZE):
+        batch = object_ids[start:start + WEAVIATE_BATCH_SIZE]
+        collection.data.delete_many(where=Filter.by_id().contains_any(batch))
+
+
+def hash_chunk(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _ledger_entries(db: Session, business_id: int, source: str) -> dict:
+    """Existing ledger rows for a source, keyed by content hash"""
+    rows = db.query(IngestedChunk).filter(
+        IngestedChunk.business_id == business_id,
+        IngestedChunk.source == source
+    ).all()
+    return {row.content_hash: row for row in rows}
+
+
+def _write_chunks(db: Session, collection, business_id: int, source: str, chunks: list, provider) -> list:
+    """
+    Embed chunks and stage them in Weaviate, business_documents and the ledger.
+
+    Postgres rows are only flushed, not committed, so the caller owns the
+    transaction. Returns the Weaviate ids written so the caller can undo
+    them if the transaction is rolled back.
+    """
+    # Embed all chunks up front (in a few batched requests for OpenAI)
+    vectors = provider.embed(chunks)
+    hashes = [hash_chunk(chunk) for chunk in chunks]
+
+    # Deterministic ids, so re-writing the same chunk never duplicates it
+    objects = [
+        DataObject(
+            properties={
+                "business_id": str(business_id),
+                "text": chunk
+            },
+            vector=vector,
+            uuid=generate_uuid5(f"{business_id}:{source}:{content_hash}")
+        )
+        for chunk, vector, content_hash in zip(chunks, vectors, hashes)
+    ]
+
+    # Store raw text in Postgres (not visible until commit)
+    document_ids = db.execute(
+        insert(BusinessDocument).returning(BusinessDocument.id, sort_by_parameter_order=True),
+        [{"business_id": business_id, "text": chunk, "source": source} for chunk in chunks]
+    ).scalars().all()
+
+    db.execute(
+        insert(IngestedChunk),
+        [
+            {
+                "business_id": business_id,
+                "source": source,
+                "content_hash": content_hash,
+                "vector_id": str(obj.uuid),
+                "document_id": document_id,
+                "embedding_model": provider.model,
+            }
+            for content_hash, obj, document_id in zip(hashes, objects, document_ids)
+        ]
     )
-    return response.data[0].embedding
 
+    written_ids = []
+
+    # Store in vector DB using batched v4.x API
+    for start in range(0, len(objects), WEAVIATE_BATCH_SIZE):
+        batch = objects[start:start + WEAVIATE_BATCH_SIZE]
+        written_ids.extend(str(obj.uuid) for obj in batch)
+        try:
+            result = collection.data.insert_many(batch)
+        except Exception as e:
+            raise IngestionError(
+                f"Failed to insert into Weaviate: {e}",
+                failures=[
+                    {"index": start + i, "text": obj.properties["text"][:80], "error": str(e)}
+                    for i, obj in enumerate(batch)
+                ],
+                written_ids=written_ids
+            )
+
+        if result.has_errors:
+            failures = [
+                {"index": start + i, "text": batch[i].properties["text"][:80], "error": error.message}
+                for i, error in sorted(result.errors.items())
+            ]
+            raise IngestionError(
+                f"Failed to insert into Weaviate: {len(failures)} of {len(batch)} objects rejected",
+                failures=failures,
+                written_ids=written_ids
+            )
+
+    return written_ids
+
+
+def _referenced_vector_ids(db: Session, business_id: int, collection: str, vector_ids: list) -> set:
+    """Ids among vector_ids that committed ledger rows reference in a collection"""
+    referenced = set()
+    for start in range(0, len(vector_ids), 500):
+        rows = db.query(IngestedChunk.vector_id, IngestedChunk.embedding_model).filter(
+            IngestedChunk.business_id == business_id,
+            IngestedChunk.vector_id.in_(vector_ids[start:start + 500])
+        ).all()
+        referenced.update(
+            vector_id for vector_id, model in rows
+            if embeddings.collection_name(CLASS_NAME, model) == collection
+        )
+    return referenced
+
+
+def _apply_changes(db: Session, business_id: int, source: str, new_chunks: list, stale: list, provider=None):
+    """
+    Write new chunks and remove stale ledger entries in one unit of work.
+
+    Either everything is committed, or Postgres is rolled back and any
+    Weaviate objects written for this call are deleted again.
+    """
+    if not new_chunks and not stale:
+        return
+    provider = provider or embeddings.provider_for_business(business_id)
 
-def ingest_text(db: Session, business_id: int, text: str, source="manual"):
-    chunks = chunk_text(text)
-    
     try:
         weaviate_client = get_weaviate_client()
     except Exception as e:
         raise Exception(f"Connection to Weaviate failed. Details: {e}")
 
-    # Get or create collection
+    collection = get_collection(weaviate_client, business_id, model=provider.model)
+
+    # Plain values, since the ORM rows are expired once the transaction ends
+    stale_row_ids = [row.id for row in stale]
+    stale_document_ids = [row.document_id for row in stale if row.document_id]
+    # Vectors from another model live in that model's collection
+    stale_vectors = {}
+    for row in stale:
+        name = embeddings.collection_name(CLASS_NAME, row.embedding_model)
+        stale_vectors.setdefault(name, (row.embedding_model, []))[1].append(row.vector_id)
+    own_name = embeddings.collection_name(CLASS_NAME, provider.model)
+
+    written_ids = []
     try:
-        collection = weaviate_client.collections.get(CLASS_NAME)
-    except Exception:
-        # Collection doesn't exist, create it
+        if stale_row_ids:
+            if stale_document_ids:
+                db.query(BusinessDocument).filter(
+                    BusinessDocument.id.in_(stale_document_ids)
+                ).delete(synchronize_session=False)
+            db.query(IngestedChunk).filter(
+                IngestedChunk.id.in_(stale_row_ids)
+            ).delete(synchronize_session=False)
+            db.flush()
+
+        if new_chunks:
+            written_ids = _write_chunks(db, collection, business_id, source, new_chunks, provider)
+
+        db.commit()
+        rag_cache.invalidate_business(business_id)
+    except Exception as e:
+        db.rollback()
+        written_ids = getattr(e, "written_ids", None) or written_ids
         try:
-            weaviate_client.collections.create(
-                name=CLASS_NAME,
-                properties=[
-                    {"name": "text", "dataType": ["text"]},
-                    {"name": "business_id", "dataType": ["text"]},
-                ]
+            # Ids are deterministic, so a re-written chunk, or the same chunk
+            # committed by a concurrent sync on another worker, shares the
+            # object: only undo objects no committed ledger row points at
+            kept_ids = _referenced_vector_ids(db, business_id, own_name, written_ids)
+            delete_objects(collection, [i for i in written_ids if i not in kept_ids])
+        except Exception as cleanup_error:
+            logger.warning(f"⚠️  Could not roll back {len(written_ids)} Weaviate objects: {cleanup_error}")
+        if isinstance(e, IngestionError):
+            raise
+        raise IngestionError(f"Ingestion failed and was rolled back: {e}")
+    cluster.publish_knowledge_change(business_id)
+    warm_search(business_id)
+
+    # Removed chunks are dropped from Weaviate only once Postgres no longer references them
+    new_ids = {
+        str(generate_uuid5(f"{business_id}:{source}:{hash_chunk(chunk)}"))
+        for chunk in new_chunks
+    }
+    for name, (model, vector_ids) in stale_vectors.items():
+        stale_ids = [vector_id for vector_id in vector_ids if name != own_name or vector_id not in new_ids]
+        if not stale_ids:
+            continue
+        try:
+            target = collection if name == own_name else get_collection(
+                weaviate_client, business_id, create_tenant=False, model=model
             )
-            collection = weaviate_client.collections.get(CLASS_NAME)
+            if target is not None:
+                delete_objects(target, stale_ids)
         except Exception as e:
-            raise Exception(f"Failed to create Weaviate collection: {e}")
+            logger.warning(f"⚠️  Failed to delete {len(stale_ids)} stale Weaviate objects for {source}: {e}")
+
+
+def warm_search(business_id: int):
+    """Rebuild the business's lexical index in the background, so no live call waits for it"""
+    if RAG_SEARCH_MODE != "vector":
+        hybrid_search.warm(business_id)
+
+
+def on_knowledge_changed(business_id: int):
+    """Another worker changed this business's knowledge"""
+    rag_cache.invalidate_business(business_id, shared=False)
+    warm_search(business_id)
 
+
+def _unique_chunks(chunks: list) -> dict:
+    """Chunks keyed by content hash, keeping the first occurrence"""
+    unique = {}
     for chunk in chunks:
-        vector = embed_text(chunk)
+        unique.setdefault(hash_chunk(chunk), chunk)
+    return unique
+
+
+def ingest_text(db: Session, business_id: int, text: str, source="manual"):
+    """
+    Chunk, embed and store text for a business.
+
+    Chunks already stored for this business and source are skipped, so the
+    same text can be ingested repeatedly without duplicating vectors or
+    paying for embeddings again.
+    """
+    chunks = _unique_chunks(chunk_text(text))
+    existing = _ledger_entries(db, business_id, source)
+    provider = embeddings.provider_for_business(business_id)
+
+    stale = [
+        existing[h] for h in chunks
+        if h in existing and existing[h].embedding_model != provider.model
+    ]
+    stale_hashes = {row.content_hash for row in stale}
+    new_chunks = [
+        chunk for h, chunk in chunks.items()
+        if h not in existing or h in stale_hashes
+    ]
+
+    _apply_changes(db, business_id, source, new_chunks, stale, provider)
+
+    return {
+        "chunks": len(chunks),
+        "added": len(new_chunks),
+        "unchanged": len(chunks) - len(new_chunks),
+        "removed": 0,
+    }
+
+
+def _delete_unledgered(db: Session, business_id: int, source: str, existing: dict):
+    """Rows stored before the ledger existed would otherwise be duplicated"""
+    ledgered_ids = [row.document_id for row in existing.values() if row.document_id]
+    legacy = db.query(BusinessDocument).filter(
+        BusinessDocument.business_id == business_id,
+        BusinessDocument.source == source,
+        BusinessDocument.id.notin_(ledgered_ids)
+    )
+    if legacy.count():
+        legacy.delete(synchronize_session=False)
+        db.commit()
+
+
+def sync_source(db: Session, business_id: int, source: str, text: str):
+    """
+    Make the stored chunks for a source match `text` exactly.
+
+    Unchanged chunks are skipped, new or changed ones are embedded and
+    written, and chunks that are no longer present are deleted. Syncing
+    unchanged content makes no embedding calls.
+    """
+    chunks = _unique_chunks(chunk_text(text))
+    existing = _ledger_entries(db, business_id, source)
+    provider = embeddings.provider_for_business(business_id)
+
+    stale = [
+        row for h, row in existing.items()
+        if h not in chunks or row.embedding_model != provider.model
+    ]
+    stale_hashes = {row.content_hash for row in stale}
+    new_chunks = [
+        chunk for h, chunk in chunks.items()
+        if h not in existing or h in stale_hashes
+    ]
+
+    _delete_unledgered(db, business_id, source, existing)
+    _apply_changes(db, business_id, source, new_chunks, stale, provider)
+
+    return {
+        "chunks": len(chunks),
+        "added": len(new_chunks),
+        "unchanged": len(chunks) - len(new_chunks),
+        "removed": len(stale) - len(stale_hashes & set(chunks)),
+    }
+
 
-        # Store in vector DB using v4.x API
+def _ledger_rows(db: Session, business_id: int, source: str, hashes) -> list:
+    hashes = list(hashes)
+    rows = []
+    for start in range(0, len(hashes), 500):
+        rows += db.query(IngestedChunk).filter(
+            IngestedChunk.business_id == business_id,
+            IngestedChunk.source == source,
+            IngestedChunk.content_hash.in_(hashes[start:start + 500])
+        ).all()
+    return rows
+
+
+def sync_source_stream(db: Session, business_id: int, source: str, chunks, batch_size: int = None, on_batch=None):
+    """
+    sync_source() for documents too large to chunk in one go: `chunks` is
+    an iterator, and every batch_size new chunks are embedded and
+    committed before more are read, so memory stays bounded.
+
+    on_batch(counts) is called after each batch and may raise to stop.
+    If the stream fails or is stopped, the chunks added so far are removed
+    again and the source keeps its previous content.
+    """
+    batch_size = batch_size or INGEST_BATCH_CHUNKS
+    provider = embeddings.provider_for_business(business_id)
+    existing = _ledger_entries(db, business_id, source)
+    _delete_unledgered(db, business_id, source, existing)
+    # Only hashes and models are kept; the ORM rows expire on every commit
+    existing_models = {h: row.embedding_model for h, row in existing.items()}
+    del existing
+
+    counts = {"chunks": 0, "added": 0, "unchanged": 0, "removed": 0}
+    seen = set()
+    added = set()
+    batch = {}
+
+    def flush():
+        # Chunks embedded with another model are re-written
+        reembed = [h for h in batch if h in existing_models and existing_models[h] != provider.model]
+        new_chunks = [
+            chunk for h, chunk in batch.items()
+            if h not in existing_models or h in reembed
+        ]
+        stale = _ledger_rows(db, business_id, source, reembed) if reembed else []
+        _apply_changes(db, business_id, source, new_chunks, stale, provider)
+        added.update(h for h in batch if h not in existing_models)
+        counts["added"] += len(new_chunks)
+        counts["unchanged"] += len(batch) - len(new_chunks)
+        batch.clear()
+        if on_batch:
+            on_batch(dict(counts))
+
+    try:
+        for chunk in chunks:
+            content_hash = hash_chunk(chunk)
+            if content_hash in seen:
+                continue
+            seen.add(content_hash)
+            batch[content_hash] = chunk
+            counts["chunks"] += 1
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+    except BaseException:
+        if added:
+            try:
+                _apply_changes(db, business_id, source, [], _ledger_rows(db, business_id, source, added), provider)
+            except Exception as cleanup_error:
+                logger.warning(f"⚠️  Could not remove {len(added)} partially ingested chunks for {source}: {cleanup_error}")
+        raise
+
+    gone = [h for h in existing_models if h not in seen]
+    if gone:
+        _apply_changes(db, business_id, source, [], _ledger_rows(db, business_id, source, gone), provider)
+    counts["removed"] = len(gone)
+    return counts
+
+
+def delete_source(db: Session, business_id: int, source: str):
+    """Remove every stored chunk for a source"""
+    stale = list(_ledger_entries(db, business_id, source).values())
+    _apply_changes(db, business_id, source, [], stale)
+    return {"removed": len(stale)}
+
+
+def reembed_business(db: Session, business_id: int, batch_size: int = None, on_batch=None) -> dict:
+    """
+    Re-embed every chunk stored with a different model than the business's
+    current provider, from the chunk text kept in business_documents. Run
+    after changing a business's embedding provider: sources that are
+    re-synced pick up the new model by themselves, but uploads and
+    unchanged website pages are never re-read.
+    """
+    batch_size = batch_size or INGEST_BATCH_CHUNKS
+    provider = embeddings.provider_for_business(business_id)
+    outdated = db.query(IngestedChunk.source).filter(
+        IngestedChunk.business_id == business_id,
+        or_(IngestedChunk.embedding_model != provider.model, IngestedChunk.embedding_model.is_(None))
+    )
+    counts = {"sources": 0, "reembedded": 0}
+    for source in [row[0] for row in outdated.distinct().all()]:
+        while True:
+            # Re-embedded rows no longer match, so each query returns the next batch
+            rows = db.query(IngestedChunk, BusinessDocument.text).join(
+                BusinessDocument, BusinessDocument.id == IngestedChunk.document_id
+            ).filter(
+                IngestedChunk.business_id == business_id,
+                IngestedChunk.source == source,
+                or_(IngestedChunk.embedding_model != provider.model, IngestedChunk.embedding_model.is_(None))
+            ).limit(batch_size).all()
+            if not rows:
+                break
+            _apply_changes(db, business_id, source, [text for _, text in rows], [row for row, _ in rows], provider)
+            counts["reembedded"] += len(rows)
+            if on_batch:
+                on_batch(dict(counts))
+        counts["sources"] += 1
+    if counts["reembedded"]:
+        logger.info(f"🧠 Re-embedded {counts['reembedded']} chunks in {counts['sources']} sources "
+                    f"for business {business_id} with {provider.model}")
+    return counts
+
+
+def list_sources(db: Session, business_id: int, prefix: str = "") -> list:
+    """Sources with ledger entries for a business, optionally filtered by prefix"""
+    query = db.query(IngestedChunk.source).filter(IngestedChunk.business_id == business_id)
+    if prefix:
+        query = query.filter(IngestedChunk.source.startswith(prefix))
+    return [row[0] for row in query.distinct().all()]
+
+
+def _query_collection(business_id: int, query_vector: list, limit: int = None, with_scores: bool = False,
+                      model: str = None) -> list:
+    """Nearest-neighbour search within one business (blocking)"""
+    weaviate_client = get_weaviate_client()
+    collection = get_collection(weaviate_client, business_id, create_tenant=False, model=model)
+    if collection is None:
+        return []
+    
+    # Single-tenant collections need an explicit filter to stay within the business
+    filters = None
+    if not _multi_tenancy.get(embeddings.collection_name(CLASS_NAME, model)):
+        filters = Filter.by_property("business_id").equal(str(business_id))
+    
+    # Query using v4.x API
+    response = collection.query.near_vector(
+        near_vector=query_vector,
+        limit=limit or RAG_SEARCH_LIMIT,
+        filters=filters,
+        return_properties=["text", "business_id"],
+        return_metadata=MetadataQuery(distance=True) if with_scores else None
+    )
+    
+    if with_scores:
+        return [
+            (obj.properties.get("text"), 1.0 - (obj.metadata.distance or 0.0))
+            for obj in response.objects or []
+        ]
+    
+    # Extract results
+    results = []
+    if response.objects:
+        for obj in response.objects:
+            results.append({
+                "text": obj.properties.get("text"),
+                "business_id": obj.properties.get("business_id")
+            })
+    
+    return results
+
+
+def _retrieve(business_id: int, query: str, query_vector: list, model: str = None) -> list:
+    """Run the configured retrieval mode (blocking)"""
+    if RAG_SEARCH_MODE == "vector":
+        return _query_collection(business_id, query_vector, model=model)
+
+    vector_hits = []
+    if query_vector is not None:
         try:
-            collection.data.insert(
-                properties={
-                    "business_id": str(business_id),
-                    "text": chunk
-                },
-                vector=vector
-            )
+            vector_hits = _query_collection(business_id, query_vector, limit=RAG_CANDIDATES, with_scores=True,
+                                            model=model)
         except Exception as e:
-            raise Exception(f"Failed to insert into Weaviate: {e}")
+            # Lexical results alone still answer most exact lookups
+            logger.warning(f"Vector search failed, using lexical results only: {e}")
 
-        # Store raw text in Postgres
-        db_obj = BusinessDocument(
-            business_id=business_id,
-            text=chunk,
-            source=source
-        )
-        db.add(db_obj)
+    index = hybrid_search.get_index(business_id)
+    lexical_hits = index.search(query, RAG_CANDIDATES)
+    texts = hybrid_search.combine(query, vector_hits, lexical_hits, RAG_SEARCH_LIMIT, index=index)
+    return [{"text": text, "business_id": str(business_id)} for text in texts]
 
-    db.commit()
-    return True
+
+def _needs_embedding() -> bool:
+    return RAG_SEARCH_MODE != "lexical"
 
 
 def search_knowledge(business_id: int, query: str):
-    query_vector = embed_text(query)
-    weaviate_client = get_weaviate_client()
+    # Read first: a re-ingest committed during the search bumps it again
+    generation = rag_cache.knowledge_generation(business_id)
+    cached = rag_cache.get_results(business_id, query, generation)
+    if cached is not None:
+        return cached
+
+    provider = embeddings.provider_for_business(business_id)
+    query_vector = None
+    if _needs_embedding():
+        query_vector = rag_cache.get_embedding(provider.model, query)
+        if query_vector is None:
+            query_vector = provider.embed_query(query)
+            rag_cache.set_embedding(provider.model, query, query_vector)
 
     try:
-        collection = weaviate_client.collections.get(CLASS_NAME)
-        
-        # Query using v4.x API
-        response = collection.query.near_vector(
-            near_vector=query_vector,
-            limit=5,
-            return_properties=["text", "business_id"]
-        )
-        
-        # Extract results
-        results = []
-        if response.objects:
-            for obj in response.objects:
-                results.append({
-                    "text": obj.properties.get("text"),
-                    "business_id": obj.properties.get("business_id")
-                })
-        
-        return results
+        results = _retrieve(business_id, query, query_vector, provider.model)
     except Exception as e:
-        print(f"Search error: {e}")
+        logger.warning(f"Search error: {e}")
         return []
+
+    rag_cache.set_results(business_id, query, results, generation)
+    return results
+
+
+async def _run_blocking(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(_search_executor, fn, *args)
+
+
+async def embed_text_async(text: str, business_id: int = None):
+    provider = embeddings.provider_for_business(business_id) if business_id else embeddings.get_provider()
+    return await provider.embed_query_async(text)
+
+
+async def _cache_call(fn, *args):
+    """Local cache lookups are cheap; the Redis tier is a network call"""
+    if rag_cache.RAG_CACHE_REDIS:
+        return await _run_blocking(fn, *args)
+    return fn(*args)
+
+
+async def search_knowledge_async(business_id: int, query: str):
+    """
+    Event-loop friendly search_knowledge for the realtime bridge.
+
+    The query embedding uses the async OpenAI client (local models run on
+    a thread) and the Weaviate query (and Redis cache tier, if enabled)
+    runs on a dedicated thread pool, so other calls on this worker keep
+    streaming audio meanwhile.
+    """
+    generation = await _cache_call(rag_cache.knowledge_generation, business_id)
+    cached = await _cache_call(rag_cache.get_results, business_id, query, generation)
+    if cached is not None:
+        return cached
+
+    provider = embeddings.provider_for_business(business_id)
+    query_vector = None
+    if _needs_embedding():
+        query_vector = await _cache_call(rag_cache.get_embedding, provider.model, query)
+        if query_vector is None:
+            query_vector = await provider.embed_query_async(query)
+            await _cache_call(rag_cache.set_embedding, provider.model, query, query_vector)
+
+    try:
+        results = await _run_blocking(_retrieve, business_id, query, query_vector, provider.model)
+    except Exception as e:
+        logger.warning(f"Search error: {e}")
+        return []
+
+    await _cache_call(rag_cache.set_results, business_id, query, results, generation)
+    return results
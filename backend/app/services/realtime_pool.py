@@ -0,0 +1,216 @@
+"""
+Realtime Session Pool
+Keeps a few OpenAI Realtime connections open and pre-configured with the
+settings every call shares (audio formats, voice, VAD), so a new call
+only has to patch in its business instructions instead of paying for the
+TLS handshake and a full session.update while the caller waits.
+
+Each connection serves exactly one call and is closed afterwards; the
+pool refills in the background. Idle connections are pinged periodically
+and replaced once they pass REALTIME_POOL_MAX_IDLE.
+
+Checking an idle connection needs the SDK's underlying websocket, which
+is private. If a connection doesn't expose it, the pool stops pre-opening
+and every call gets a fresh connection.
+"""
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from openai import AsyncOpenAI
+
+
+logger = logging.getLogger(__name__)
+
+
+REALTIME_MODEL = os.getenv("OPENAI_MODEL_REALTIME", "gpt-4o-realtime-preview-2024-12-17")
+REALTIME_POOL_SIZE = int(os.getenv("REALTIME_POOL_SIZE", "2"))
+REALTIME_POOL_MAX_IDLE = float(os.getenv("REALTIME_POOL_MAX_IDLE", "300"))
+REALTIME_POOL_CHECK_INTERVAL = float(os.getenv("REALTIME_POOL_CHECK_INTERVAL", "20"))
+REALTIME_POOL_PING_TIMEOUT = float(os.getenv("REALTIME_POOL_PING_TIMEOUT", "2"))
+
+# Session settings shared by every call; business-specific instructions
+# and tools are sent on checkout
+BASE_SESSION = {
+    "modalities": ["text", "audio"],
+    "voice": "shimmer",
+    "input_audio_format": "g711_ulaw",
+    "output_audio_format": "g711_ulaw",
+    "input_audio_transcription": {"model": "whisper-1"},
+    "turn_detection": {
+        "type": "server_vad",
+        "threshold": 0.6,
+        "prefix_padding_ms": 500,
+        "silence_duration_ms": 1000
+    },
+    "tool_choice": "auto",
+}
+
+client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+
+def _websocket(connection):
+    """The SDK connection's websocket, or None (and no more pooling) if it isn't exposed"""
+    global _inspectable
+    websocket = getattr(connection, "_connection", None)
+    if websocket is None and _inspectable:
+        _inspectable = False
+        logger.warning("⚠️  Realtime connections don't expose their websocket, pooling disabled")
+    return websocket
+
+
+class PooledConnection:
+    def __init__(self, connection):
+        self.connection = connection
+        self.created_at = time.monotonic()
+
+    @property
+    def idle_for(self) -> float:
+        return time.monotonic() - self.created_at
+
+    @property
+    def is_open(self) -> bool:
+        from websockets.protocol import State
+        websocket = _websocket(self.connection)
+        return websocket is not None and websocket.state is State.OPEN
+
+
+_idle = []
+_filling = 0
+_inspectable = True    # False once a connection turns out not to expose its websocket
+_maintainer = None
+_background = set()
+_stats = {"warm_checkouts": 0, "cold_checkouts": 0, "expired": 0, "unhealthy": 0}
+
+
+async def _open():
+    """New Realtime connection with the shared session settings applied"""
+    connection = await client.beta.realtime.connect(model=REALTIME_MODEL).enter()
+    await connection.session.update(session=BASE_SESSION)
+    return connection
+
+
+async def _close(connection):
+    try:
+        await connection.close()
+    except Exception:
+        pass
+
+
+async def _healthy(pooled: PooledConnection) -> bool:
+    if not pooled.is_open:
+        return False
+    try:
+        pong = await _websocket(pooled.connection).ping()
+        await asyncio.wait_for(pong, timeout=REALTIME_POOL_PING_TIMEOUT)
+        return True
+    except Exception:
+        return False
+
+
+async def _fill():
+    """Open connections until the pool is back to REALTIME_POOL_SIZE"""
+    global _filling
+    missing = REALTIME_POOL_SIZE - len(_idle) - _filling
+    if missing <= 0 or not _inspectable:
+        return
+    _filling += missing
+    try:
+        results = await asyncio.gather(*(_open() for _ in range(missing)), return_exceptions=True)
+    finally:
+        _filling -= missing
+    errors = [result for result in results if isinstance(result, Exception)]
+    if errors:
+        logger.warning(f"⚠️  Could not pre-open {len(errors)} Realtime session(s): {errors[0]}")
+    for result in results:
+        if isinstance(result, Exception):
+            continue
+        if _maintainer is None or _websocket(result) is None:
+            # Pool was shut down while connecting, or can't check the connection
+            await _close(result)
+        else:
+            _idle.append(PooledConnection(result))
+
+
+async def _check():
+    """Drop idle connections that expired or stopped answering pings"""
+    for pooled in list(_idle):
+        if pooled.idle_for > REALTIME_POOL_MAX_IDLE:
+            reason = "expired"
+        elif not await _healthy(pooled):
+            reason = "unhealthy"
+        else:
+            continue
+        if pooled in _idle:
+            _idle.remove(pooled)
+            _stats[reason] += 1
+            await _close(pooled.connection)
+
+
+async def _maintain():
+    while True:
+        try:
+            await _check()
+            await _fill()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"⚠️  Realtime pool maintenance failed: {e}")
+        await asyncio.sleep(REALTIME_POOL_CHECK_INTERVAL)
+
+
+def start():
+    """Begin warming connections (called from the app lifespan)"""
+    global _maintainer
+    if REALTIME_POOL_SIZE > 0 and _maintainer is None:
+        _maintainer = asyncio.create_task(_maintain())
+
+
+async def shutdown():
+    global _maintainer
+    if _maintainer is not None:
+        _maintainer.cancel()
+        _maintainer = None
+    while _idle:
+        await _close(_idle.pop().connection)
+
+
+def _refill_soon():
+    if _maintainer is not None:
+        task = asyncio.create_task(_fill())
+        _background.add(task)
+        task.add_done_callback(_background.discard)
+
+
+async def acquire():
+    """
+    Check out a configured Realtime connection, warm if one is available.
+    The caller owns it afterwards and must close it.
+    """
+    while _idle:
+        pooled = _idle.pop(0)
+        if pooled.is_open and pooled.idle_for <= REALTIME_POOL_MAX_IDLE:
+            _stats["warm_checkouts"] += 1
+            _refill_soon()
+            return pooled.connection
+        _stats["expired" if pooled.is_open else "unhealthy"] += 1
+        await _close(pooled.connection)
+
+    _stats["cold_checkouts"] += 1
+    _refill_soon()
+    return await _open()
+
+
+@asynccontextmanager
+async def realtime_session():
+    """`async with realtime_session() as openai_ws:` for one call"""
+    connection = await acquire()
+    try:
+        yield connection
+    finally:
+        await _close(connection)
+
+
+def stats() -> dict:
+    return {"idle": len(_idle), "size": REALTIME_POOL_SIZE, **_stats}
@@ -0,0 +1,110 @@
+"""
+Compiled Realtime Session Config
+Builds the business-specific part of the Realtime session.update (the
+instructions and the tools the business has enabled) once per business
+version, and caches the ready-to-send JSON. Shared settings such as audio
+formats and VAD are applied by realtime_pool when a connection is opened.
+"""
+import json
+import threading
+
+
+RAG_SEARCH_TOOL = {
+    "type": "function",
+    "name": "rag_search",
+    "description": "Search business knowledge base",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "query": {"type": "string", "description": "Search query"}
+        },
+        "required": ["query"]
+    }
+}
+
+TRANSFER_CALL_TOOL = {
+    "type": "function",
+    "name": "transfer_call",
+    "description": "Transfer call to forwarding number",
+    "parameters": {"type": "object", "properties": {}}
+}
+
+END_CALL_TOOL = {
+    "type": "function",
+    "name": "end_call",
+    "description": "End the call when the caller is done or when the demo time limit is reached. Use this when the caller says goodbye, thanks, or indicates they're finished, or when you've reached the 1 minute 30 second time limit.",
+    "parameters": {"type": "object", "properties": {}}
+}
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def _action_enabled(allowed_actions: dict, action: str) -> bool:
+    # Businesses created without allowed_actions keep the tools they always had
+    return bool((allowed_actions or {}).get(action, True))
+
+
+def rag_search_enabled(business) -> bool:
+    return _action_enabled(business.allowed_actions, "rag_search")
+
+
+def build_tools(business) -> list:
+    """Tools for the actions this business has enabled"""
+    allowed_actions = business.allowed_actions
+    tools = []
+    if _action_enabled(allowed_actions, "rag_search"):
+        tools.append(RAG_SEARCH_TOOL)
+    if _action_enabled(allowed_actions, "transfer") and business.forwarding_number:
+        tools.append(TRANSFER_CALL_TOOL)
+    tools.append(END_CALL_TOOL)
+    return tools
+
+
+def build_instructions(business) -> str:
+    instructions = f"""CRITICAL FIRST MESSAGE: When the call starts, you MUST say EXACTLY: "This is the DEMO for AI Receptionist. Would you like to learn what I can do?" and nothing else first. DO NOT say "thanks for calling" or mention any business name.
+
+You are the AI receptionist for {business.name or 'the business'}.
+Tone: {business.tone or 'friendly and helpful'}
+Instructions: {business.instructions or 'Be helpful and answer questions professionally.'}
+"""
+    if _action_enabled(business.allowed_actions, "rag_search"):
+        instructions += "\nIf a caller asks business-related questions, check RAG memory using function: rag_search.\n"
+    instructions += f"\nAllowed actions: {json.dumps(business.allowed_actions or {})}"
+    return instructions
+
+
+def compile_session_update(business) -> str:
+    """Encoded session.update event for a business snapshot"""
+    return json.dumps({
+        "type": "session.update",
+        "session": {
+            "instructions": build_instructions(business),
+            "tools": build_tools(business),
+        }
+    })
+
+
+def get_session_update(business) -> str:
+    """Cached session.update for this business version, compiling on a miss"""
+    cached = _cache.get(business.id)
+    if cached is not None and cached[0] == business.version:
+        return cached[1]
+
+    payload = compile_session_update(business)
+    with _lock:
+        current = _cache.get(business.id)
+        # Never replace a newer version compiled by a concurrent call
+        if current is None or current[0] < business.version:
+            _cache[business.id] = (business.version, payload)
+    return payload
+
+
+def invalidate(business_id: int):
+    with _lock:
+        _cache.pop(business_id, None)
+
+
+def clear():
+    with _lock:
+        _cache.clear()
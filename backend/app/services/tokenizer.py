@@ -0,0 +1,49 @@
+"""
+Token counting helpers shared by the embedding pipeline and the chunker
+"""
+import logging
+import os
+import tiktoken
+
+
+logger = logging.getLogger(__name__)
+
+
+TIKTOKEN_ENCODING = os.getenv("TIKTOKEN_ENCODING", "cl100k_base")
+
+# Rough chars-per-token ratio for English text, used when the BPE file
+# can't be loaded (e.g. containers without outbound network access)
+APPROX_CHARS_PER_TOKEN = 4
+
+_encoding = None
+_encoding_unavailable = False
+
+
+def get_encoding():
+    """Lazily load the tiktoken encoding used by the OpenAI embedding models"""
+    global _encoding, _encoding_unavailable
+    if _encoding is None and not _encoding_unavailable:
+        try:
+            _encoding = tiktoken.get_encoding(TIKTOKEN_ENCODING)
+        except Exception as e:
+            logger.warning(f"⚠️  Could not load tiktoken encoding '{TIKTOKEN_ENCODING}', estimating token counts: {e}")
+            _encoding_unavailable = True
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    encoding = get_encoding()
+    if encoding is None:
+        return -(-len(text) // APPROX_CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text down to at most max_tokens tokens"""
+    encoding = get_encoding()
+    if encoding is None:
+        return text[:max_tokens * APPROX_CHARS_PER_TOKEN]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
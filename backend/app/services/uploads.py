@@ -0,0 +1,285 @@
+"""
+Document Uploads
+Streams an uploaded file (multipart form or raw request body) straight to
+a spool file on disk, then ingests it in a background job:
+
+    spool file -> text pieces -> iter_chunks() -> sync_source_stream()
+
+Every stage pulls from the one before it, so at most one read buffer and
+one embedding batch are in memory regardless of file size. The number of
+uploads waiting for a job worker is capped, and further uploads are
+refused with 429 until the queue drains.
+
+Supported: .txt, .md (text and markdown), .html/.htm, and .pdf (text
+layer only, needs the optional pypdf package).
+"""
+import asyncio
+import codecs
+import importlib.util
+import logging
+import os
+import tempfile
+import uuid
+from fastapi import HTTPException, Request
+from python_multipart import MultipartParser
+from python_multipart.multipart import parse_options_header
+from app.db import SessionLocal
+from app.services import jobs
+from app.services.chunker import iter_chunks
+from app.services.rag_service import sync_source_stream
+
+
+logger = logging.getLogger(__name__)
+
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "receptionist-uploads"))
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(100 * 1024 * 1024)))
+UPLOAD_READ_SIZE = int(os.getenv("UPLOAD_READ_SIZE", str(64 * 1024)))
+MAX_PENDING_UPLOADS = int(os.getenv("MAX_PENDING_UPLOADS", "20"))
+
+JOB_KIND = "document_upload"
+
+_FORMATS = {
+    ".txt": "text",
+    ".md": "text",
+    ".markdown": "text",
+    ".html": "html",
+    ".htm": "html",
+    ".pdf": "pdf",
+}
+_CONTENT_TYPES = {
+    "text/plain": "text",
+    "text/markdown": "text",
+    "text/html": "html",
+    "application/pdf": "pdf",
+}
+
+# job id -> spool path, for uploads that are queued or running
+_spooled = {}
+
+
+class SpooledUpload:
+    def __init__(self, path: str, filename: str, fmt: str, size: int):
+        self.path = path
+        self.filename = filename
+        self.fmt = fmt
+        self.size = size
+
+
+def detect_upload_format(filename: str, content_type: str = None):
+    """'text', 'html' or 'pdf' from the file extension, else the content type"""
+    fmt = _FORMATS.get(os.path.splitext(filename or "")[1].lower())
+    if fmt is None and content_type:
+        fmt = _CONTENT_TYPES.get(content_type.split(";")[0].strip().lower())
+    return fmt
+
+
+def _check_supported(fmt: str):
+    if fmt is None:
+        raise HTTPException(status_code=415, detail="Unsupported file type (txt, md, html, pdf)")
+    if fmt == "pdf" and importlib.util.find_spec("pypdf") is None:
+        raise HTTPException(status_code=415, detail="PDF uploads need the pypdf package")
+
+
+def _remove(path: str):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def _cleanup_orphans():
+    """Delete spool files of uploads cancelled before their job started"""
+    for job_id, path in list(_spooled.items()):
+        job = jobs.get_job(job_id)
+        if not job or job.status not in jobs.ACTIVE_STATES:
+            _spooled.pop(job_id, None)
+            _remove(path)
+
+
+def pending_uploads() -> int:
+    return sum(1 for job in jobs.list_jobs(JOB_KIND) if job.status == jobs.QUEUED)
+
+
+class _MultipartFile:
+    """Collects the first file part of a multipart body; data goes to the caller to write"""
+
+    def __init__(self, boundary: bytes):
+        self.filename = None
+        self.content_type = None
+        self.data = bytearray()
+        self.done = False
+        self._in_file = False
+        self._header_field = b""
+        self._header_value = b""
+        self._headers = {}
+        self.parser = MultipartParser(boundary, {
+            "on_part_begin": self._part_begin,
+            "on_header_field": self._header_field_data,
+            "on_header_value": self._header_value_data,
+            "on_header_end": self._header_end,
+            "on_headers_finished": self._headers_finished,
+            "on_part_data": self._part_data,
+            "on_part_end": self._part_end,
+        })
+
+    def _part_begin(self):
+        self._headers = {}
+
+    def _header_field_data(self, data, start, end):
+        self._header_field += data[start:end]
+
+    def _header_value_data(self, data, start, end):
+        self._header_value += data[start:end]
+
+    def _header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        filename = options.get(b"filename")
+        self._in_file = filename is not None and self.filename is None and not self.done
+        if self._in_file:
+            # Sources are stored in a 200-char column
+            self.filename = os.path.basename(filename.decode("utf-8", errors="replace"))[:150]
+            self.content_type = self._headers.get(b"content-type", b"").decode("latin-1") or None
+
+    def _part_data(self, data, start, end):
+        if self._in_file:
+            self.data += data[start:end]
+
+    def _part_end(self):
+        if self._in_file:
+            self._in_file = False
+            self.done = True
+
+
+async def receive_upload(request: Request, filename: str = None) -> SpooledUpload:
+    """
+    Write the request's file to a spool file as it arrives. Accepts a
+    multipart/form-data body (first file field) or a raw body with the
+    file name in `filename`. Raises 413 past UPLOAD_MAX_BYTES and 415 for
+    unsupported types.
+    """
+    if pending_uploads() >= MAX_PENDING_UPLOADS:
+        raise HTTPException(status_code=429, detail="Too many uploads waiting to be ingested, try again shortly")
+
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    multipart = None
+    if content_type == b"multipart/form-data":
+        if not options.get(b"boundary"):
+            raise HTTPException(status_code=400, detail="Missing multipart boundary")
+        multipart = _MultipartFile(options[b"boundary"])
+    else:
+        fmt = detect_upload_format(filename, content_type.decode("latin-1"))
+        _check_supported(fmt)
+
+    _cleanup_orphans()
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    path = os.path.join(UPLOAD_DIR, uuid.uuid4().hex)
+    size = 0
+    spool = await asyncio.to_thread(open, path, "wb")
+    try:
+        async for piece in request.stream():
+            if multipart is not None:
+                multipart.parser.write(piece)
+                piece = bytes(multipart.data)
+                multipart.data.clear()
+            if not piece:
+                continue
+            size += len(piece)
+            if size > UPLOAD_MAX_BYTES:
+                raise HTTPException(status_code=413, detail=f"File larger than {UPLOAD_MAX_BYTES} bytes")
+            # Reading the next piece waits for this write, so a slow disk slows the client down
+            await asyncio.to_thread(spool.write, piece)
+
+        if multipart is not None:
+            multipart.parser.finalize()
+            if multipart.filename is None:
+                raise HTTPException(status_code=400, detail="No file in upload")
+            filename = multipart.filename
+            fmt = detect_upload_format(filename, multipart.content_type)
+            _check_supported(fmt)
+    except BaseException:
+        spool.close()
+        _remove(path)
+        raise
+    spool.close()
+
+    if not size:
+        _remove(path)
+        raise HTTPException(status_code=400, detail="Empty file")
+    return SpooledUpload(path, os.path.basename(filename or "upload")[:150], fmt, size)
+
+
+def _iter_file_text(path: str, job):
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    with open(path, "rb") as f:
+        while True:
+            piece = f.read(UPLOAD_READ_SIZE)
+            if not piece:
+                break
+            job.update(bytes_read=f.tell())
+            yield decoder.decode(piece)
+        yield decoder.decode(b"", final=True)
+
+
+def _iter_pdf_text(path: str, job):
+    from pypdf import PdfReader
+
+    # An open file keeps pypdf reading from disk; given a path it loads the whole file
+    with open(path, "rb") as f:
+        reader = PdfReader(f)
+        job.update(pages_total=len(reader.pages))
+        for number, page in enumerate(reader.pages, start=1):
+            text = page.extract_text() or ""
+            job.update(pages_done=number)
+            # Page breaks are paragraph breaks for the chunker
+            yield text + "\n\n"
+
+
+def run_upload_job(job, business_id: int, upload: SpooledUpload, source: str):
+    """Job entry point: chunk, embed and store a spooled upload"""
+    logger.info(f"📄 Ingesting {upload.filename} ({upload.size} bytes) as {source}")
+    db = SessionLocal()
+    try:
+        if upload.fmt == "pdf":
+            pieces = _iter_pdf_text(upload.path, job)
+        else:
+            pieces = _iter_file_text(upload.path, job)
+
+        def on_batch(counts):
+            job.update(**counts)
+            job.check_cancelled()
+
+        result = sync_source_stream(
+            db, business_id, source,
+            iter_chunks(pieces, fmt="html" if upload.fmt == "html" else "text"),
+            on_batch=on_batch,
+        )
+        job.update(**result)
+        logger.info(f"✅ {upload.filename}: {result['added']} new, {result['unchanged']} unchanged, "
+                    f"{result['removed']} removed chunks")
+        return result
+    finally:
+        db.close()
+        _remove(upload.path)
+        _spooled.pop(job.id, None)
+
+
+def enqueue_upload(business_id: int, upload: SpooledUpload, source: str = None):
+    """Queue ingestion of a spooled upload; re-uploading a file replaces its chunks"""
+    source = source or f"upload:{upload.filename}"
+    key = f"{JOB_KIND}:{business_id}:{source}"
+    for job in jobs.list_jobs(JOB_KIND):
+        if job.key == key and job.status in jobs.ACTIVE_STATES:
+            _remove(upload.path)
+            raise HTTPException(status_code=409, detail=f"{source} is already being ingested (job {job.id})")
+
+    # The file is only on this worker, so wait for another worker's ingest of the source
+    job = jobs.submit(JOB_KIND, run_upload_job, business_id, upload, source, key=key, on_conflict=jobs.RETRY)
+    _spooled[job.id] = upload.path
+    job.update(business_id=business_id, source=source, filename=upload.filename, bytes_total=upload.size)
+    return job
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Chunker Benchmark
+Throughput, peak memory and chunk-size spread on MB-scale documents for
+the original 600-word / 100-word-overlap splitter and the token-aware
+chunker in app/services/chunker.py. The generated document is markdown
+with headings, lists, prose and some token-dense lines (URLs, IDs,
+tables), which is what makes word counts a poor proxy for tokens.
+
+Peak memory is measured with tracemalloc in a separate pass, so the
+throughput numbers aren't slowed down by tracing. The "streamed" mode
+reads the document from a file and never holds it in memory.
+
+Usage:
+    python benchmarks/bench_chunker.py --mb 8
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.services.chunker import iter_chunks
+from app.services.tokenizer import count_tokens, get_encoding
+
+
+EMBED_MAX_INPUT_TOKENS = 8191
+
+WORDS = (
+    "appointment cleaning insurance whitening orthodontic emergency family "
+    "patients hygienist schedule available weekdays evenings parking office "
+    "treatment consultation payment plans accepted coverage crowns implants"
+).split()
+
+
+def legacy_chunk_text(text: str, chunk_size=600, overlap=100):
+    words = text.split()
+    chunks = []
+
+    start = 0
+    while start < len(words):
+        end = start + chunk_size
+        chunk_words = words[start:end]
+        chunks.append(" ".join(chunk_words))
+        start += chunk_size - overlap
+
+    return chunks
+
+
+def make_document(target_bytes: int, seed: int = 7) -> str:
+    rng = random.Random(seed)
+    parts = []
+    size = 0
+    section = 0
+    while size < target_bytes:
+        section += 1
+        block = [f"## Section {section}: {rng.choice(WORDS).title()} information", ""]
+        for _ in range(rng.randint(2, 5)):
+            sentences = []
+            for _ in range(rng.randint(2, 6)):
+                words = [rng.choice(WORDS) for _ in range(rng.randint(6, 22))]
+                sentences.append(" ".join(words).capitalize() + rng.choice(".!?"))
+            block += [" ".join(sentences), ""]
+        block += [f"- {rng.choice(WORDS)} {rng.choice(WORDS)} included" for _ in range(rng.randint(2, 6))] + [""]
+        if section % 4 == 0:
+            # Token-dense content: few words, many tokens
+            block += [
+                " ".join(f"https://example.com/p/{rng.getrandbits(64):x}?ref={rng.getrandbits(32):x}" for _ in range(40)),
+                "",
+                " ".join(f"|{rng.randint(0, 99999)}|{rng.getrandbits(48):x}|" for _ in range(120)),
+                "",
+            ]
+        text = "\n".join(block) + "\n"
+        parts.append(text)
+        size += len(text)
+    return "".join(parts)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def peak_memory(fn) -> float:
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1e6
+
+
+def size_summary(chunks: list, source_tokens: int) -> str:
+    sizes = [count_tokens(chunk) for chunk in chunks]
+    over = sum(1 for s in sizes if s > EMBED_MAX_INPUT_TOKENS)
+    spread = statistics.pstdev(sizes) / statistics.mean(sizes)
+    overhead = sum(sizes) / source_tokens - 1
+    return (
+        f"{len(chunks):6d} chunks   tokens p50 {statistics.median(sizes):6.0f}  max {max(sizes):6d}  "
+        f"cv {spread:4.2f}   >{EMBED_MAX_INPUT_TOKENS}: {over:3d}   overlap spend {overhead:6.1%}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mb", type=float, default=4)
+    parser.add_argument("--max-tokens", type=int, default=None)
+    parser.add_argument("--overlap-tokens", type=int, default=None)
+    args = parser.parse_args()
+
+    estimating = get_encoding() is None
+    document = make_document(int(args.mb * 1_000_000))
+    mb = len(document) / 1e6
+    source_tokens = count_tokens(document)
+
+    def new_chunks():
+        return list(iter_chunks(document, args.max_tokens, args.overlap_tokens, fmt="text"))
+
+    legacy, legacy_s = timed(lambda: legacy_chunk_text(document))
+    chunks, new_s = timed(new_chunks)
+
+    with tempfile.NamedTemporaryFile("w", suffix=".md", delete=False) as f:
+        f.write(document)
+        path = f.name
+
+    def streamed():
+        count = 0
+        with open(path) as doc:
+            for _ in iter_chunks(doc, args.max_tokens, args.overlap_tokens, fmt="text"):
+                count += 1
+        return count
+
+    streamed_count, streamed_s = timed(streamed)
+
+    legacy_peak = peak_memory(lambda: legacy_chunk_text(document))
+    new_peak = peak_memory(new_chunks)
+    streamed_peak = peak_memory(streamed)
+    os.unlink(path)
+
+    print(f"\n📄 {mb:.1f} MB markdown, {source_tokens:,} tokens"
+          + (" (token counts estimated: tiktoken encoding unavailable)" if estimating else ""))
+    print(f"   legacy 600/100 words   {mb / legacy_s:7.1f} MB/s   peak {legacy_peak:7.2f} MB (on top of the document)")
+    print(f"   token-aware (list)     {mb / new_s:7.1f} MB/s   peak {new_peak:7.2f} MB")
+    print(f"   token-aware (streamed) {mb / streamed_s:7.1f} MB/s   peak {streamed_peak:7.2f} MB   ({streamed_count} chunks)")
+    print("\n   chunk sizes:")
+    print(f"   legacy      {size_summary(legacy, source_tokens)}")
+    print(f"   token-aware {size_summary(chunks, source_tokens)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Embedding Throughput Benchmark
+Compares one-request-per-chunk embedding against the batched pipeline,
+using a local fake OpenAI embeddings server with simulated network latency.
+
+Usage:
+    python benchmarks/bench_embeddings.py --chunks 500 --latency-ms 80
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from openai import OpenAI
+from app.services.embedding_batcher import embed_texts
+
+
+DIMENSIONS = 256
+
+
+def make_handler(latency_s: float, per_input_s: float):
+    class FakeEmbeddingsHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length))
+            inputs = body["input"]
+            if isinstance(inputs, str):
+                inputs = [inputs]
+
+            time.sleep(latency_s + per_input_s * len(inputs))
+
+            payload = json.dumps({
+                "object": "list",
+                "model": body.get("model"),
+                "data": [
+                    {"object": "embedding", "index": i, "embedding": [0.001 * (i % 7)] * DIMENSIONS}
+                    for i in range(len(inputs))
+                ],
+                "usage": {"prompt_tokens": 0, "total_tokens": 0},
+            }).encode()
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    return FakeEmbeddingsHandler
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=300)
+    parser.add_argument("--latency-ms", type=float, default=80.0)
+    parser.add_argument("--per-input-ms", type=float, default=0.2)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", 0),
+        make_handler(args.latency_ms / 1000, args.per_input_ms / 1000)
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+    client = OpenAI(api_key="bench", base_url=base_url, max_retries=0)
+    model = "text-embedding-3-large"
+    chunks = [f"Chunk {i}: " + ("our office is open monday to friday " * 60) for i in range(args.chunks)]
+
+    print(f"📊 {args.chunks} chunks, {args.latency_ms:.0f}ms simulated round-trip\n")
+
+    start = time.perf_counter()
+    for chunk in chunks:
+        client.embeddings.create(model=model, input=chunk)
+    sequential = time.perf_counter() - start
+    print(f"   one request per chunk: {sequential:7.2f}s  {args.chunks / sequential:9.1f} chunks/sec")
+
+    start = time.perf_counter()
+    vectors = embed_texts(chunks, client=client, model=model)
+    batched = time.perf_counter() - start
+    assert len(vectors) == len(chunks)
+    print(f"   batched pipeline:      {batched:7.2f}s  {args.chunks / batched:9.1f} chunks/sec")
+
+    print(f"\n   speedup: {sequential / batched:.1f}x")
+    server.shutdown()
+    server.server_close()
+
+
+if __name__ == "__main__":
+    main()
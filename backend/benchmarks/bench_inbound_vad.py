@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Inbound VAD Benchmark
+CPU cost per 20ms frame of the local silence suppression in
+app/services/inbound_vad.py, next to what the bridge already spends on
+every inbound frame:
+
+  forward only      encode_audio_append, the existing fast path
+  vad + forward     InboundVad.process, then encode the frames it returns
+  levels, batched   frame_levels over a whole call at once (NumPy over
+                    frames as well as samples), per frame
+
+It also reports how many frames and how much audio each call would no
+longer send to OpenAI. The calls are the generated ones from
+check_inbound_vad.py.
+
+Usage:
+    python benchmarks/bench_inbound_vad.py --calls 3 --repeat 3
+"""
+import argparse
+import base64
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from check_inbound_vad import FRAME, make_call
+from app.services import inbound_vad
+from app.services.media_frames import encode_audio_append
+
+
+def per_frame_us(fn, payloads: list, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(payloads)
+        best = min(best, time.perf_counter() - start)
+    return best / len(payloads) * 1e6
+
+
+def forward_only(payloads: list):
+    for payload in payloads:
+        encode_audio_append(payload)
+
+
+def vad_and_forward(payloads: list):
+    vad = inbound_vad.InboundVad()
+    for payload in payloads:
+        for frame in vad.process(payload):
+            encode_audio_append(frame)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=3)
+    parser.add_argument("--seconds", type=float, default=60.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    calls = [make_call(seed, args.seconds)[0] for seed in range(args.calls)]
+    payloads = [
+        base64.b64encode(audio[i:i + FRAME]).decode()
+        for audio in calls for i in range(0, len(audio), FRAME)
+    ]
+
+    print(f"\n🔇 {len(payloads)} frames from {args.calls} generated calls of {args.seconds:.0f}s")
+    baseline = per_frame_us(forward_only, payloads, args.repeat)
+    with_vad = per_frame_us(vad_and_forward, payloads, args.repeat)
+    batched = per_frame_us(lambda _: [inbound_vad.frame_levels(audio) for audio in calls], payloads, args.repeat)
+    print(f"   {'forward only':<18} {baseline:6.2f} µs/frame")
+    print(f"   {'vad + forward':<18} {with_vad:6.2f} µs/frame  (+{with_vad - baseline:.2f}; "
+          f"a frame lasts 20000 µs)")
+    print(f"   {'levels, batched':<18} {batched:6.2f} µs/frame")
+
+    for seed, audio in enumerate(calls):
+        vad = inbound_vad.InboundVad()
+        for i in range(0, len(audio), FRAME):
+            vad.process(base64.b64encode(audio[i:i + FRAME]).decode())
+        vad.close()
+        print(f"   call {seed}: {vad.suppressed} of {vad.frames} frames not sent "
+              f"({vad.suppressed * 20 / 1000:.1f}s of {vad.frames * 20 / 1000:.0f}s)")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Embedding Provider Benchmark
+Per-query latency (what a live rag_search waits for) and ingestion
+throughput for the providers in app/services/embeddings.py:
+
+  - openai:  against a local fake OpenAI server with --latency-ms of
+             simulated WAN round-trip (the real API adds model time on top)
+  - onnx:    the local model in LOCAL_EMBEDDING_MODEL_PATH (or --onnx-path),
+             batched and one text at a time; skipped if not configured
+  - hashing: the dependency-free stand-in
+
+Usage:
+    python benchmarks/bench_local_embeddings.py --queries 100 --chunks 500 --latency-ms 80
+    python benchmarks/bench_local_embeddings.py --onnx-path ./models/all-MiniLM-L6-v2
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from openai import OpenAI
+from bench_embeddings import make_handler
+from app.services import embeddings
+
+
+WORDS = (
+    "we are open monday to friday from nine to five and on saturday mornings "
+    "call the front desk to book a cleaning or whitening appointment parking "
+    "is behind the building most insurance plans are accepted"
+).split()
+
+
+def make_texts(count: int, words: tuple, seed: int) -> list:
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(*words))) for _ in range(count)]
+
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def query_latency(provider, queries: list) -> tuple:
+    provider.embed_query("warm up")
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        provider.embed_query(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return percentile(latencies, 0.5), percentile(latencies, 0.99)
+
+
+def throughput(embed, chunks: list) -> float:
+    start = time.perf_counter()
+    vectors = embed(chunks)
+    assert len(vectors) == len(chunks)
+    return len(chunks) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--chunks", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=80.0)
+    parser.add_argument("--per-input-ms", type=float, default=0.2)
+    parser.add_argument("--onnx-path", default=embeddings.LOCAL_EMBEDDING_MODEL_PATH)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.latency_ms / 1000, args.per_input_ms / 1000))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    embeddings.client = OpenAI(api_key="bench", base_url=f"http://127.0.0.1:{server.server_address[1]}/v1", max_retries=0)
+
+    queries = make_texts(args.queries, (4, 12), seed=1)
+    chunks = make_texts(args.chunks, (120, 200), seed=2)
+
+    providers = [("openai", embeddings.OpenAIProvider("text-embedding-3-small"))]
+    if args.onnx_path:
+        providers.append(("onnx", embeddings.OnnxProvider(args.onnx_path)))
+    else:
+        print("\n   (no --onnx-path / LOCAL_EMBEDDING_MODEL_PATH, skipping the onnx provider)")
+    providers.append(("hashing", embeddings.HashingProvider()))
+
+    print(f"\n🧠 {args.queries} queries, {args.chunks} chunks of ~160 words, "
+          f"{args.latency_ms:.0f}ms simulated OpenAI round-trip")
+    print(f"   {'provider':<22} {'query p50':>10} {'query p99':>10} {'ingest':>14}")
+    for name, provider in providers:
+        p50, p99 = query_latency(provider, queries)
+        rate = throughput(provider.embed, chunks)
+        print(f"   {name:<22} {p50:8.2f}ms {p99:8.2f}ms {rate:9.0f}/sec")
+        if name == "onnx":
+            # What batching buys: the same chunks, one inference call each
+            rate = throughput(lambda items: [provider.embed_query(item) for item in items], chunks)
+            print(f"   {'onnx, unbatched':<22} {'':>10} {'':>10} {rate:9.0f}/sec")
+    print()
+    server.shutdown()
+    server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Media Frame Micro-Benchmark
+Frames/sec on one core for each direction of the audio bridge, comparing
+the original per-frame path (json.loads / json.dumps, SDK event parsing
+and validation, two prints per outbound frame) with the fast path in
+app/services/media_frames.py.
+
+Usage:
+    python benchmarks/bench_media_frames.py --frames 20000
+"""
+import argparse
+import asyncio
+import base64
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from openai.resources.beta.realtime.realtime import AsyncRealtimeConnection
+from app.services.media_frames import (
+    OutboundMediaEncoder,
+    encode_audio_append,
+    extract_media_payload,
+    parse_audio_delta,
+    send_raw,
+)
+
+
+STREAM_SID = "MZ18ad3ab5a668481ce02b83e7395059f0"
+PAYLOAD = base64.b64encode(bytes((i * 37) % 256 for i in range(160))).decode()
+
+TWILIO_FRAME = json.dumps({
+    "event": "media",
+    "sequenceNumber": "42",
+    "media": {"track": "inbound", "chunk": "41", "timestamp": "820", "payload": PAYLOAD},
+    "streamSid": STREAM_SID,
+}, separators=(",", ":"))
+
+OPENAI_DELTA = json.dumps({
+    "type": "response.audio.delta",
+    "event_id": "event_4950",
+    "response_id": "resp_001",
+    "item_id": "item_001",
+    "output_index": 0,
+    "content_index": 0,
+    "delta": PAYLOAD,
+}, separators=(",", ":")).encode()
+
+
+class NullWebSocket:
+    async def send(self, data):
+        pass
+
+
+def rate(label, frames, elapsed):
+    print(f"   {label:<34} {frames / elapsed:>10,.0f} frames/sec")
+
+
+async def inbound(frames: int):
+    conn = AsyncRealtimeConnection(NullWebSocket())
+
+    start = time.perf_counter()
+    for _ in range(frames):
+        data = json.loads(TWILIO_FRAME)
+        if data.get("event") == "media":
+            await conn.input_audio_buffer.append(audio=data["media"]["payload"])
+    rate("original (json + SDK append)", frames, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(frames):
+        payload = extract_media_payload(TWILIO_FRAME)
+        await send_raw(conn, encode_audio_append(payload))
+    rate("fast path", frames, time.perf_counter() - start)
+
+
+def outbound(frames: int):
+    conn = AsyncRealtimeConnection(NullWebSocket())
+    sink = io.StringIO()
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(sink):
+        for ts in range(frames):
+            event = conn.parse_event(OPENAI_DELTA)
+            print(f"🔊 Sending {len(event.delta)} bytes at timestamp {ts * 20}", flush=True)
+            json.dumps({
+                "event": "media",
+                "streamSid": STREAM_SID,
+                "media": {"payload": event.delta, "timestamp": str(ts * 20)}
+            })
+            print(f"✅ Sent to Twilio", flush=True)
+    rate("original (parse + dumps + print)", frames, time.perf_counter() - start)
+
+    encoder = OutboundMediaEncoder(STREAM_SID)
+    start = time.perf_counter()
+    for ts in range(frames):
+        event = parse_audio_delta(OPENAI_DELTA)
+        encoder.encode(event.delta, ts * 20)
+    rate("fast path", frames, time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=20000)
+    args = parser.parse_args()
+
+    # Sanity check: the fast path produces the same messages
+    assert json.loads(OutboundMediaEncoder(STREAM_SID).encode(PAYLOAD, 20)) == {
+        "event": "media", "streamSid": STREAM_SID, "media": {"payload": PAYLOAD, "timestamp": "20"}
+    }
+    assert extract_media_payload(TWILIO_FRAME) == PAYLOAD
+    assert parse_audio_delta(OPENAI_DELTA).delta == PAYLOAD
+
+    print(f"📊 {args.frames:,} frames of 20ms μ-law audio (one core)\n")
+    print("   Twilio → OpenAI")
+    asyncio.run(inbound(args.frames))
+    print("\n   OpenAI → Twilio")
+    outbound(args.frames)
+    print("\n   (a call needs 50 frames/sec in each direction)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Outbound Audio Pacing Benchmark
+What Twilio receives for one AI reply, forwarding each OpenAI delta as it
+arrives (the previous bridge: one media message per delta, timestamp
++20ms per message) vs app/services/playback.py (20ms frames, byte-based
+timestamps, paced OUTBOUND_LEAD_MS ahead of playback).
+
+The fake reply is --reply-ms of μ-law audio in deltas of random length
+(not whole frames), generated --speedup times faster than real time with
+jittery gaps, as OpenAI does. Reported per mode:
+
+  frames        media messages, and how many were exactly 160 bytes
+  drift         last media timestamp minus the audio actually sent before it
+  twilio max    most audio waiting in Twilio's buffer; a barge-in has to
+                discard this much
+  gaps          times Twilio ran dry mid-reply (audible gaps)
+  local max     most audio queued in this process
+
+Usage:
+    python benchmarks/bench_outbound_pacing.py --reply-ms 8000 --speedup 4 --lead-ms 200
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from app.services import playback
+from app.services.media_frames import OutboundMediaEncoder
+
+
+class TwilioRecorder:
+    """Plays media in arrival order at real time and records its buffer depth"""
+
+    def __init__(self):
+        self.messages = []          # (payload bytes, timestamp)
+        self.playout_end = None
+        self.max_buffered_ms = 0.0
+        self.gaps = 0
+
+    async def send_text(self, text: str):
+        data = json.loads(text)
+        if data["event"] != "media":
+            return
+        size = len(base64.b64decode(data["media"]["payload"]))
+        now = time.perf_counter()
+        if self.playout_end is not None and now > self.playout_end + 0.005:
+            self.gaps += 1
+        start = now if self.playout_end is None else max(self.playout_end, now)
+        self.playout_end = start + size / 8000
+        self.max_buffered_ms = max(self.max_buffered_ms, (self.playout_end - now) * 1000)
+        self.messages.append((size, int(data["media"]["timestamp"])))
+
+
+def make_deltas(reply_ms: int, seed: int) -> list:
+    rng = random.Random(seed)
+    deltas, remaining = [], reply_ms * 8
+    while remaining > 0:
+        size = min(remaining, rng.randint(200, 3200))
+        deltas.append(base64.b64encode(bytes([rng.randrange(256)]) * size).decode())
+        remaining -= size
+    return deltas
+
+
+async def generate(deltas: list, speedup: float, seed: int, send):
+    """Deltas at `speedup` x real time, in bursts"""
+    rng = random.Random(seed)
+    for delta in deltas:
+        await send(delta)
+        audio_s = len(base64.b64decode(delta)) / 8000
+        await asyncio.sleep(audio_s / speedup * rng.uniform(0, 2))
+
+
+async def forward_on_arrival(deltas: list, speedup: float, seed: int):
+    twilio = TwilioRecorder()
+    encoder = OutboundMediaEncoder("MZbench")
+    timestamp_ms = 0
+
+    async def send(delta):
+        nonlocal timestamp_ms
+        await twilio.send_text(encoder.encode(delta, timestamp_ms))
+        timestamp_ms += 20
+
+    await generate(deltas, speedup, seed, send)
+    return twilio, None
+
+
+async def paced(deltas: list, speedup: float, seed: int):
+    twilio = TwilioRecorder()
+    call = playback.CallPlayback(twilio, SimpleNamespace(), OutboundMediaEncoder("MZbench"))
+    local_max = 0
+
+    async def send(delta):
+        nonlocal local_max
+        await call.send_audio("item_1", delta)
+        local_max = max(local_max, call.queued_ms)
+
+    await generate(deltas, speedup, seed, send)
+    call.end_item()
+    while call.queued_ms:
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.05)
+    call.close()
+    return twilio, local_max
+
+
+def report(label: str, twilio: TwilioRecorder, local_max):
+    sizes = [size for size, _ in twilio.messages]
+    whole = sum(1 for size in sizes if size == playback.FRAME_BYTES)
+    last_size, last_timestamp = twilio.messages[-1]
+    drift = last_timestamp - (sum(sizes) - last_size) // 8
+    local = f"{local_max}ms" if local_max is not None else "-"
+    print(f"   {label:<20} {len(sizes):>6} ({whole} x 160B)  {drift:>+8}ms  "
+          f"{twilio.max_buffered_ms:>9.0f}ms  {twilio.gaps:>4}  {local:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reply-ms", type=int, default=8000)
+    parser.add_argument("--speedup", type=float, default=4.0)
+    parser.add_argument("--lead-ms", type=int, default=playback.OUTBOUND_LEAD_MS)
+    parser.add_argument("--buffer-ms", type=int, default=playback.OUTBOUND_BUFFER_MS)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    playback.OUTBOUND_LEAD_MS = args.lead_ms
+    playback.OUTBOUND_BUFFER_MS = args.buffer_ms
+    deltas = make_deltas(args.reply_ms, args.seed)
+
+    print(f"\n🔊 {args.reply_ms}ms reply in {len(deltas)} deltas, generated {args.speedup:g}x real time; "
+          f"lead {args.lead_ms}ms, local buffer {args.buffer_ms}ms")
+    print(f"   {'':<20} {'frames':>22}  {'drift':>10}  {'twilio max':>11}  {'gaps':>4}  {'local max':>9}")
+    report("forward on arrival", *asyncio.run(forward_on_arrival(deltas, args.speedup, args.seed)))
+    report("paced", *asyncio.run(paced(deltas, args.speedup, args.seed)))
+    print()
+
+
+if __name__ == "__main__":
+    main()
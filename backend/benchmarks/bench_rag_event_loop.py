@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+RAG Event-Loop Load Test
+Runs many simulated calls on one event loop, each forwarding a 20ms audio
+frame on schedule, while one call performs rag_search lookups. Reports how
+late the other calls' frames are when the lookup uses the blocking
+search_knowledge vs search_knowledge_async.
+
+Embeddings come from a local fake OpenAI server and the Weaviate query is
+a fake collection that blocks for --weaviate-ms, like the real client.
+
+Usage:
+    python benchmarks/bench_rag_event_loop.py --calls 50 --searches 5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+# rag_service imports the models; no database is touched here
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+# Vector search only: the lexical side would need the documents table
+os.environ.setdefault("RAG_SEARCH_MODE", "vector")
+
+from openai import OpenAI, AsyncOpenAI
+from bench_embeddings import make_handler
+from app.services import rag_service, rag_cache, embeddings
+
+
+FRAME_S = 0.020
+
+
+def install_fakes(base_url: str, weaviate_s: float):
+    embeddings.client = OpenAI(api_key="bench", base_url=base_url, max_retries=0)
+    embeddings.async_client = AsyncOpenAI(api_key="bench", base_url=base_url, max_retries=0)
+
+    def near_vector(**kwargs):
+        time.sleep(weaviate_s)
+        return SimpleNamespace(objects=[
+            SimpleNamespace(properties={"text": "We are open 9-5", "business_id": "1"})
+        ])
+
+    collection = SimpleNamespace(query=SimpleNamespace(near_vector=near_vector))
+    rag_service.get_weaviate_client = lambda: None
+    rag_service.get_collection = lambda client, business_id, create_tenant=True, model=None: collection
+
+
+async def audio_call(stop: asyncio.Event, lateness: list):
+    """Forward one frame every 20ms and record how late each one was"""
+    next_frame = time.perf_counter()
+    while not stop.is_set():
+        next_frame += FRAME_S
+        await asyncio.sleep(max(0.0, next_frame - time.perf_counter()))
+        lateness.append((time.perf_counter() - next_frame) * 1000)
+
+
+async def searching_call(use_async: bool, searches: int):
+    for i in range(searches):
+        # Unique queries so every lookup misses the cache
+        query = f"what are your opening hours {use_async} {i}"
+        if use_async:
+            await rag_service.search_knowledge_async(1, query)
+        else:
+            rag_service.search_knowledge(1, query)
+        await asyncio.sleep(0.2)
+
+
+async def run(calls: int, searches: int, use_async: bool) -> list:
+    rag_cache.clear()
+    stop = asyncio.Event()
+    lateness = []
+    bridges = [asyncio.create_task(audio_call(stop, lateness)) for _ in range(calls)]
+    await asyncio.sleep(0.2)
+    await searching_call(use_async, searches)
+    stop.set()
+    await asyncio.gather(*bridges)
+    return lateness
+
+
+def report(label: str, lateness: list):
+    lateness = sorted(lateness)
+    p50 = statistics.median(lateness)
+    p99 = lateness[int(len(lateness) * 0.99) - 1]
+    print(f"   {label:<28} p50 {p50:6.2f}ms   p99 {p99:7.2f}ms   max {lateness[-1]:7.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--searches", type=int, default=5)
+    parser.add_argument("--embed-ms", type=float, default=150.0)
+    parser.add_argument("--weaviate-ms", type=float, default=120.0)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.embed_ms / 1000, 0))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    install_fakes(f"http://127.0.0.1:{server.server_address[1]}/v1", args.weaviate_ms / 1000)
+
+    print(f"📊 {args.calls} concurrent calls, {args.searches} rag_search lookups "
+          f"({args.embed_ms:.0f}ms embed + {args.weaviate_ms:.0f}ms Weaviate)\n")
+    print("   audio frame lateness on the other calls:")
+    report("blocking search_knowledge", asyncio.run(run(args.calls, args.searches, use_async=False)))
+    report("search_knowledge_async", asyncio.run(run(args.calls, args.searches, use_async=True)))
+    server.shutdown()
+    server.server_close()
+
+
+if __name__ == "__main__":
+    main()
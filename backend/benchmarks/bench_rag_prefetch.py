@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+RAG Prefetch Benchmark
+Tool-call latency of rag_search with and without the speculative prefetch
+(app/services/rag_prefetch.py). Latency is measured from the model's
+function call to the function_call_output being sent back, through
+llm_realtime.answer_rag_search.
+
+Each simulated turn:
+  - the caller's transcript arrives
+  - --model-ms later the model calls rag_search with its own rewording
+    of the question (see TURNS)
+Some turns start with a false start ("um, so I was wondering") just
+before the real question, whose prefetch goes stale and is cancelled. One
+turn's tool query shares too few words with the transcript to use the
+prefetch and is searched as before.
+
+Embeddings come from a local fake OpenAI server and the Weaviate query is
+a fake collection that blocks for --weaviate-ms.
+
+Usage:
+    python benchmarks/bench_rag_prefetch.py --model-ms 400 --embed-ms 150 --weaviate-ms 60
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from bench_embeddings import make_handler
+from bench_rag_event_loop import install_fakes
+from app.services import llm_realtime, rag_cache, rag_prefetch
+
+
+# (what the caller said, what the model searched for)
+TURNS = [
+    ("What time do you close on Saturday?", "Saturday closing time"),
+    ("Do you take Delta Dental insurance?", "Delta Dental insurance accepted"),
+    ("How much is a teeth whitening?", "teeth whitening price"),
+    ("Is there parking near the office?", "parking"),
+    ("Can I bring my dog into the bakery?", "pet policy"),
+    ("Do you have gluten free bread on weekends?", "gluten free bread weekend"),
+]
+FALSE_START = "Um, so I was wondering about something"
+
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def turn(transcript: str, query: str, use_prefetch: bool, model_s: float, false_start: bool) -> float:
+    sent = asyncio.Event()
+
+    async def create(item):
+        sent.set()
+
+    async def response_create():
+        pass
+
+    openai_ws = SimpleNamespace(
+        conversation=SimpleNamespace(item=SimpleNamespace(create=create)),
+        response=SimpleNamespace(create=response_create),
+    )
+    prefetcher = rag_prefetch.CallPrefetcher(1) if use_prefetch else None
+    if prefetcher and false_start:
+        prefetcher.on_transcript(FALSE_START)
+        await asyncio.sleep(0.1)
+    if prefetcher:
+        prefetcher.on_transcript(transcript)
+    await asyncio.sleep(model_s)
+
+    start = time.perf_counter()
+    await llm_realtime.answer_rag_search(openai_ws, 1, "call-1", query, prefetcher)
+    await sent.wait()
+    elapsed = (time.perf_counter() - start) * 1000
+    if prefetcher:
+        prefetcher.close()
+    return elapsed
+
+
+async def run(rounds: int, use_prefetch: bool, model_s: float) -> list:
+    latencies = []
+    for round_ in range(rounds):
+        for i, (transcript, query) in enumerate(TURNS):
+            # Every lookup misses the result cache, like a fresh question would
+            rag_cache.clear()
+            latencies.append(await turn(transcript, query, use_prefetch, model_s, false_start=(i + round_) % 3 == 0))
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--model-ms", type=float, default=400.0, help="transcript to tool call")
+    parser.add_argument("--embed-ms", type=float, default=150.0)
+    parser.add_argument("--weaviate-ms", type=float, default=60.0)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.embed_ms / 1000, 0))
+    # Cancelled prefetches hang up mid-request; that's expected here
+    server.handle_error = lambda request, client_address: None
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    install_fakes(f"http://127.0.0.1:{server.server_address[1]}/v1", args.weaviate_ms / 1000)
+
+    print(f"\n⚡ {args.rounds * len(TURNS)} rag_search calls, tool call {args.model_ms:.0f}ms after the transcript "
+          f"({args.embed_ms:.0f}ms embed + {args.weaviate_ms:.0f}ms Weaviate)")
+    print("   tool call -> output sent:")
+    for label, use_prefetch in (("without prefetch", False), ("with prefetch", True)):
+        latencies = asyncio.run(run(args.rounds, use_prefetch, args.model_ms / 1000))
+        print(f"   {label:<18} p50 {percentile(latencies, 0.5):7.2f}ms   p99 {percentile(latencies, 0.99):7.2f}ms")
+    print(f"   prefetch stats: {rag_prefetch.stats()}\n")
+    server.shutdown()
+    server.server_close()
+
+
+if __name__ == "__main__":
+    main()
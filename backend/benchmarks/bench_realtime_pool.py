@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Realtime Session Pool Benchmark
+Time from Twilio's `start` event to the first outbound audio frame, with a
+cold Realtime connection per call versus a connection checked out of the
+warm pool (app/services/realtime_pool.py).
+
+Runs against a local mock Realtime websocket server that adds a fixed
+handshake delay (standing in for DNS + TLS + auth), a delay per
+session.update, and a model delay before the first audio delta.
+
+Usage:
+    python benchmarks/bench_realtime_pool.py --calls 20 --connect-ms 250
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from openai import AsyncOpenAI
+from websockets.asyncio.server import serve
+from app.services import business_directory, realtime_pool
+from app.services.llm_realtime import handle_realtime_audio
+
+
+BUSINESS_ID = 1
+PAYLOAD = base64.b64encode(b"\xff" * 160).decode()
+
+
+def mock_realtime_server(connect_ms: float, session_ms: float, first_audio_ms: float):
+    """Minimal Realtime API: session.created/updated and audio on response.create"""
+
+    async def process_request(connection, request):
+        await asyncio.sleep(connect_ms / 1000)
+
+    async def handler(ws):
+        await ws.send(json.dumps({"type": "session.created", "event_id": "e0", "session": {}}))
+        async for message in ws:
+            event = json.loads(message)
+            if event["type"] == "session.update":
+                await asyncio.sleep(session_ms / 1000)
+                await ws.send(json.dumps({"type": "session.updated", "event_id": "e1", "session": {}}))
+            elif event["type"] == "response.create":
+                await asyncio.sleep(first_audio_ms / 1000)
+                for i in range(5):
+                    await ws.send(json.dumps({
+                        "type": "response.audio.delta", "event_id": f"d{i}", "response_id": "r",
+                        "item_id": "i", "output_index": 0, "content_index": 0, "delta": PAYLOAD,
+                    }))
+
+    return serve(handler, "127.0.0.1", 0, process_request=process_request)
+
+
+class FakeTwilio:
+    """Twilio side of the bridge; records when the first audio frame arrives"""
+
+    def __init__(self):
+        self.first_audio = asyncio.get_running_loop().create_future()
+        self._incoming = asyncio.Queue()
+
+    async def receive(self):
+        return await self._incoming.get()
+
+    async def send_text(self, text):
+        if '"event":"media"' in text and not self.first_audio.done():
+            self.first_audio.set_result(time.perf_counter())
+
+    async def close(self):
+        pass
+
+
+async def one_call() -> float:
+    twilio = FakeTwilio()
+    started = time.perf_counter()
+    call = asyncio.create_task(handle_realtime_audio(twilio, BUSINESS_ID, "MZbench"))
+    first_audio = await asyncio.wait_for(twilio.first_audio, timeout=30)
+    call.cancel()
+    await asyncio.gather(call, return_exceptions=True)
+    return (first_audio - started) * 1000
+
+
+async def run_calls(calls: int, gap_s: float) -> list:
+    timings = []
+    for _ in range(calls):
+        timings.append(await one_call())
+        # Callers don't arrive back to back; gives the pool time to refill
+        await asyncio.sleep(gap_s)
+    return timings
+
+
+def report(label, timings):
+    timings = sorted(timings)
+    p50 = statistics.median(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f"   {label:<20} p50 {p50:7.1f}ms   p95 {p95:7.1f}ms   max {timings[-1]:7.1f}ms")
+
+
+async def bench(args):
+    async with mock_realtime_server(args.connect_ms, args.session_ms, args.first_audio_ms) as server:
+        port = server.sockets[0].getsockname()[1]
+        realtime_pool.client = AsyncOpenAI(api_key="bench", websocket_base_url=f"ws://127.0.0.1:{port}/v1")
+
+        business_directory.refresh_business(SimpleNamespace(
+            id=BUSINESS_ID, name="Bench Dental", phone_number="+15550100000",
+            forwarding_number=None, tone="friendly", instructions="Be brief.",
+            business_hours={}, allowed_actions={}, appointment_credentials={}, embedding_provider=None,
+        ))
+
+        realtime_pool.REALTIME_POOL_SIZE = 0
+        cold = await run_calls(args.calls, args.gap_ms / 1000)
+
+        realtime_pool.REALTIME_POOL_SIZE = args.pool_size
+        realtime_pool.start()
+        while len(realtime_pool._idle) < args.pool_size:
+            await asyncio.sleep(0.01)
+        warm = await run_calls(args.calls, args.gap_ms / 1000)
+        stats = realtime_pool.stats()
+        await realtime_pool.shutdown()
+
+    print(
+        f"\n📞 {args.calls} calls, mock handshake {args.connect_ms:.0f}ms, "
+        f"session.update {args.session_ms:.0f}ms, model {args.first_audio_ms:.0f}ms"
+    )
+    print("   Twilio start -> first audio frame:")
+    report("cold connection", cold)
+    report("warm pool", warm)
+    print(f"   pool: {stats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20)
+    parser.add_argument("--pool-size", type=int, default=2)
+    parser.add_argument("--connect-ms", type=float, default=250)
+    parser.add_argument("--session-ms", type=float, default=60)
+    parser.add_argument("--first-audio-ms", type=float, default=150)
+    parser.add_argument("--gap-ms", type=float, default=500)
+    args = parser.parse_args()
+    asyncio.run(bench(args))
+
+
+if __name__ == "__main__":
+    main()
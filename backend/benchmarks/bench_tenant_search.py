@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Tenant-Scoped Search Benchmark
+Loads a synthetic corpus for many tenants into two throwaway collections
+(single-tenant and multi-tenant) and compares query latency for:
+
+  - unfiltered near_vector over the whole collection (old behaviour)
+  - near_vector with a business_id filter
+  - near_vector against the business's own tenant
+
+Needs a running Weaviate (WEAVIATE_URL, default http://localhost:8080).
+
+Usage:
+    python benchmarks/bench_tenant_search.py --tenants 500 --chunks-per-tenant 200
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from urllib.parse import urlparse
+
+import weaviate
+from weaviate.classes.config import Configure, Property, DataType
+from weaviate.classes.data import DataObject
+from weaviate.classes.query import Filter
+from weaviate.classes.tenants import Tenant
+
+
+FLAT = "BenchTenantSearchFlat"
+MULTI = "BenchTenantSearchMulti"
+
+
+def random_vector(rng, dims):
+    return [rng.uniform(-1, 1) for _ in range(dims)]
+
+
+def connect():
+    parsed = urlparse(os.getenv("WEAVIATE_URL", "http://localhost:8080"))
+    return weaviate.connect_to_local(host=parsed.hostname, port=parsed.port or 8080)
+
+
+def create_collections(client):
+    for name in (FLAT, MULTI):
+        if client.collections.exists(name):
+            client.collections.delete(name)
+
+    properties = [
+        Property(name="text", data_type=DataType.TEXT),
+        Property(name="business_id", data_type=DataType.TEXT),
+    ]
+    client.collections.create(name=FLAT, properties=properties)
+    client.collections.create(
+        name=MULTI,
+        properties=properties,
+        multi_tenancy_config=Configure.multi_tenancy(enabled=True)
+    )
+
+
+def load_corpus(client, tenants, chunks_per_tenant, dims, rng):
+    flat = client.collections.get(FLAT)
+    multi = client.collections.get(MULTI)
+    multi.tenants.create([Tenant(name=str(t)) for t in range(tenants)])
+
+    start = time.perf_counter()
+    for tenant in range(tenants):
+        objects = [
+            DataObject(
+                properties={"text": f"tenant {tenant} chunk {i}", "business_id": str(tenant)},
+                vector=random_vector(rng, dims)
+            )
+            for i in range(chunks_per_tenant)
+        ]
+        flat.data.insert_many(objects)
+        multi.with_tenant(str(tenant)).data.insert_many(objects)
+        if (tenant + 1) % 50 == 0:
+            print(f"   loaded {tenant + 1}/{tenants} tenants ({time.perf_counter() - start:.0f}s)")
+
+
+def measure(label, fn, queries):
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        fn(*query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    p50 = statistics.median(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"   {label:<28} p50 {p50:7.2f}ms   p95 {p95:7.2f}ms")
+    return p50
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tenants", type=int, default=500)
+    parser.add_argument("--chunks-per-tenant", type=int, default=200)
+    parser.add_argument("--dims", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--keep", action="store_true", help="Keep the benchmark collections afterwards")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    client = connect()
+
+    try:
+        print(f"📦 Loading {args.tenants} tenants x {args.chunks_per_tenant} chunks ({args.dims} dims)...")
+        create_collections(client)
+        load_corpus(client, args.tenants, args.chunks_per_tenant, args.dims, rng)
+
+        flat = client.collections.get(FLAT)
+        multi = client.collections.get(MULTI)
+        queries = [(rng.randrange(args.tenants), random_vector(rng, args.dims)) for _ in range(args.queries)]
+
+        print(f"\n📊 {args.queries} queries, limit=5\n")
+        whole = measure(
+            "whole collection (old)",
+            lambda tenant, vector: flat.query.near_vector(near_vector=vector, limit=5),
+            queries
+        )
+        filtered = measure(
+            "business_id filter",
+            lambda tenant, vector: flat.query.near_vector(
+                near_vector=vector, limit=5,
+                filters=Filter.by_property("business_id").equal(str(tenant))
+            ),
+            queries
+        )
+        tenant_scoped = measure(
+            "per-business tenant",
+            lambda tenant, vector: multi.with_tenant(str(tenant)).query.near_vector(near_vector=vector, limit=5),
+            queries
+        )
+        print(f"\n   tenant vs whole collection: {whole / tenant_scoped:.1f}x, "
+              f"tenant vs filter: {filtered / tenant_scoped:.1f}x")
+    finally:
+        if not args.keep:
+            for name in (FLAT, MULTI):
+                if client.collections.exists(name):
+                    client.collections.delete(name)
+        client.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
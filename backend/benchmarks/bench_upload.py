@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Document Upload Benchmark
+Peak Python memory and time for ingesting MB-scale markdown documents
+through the JSON /rag/ingest route (whole text in the request, chunked and
+embedded in one go) and the streaming /rag/upload route (spooled to disk,
+ingested in batches by a background job). Then checks that:
+
+  - re-uploading the same file stores nothing new
+  - cancelling an upload mid-way stops it and removes the chunks it added
+
+The app runs in a real uvicorn server in this process, so request bodies
+are streamed rather than buffered by a test client. What little memory the
+upload route still grows by comes from one content hash per chunk (kept
+to find removed chunks) and the fake store's ids, not the file size. Embeddings come from a
+local fake OpenAI server and the Weaviate collection is an in-memory fake.
+
+Usage:
+    python benchmarks/bench_upload.py --mb 2 8 32
+"""
+import argparse
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import ThreadingHTTPServer
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+WORKDIR = tempfile.mkdtemp(prefix="upload-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(WORKDIR, 'app.db')}"
+os.environ["UPLOAD_DIR"] = os.path.join(WORKDIR, "spool")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+from openai import OpenAI
+from bench_chunker import make_document
+from bench_embeddings import make_handler
+from app.db import Base, engine, SessionLocal
+from app.models.ingestion import IngestedChunk
+from app.routers import rag
+from app.services import rag_service, embeddings
+
+
+BUSINESS_ID = 1
+
+
+class FakeCollection:
+    """Weaviate collection stand-in that keeps object ids only"""
+
+    def __init__(self):
+        self.ids = set()
+        self.data = SimpleNamespace(insert_many=self.insert_many, delete_many=self.delete_many)
+
+    def insert_many(self, objects):
+        self.ids.update(str(obj.uuid) for obj in objects)
+        return SimpleNamespace(has_errors=False, errors={})
+
+    def delete_many(self, where):
+        self.ids.difference_update(where.value)
+
+
+def install_fakes(embedding_latency_s: float) -> FakeCollection:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(embedding_latency_s, 0))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    embeddings.client = OpenAI(api_key="bench", base_url=f"http://127.0.0.1:{server.server_address[1]}/v1", max_retries=0)
+    collection = FakeCollection()
+    rag_service.get_weaviate_client = lambda: None
+    rag_service.get_collection = lambda client, business_id, create_tenant=True, model=None: collection
+    return collection
+
+
+def start_app() -> str:
+    app = FastAPI()
+    app.include_router(rag.router)
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+def read_pieces(path: str, size: int = 64 * 1024):
+    with open(path, "rb") as f:
+        while piece := f.read(size):
+            yield piece
+
+
+def wait_for_job(base_url: str, job_id: str, until=None) -> dict:
+    while True:
+        job = httpx.get(f"{base_url}/rag/jobs/{job_id}").json()
+        if job["status"] not in ("queued", "running") or (until and until(job)):
+            return job
+        time.sleep(0.05)
+
+
+def upload(base_url: str, path: str, filename: str) -> dict:
+    response = httpx.post(
+        f"{base_url}/rag/upload",
+        params={"business_id": BUSINESS_ID, "filename": filename},
+        content=read_pieces(path),
+        headers={"Content-Type": "text/markdown"},
+        timeout=120,
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def ledger_count(source: str) -> int:
+    db = SessionLocal()
+    try:
+        return db.query(IngestedChunk).filter(IngestedChunk.source == source).count()
+    finally:
+        db.close()
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def traced(fn):
+    """Peak memory is measured in its own pass; tracing slows everything down"""
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mb", type=float, nargs="+", default=[2, 8, 32])
+    parser.add_argument("--json-max-mb", type=float, default=8, help="skip the JSON route above this size")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(engine)
+    collection = install_fakes(0.0)
+    base_url = start_app()
+
+    print(f"\n📄 Ingesting markdown documents (batches of {rag_service.INGEST_BATCH_CHUNKS} chunks)")
+    print(f"   {'size':>8}  {'route':<12} {'time':>8}  {'peak memory':>12}  chunks")
+    for mb in args.mb:
+        path = os.path.join(WORKDIR, f"doc-{mb}.md")
+        with open(path, "w") as f:
+            f.write(make_document(int(mb * 1_000_000)))
+
+        def json_ingest(source):
+            with open(path) as f:
+                text = f.read()
+            response = httpx.post(f"{base_url}/rag/ingest", timeout=600,
+                                  json={"business_id": BUSINESS_ID, "text": text, "source": source})
+            response.raise_for_status()
+            return response.json()["chunks"]
+
+        def streamed_upload(filename):
+            job = wait_for_job(base_url, upload(base_url, path, filename)["id"])
+            if job["status"] != "completed":
+                raise RuntimeError(f"upload {job['status']}: {job['error']}")
+            return job["progress"]["chunks"]
+
+        routes = [("/rag/upload", streamed_upload)]
+        if mb <= args.json_max_mb:
+            routes.insert(0, ("/rag/ingest", json_ingest))
+        for route, ingest in routes:
+            # Separate sources, so neither pass finds the other's chunks already stored
+            chunks, elapsed = timed(lambda: ingest(f"doc-{mb}-{route[5:]}-timed.md"))
+            _, peak = traced(lambda: ingest(f"doc-{mb}-{route[5:]}-traced.md"))
+            print(f"   {mb:6.1f}MB  {route:<12} {elapsed:7.2f}s  {peak:9.1f} MB  {chunks}")
+
+    # Re-upload: nothing new is embedded or stored
+    print()
+    path = os.path.join(WORKDIR, f"doc-{args.mb[0]}.md")
+    stored = len(collection.ids)
+    job = wait_for_job(base_url, upload(base_url, path, f"doc-{args.mb[0]}-upload-timed.md")["id"])
+    ok = job["status"] == "completed" and job["progress"]["added"] == 0 and len(collection.ids) == stored
+    print(f"   {'✅' if ok else '❌'} re-upload: {job['progress'].get('unchanged')} unchanged, {job['progress'].get('added')} added")
+
+    # Cancel mid-way: slow embeddings so there's time to cancel
+    collection = install_fakes(0.05)
+    stored = len(collection.ids)
+    path = os.path.join(WORKDIR, "cancel.md")
+    with open(path, "w") as f:
+        f.write(make_document(4_000_000, seed=11))
+    job = upload(base_url, path, "cancel.md")
+    job = wait_for_job(base_url, job["id"], until=lambda j: j["progress"].get("added", 0) > 0)
+    added = job["progress"].get("added", 0)
+    httpx.delete(f"{base_url}/rag/jobs/{job['id']}")
+    job = wait_for_job(base_url, job["id"])
+    left = ledger_count("upload:cancel.md")
+    ok = job["status"] == "cancelled" and left == 0 and len(collection.ids) == stored
+    print(f"   {'✅' if ok else '❌'} cancel after {added} chunks: status {job['status']}, "
+          f"{left} ledger rows and {len(collection.ids) - stored} vectors left")
+    spool = os.listdir(os.environ["UPLOAD_DIR"])
+    print(f"   {'✅' if not spool else '❌'} spool directory empty ({len(spool)} files)")
+    print()
+
+
+if __name__ == "__main__":
+    main()
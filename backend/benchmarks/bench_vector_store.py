@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Vector Store Benchmark
+Query latency of the in-process store (app/services/local_vectors.py,
+VECTOR_STORE=local) against Weaviate, for one tenant of 1k / 10k / 100k
+chunks. Both are queried through the same client calls rag_service makes
+(near_vector on the business's tenant, limit = RAG_CANDIDATES).
+
+For the local store it also reports how long writing the tenant took and
+the first query on a fresh client (log replay + memory map).
+
+Weaviate is only measured with --weaviate (needs a running instance at
+WEAVIATE_URL, default http://localhost:8080).
+
+Usage:
+    python benchmarks/bench_vector_store.py --sizes 1000 10000 100000 --dims 1536
+    python benchmarks/bench_vector_store.py --weaviate
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from weaviate.classes.config import Configure, Property, DataType
+from weaviate.classes.data import DataObject
+from weaviate.classes.query import MetadataQuery
+from weaviate.classes.tenants import Tenant
+from app.services.local_vectors import LocalVectorClient
+
+
+COLLECTION = "BenchVectorStore"
+TEXT = "We are open Monday to Friday from 9am to 5pm and on Saturday mornings by appointment. " * 4
+
+
+def batches(size: int, dims: int, seed: int, batch: int = 1000):
+    """The same pseudo-random corpus for every backend"""
+    rng = np.random.default_rng(seed)
+    for start in range(0, size, batch):
+        vectors = rng.standard_normal((min(batch, size - start), dims), dtype=np.float32)
+        yield [
+            DataObject(properties={"text": TEXT, "business_id": "1"}, vector=vector.tolist(), uuid=uuid.UUID(int=start + i + 1))
+            for i, vector in enumerate(vectors)
+        ]
+
+
+def make_queries(count: int, dims: int) -> list:
+    rng = np.random.default_rng(99)
+    return [vector.tolist() for vector in rng.standard_normal((count, dims), dtype=np.float32)]
+
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def timed_queries(collection, queries: list, limit: int) -> list:
+    latencies = []
+    for vector in queries:
+        start = time.perf_counter()
+        collection.query.near_vector(near_vector=vector, limit=limit, return_properties=["text", "business_id"],
+                                     return_metadata=MetadataQuery(distance=True))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(size: int, backend: str, latencies: list, extra: str = ""):
+    print(f"   {size:>7}  {backend:<9} p50 {percentile(latencies, 0.5):7.2f}ms  "
+          f"p99 {percentile(latencies, 0.99):7.2f}ms  {extra}")
+
+
+def bench_local(root: str, size: int, dims: int, queries: list, limit: int):
+    tenant = f"t{size}"
+    client = LocalVectorClient(root)
+    client.collections.create(COLLECTION)
+    collection = client.collections.get(COLLECTION)
+    collection.tenants.create([Tenant(name=tenant)])
+    started = time.perf_counter()
+    for objects in batches(size, dims, seed=size):
+        collection.with_tenant(tenant).data.insert_many(objects)
+    write_s = time.perf_counter() - started
+
+    # A fresh client: the first query loads the tenant
+    client = LocalVectorClient(root)
+    scoped = client.collections.get(COLLECTION).with_tenant(tenant)
+    cold_ms = timed_queries(scoped, queries[:1], limit)[0]
+    latencies = timed_queries(scoped, queries, limit)
+    disk_mb = sum(entry.stat().st_size for entry in os.scandir(os.path.join(root, COLLECTION, tenant))) / 1e6
+    report(size, "local", latencies, f"(written in {write_s:.1f}s, {disk_mb:.0f} MB on disk, first query {cold_ms:.0f}ms)")
+
+
+def bench_weaviate(client, size: int, dims: int, queries: list, limit: int):
+    tenant = f"t{size}"
+    collection = client.collections.get(COLLECTION)
+    collection.tenants.create([Tenant(name=tenant)])
+    scoped = collection.with_tenant(tenant)
+    for objects in batches(size, dims, seed=size):
+        scoped.data.insert_many(objects)
+    timed_queries(scoped, queries[:5], limit)
+    report(size, "weaviate", timed_queries(scoped, queries, limit))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--dims", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--weaviate", action="store_true")
+    args = parser.parse_args()
+
+    queries = make_queries(args.queries, args.dims)
+    root = tempfile.mkdtemp(prefix="vector-bench-")
+    weaviate_client = None
+    if args.weaviate:
+        from bench_tenant_search import connect
+
+        weaviate_client = connect()
+        if weaviate_client.collections.exists(COLLECTION):
+            weaviate_client.collections.delete(COLLECTION)
+        weaviate_client.collections.create(
+            name=COLLECTION,
+            properties=[
+                Property(name="text", data_type=DataType.TEXT),
+                Property(name="business_id", data_type=DataType.TEXT),
+            ],
+            multi_tenancy_config=Configure.multi_tenancy(enabled=True),
+        )
+
+    print(f"\n📦 One tenant per size, {args.dims} dims, {args.queries} queries, limit={args.limit}")
+    try:
+        for size in args.sizes:
+            bench_local(root, size, args.dims, queries, args.limit)
+            if weaviate_client is not None:
+                bench_weaviate(weaviate_client, size, args.dims, queries, args.limit)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+        if weaviate_client is not None:
+            weaviate_client.collections.delete(COLLECTION)
+            weaviate_client.close()
+    if weaviate_client is None:
+        print("\n   (Weaviate not measured; pass --weaviate with a running instance)")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Barge-In Check
+Runs the real bridge (llm_realtime.handle_realtime_audio) between a fake
+Twilio stream and a fake OpenAI Realtime session:
+
+  - the fake session answers the greeting with --reply-ms of audio in
+    100ms deltas, generated 4x faster than real time, as OpenAI does
+  - the fake Twilio buffers that audio and plays it in 20ms frames in
+    real time, echoing marks as it reaches them and on `clear`
+  - --interrupt-ms into the reply the session reports
+    input_audio_buffer.speech_started, and one more delta is already in
+    flight after that
+  - once the reply is over, Twilio sends `stop`
+
+It measures how much AI audio the caller still hears after starting to
+talk, with barge-in off (BARGE_IN=false, the previous behaviour) and on,
+and checks that the response is cancelled, the assistant item is
+truncated at the played position, and late deltas are dropped. It also
+checks that the bridge ends (releasing the call's slot) right after
+`stop`, not when the call time limit runs out.
+
+Usage:
+    python benchmarks/check_barge_in.py --reply-ms 5000 --interrupt-ms 800
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import sys
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("OPENAI_API_KEY", "check")
+
+from app.services import llm_realtime, playback
+
+
+FRAME_BYTES = 160       # 20ms of 8kHz μ-law
+DELTA_MS = 100
+
+
+class FakeTwilio:
+    """Media stream that plays buffered audio in real time"""
+
+    def __init__(self):
+        self.inbound = asyncio.Queue()
+        self.buffer = deque()
+        self.wake = asyncio.Event()
+        self.played_ms = 0
+        self.heard_after = 0        # ms of audio played after interrupted_at
+        self.interrupted_at = None
+        self.cleared = 0
+        self.stop_to_end_ms = None  # from `stop` until the bridge returned
+
+    async def send_text(self, text: str):
+        data = json.loads(text)
+        event = data.get("event")
+        if event == "media":
+            audio = base64.b64decode(data["media"]["payload"])
+            for start in range(0, len(audio), FRAME_BYTES):
+                self.buffer.append(("media", len(audio[start:start + FRAME_BYTES])))
+        elif event == "mark":
+            self.buffer.append(("mark", data["mark"]["name"]))
+        elif event == "clear":
+            self.cleared += 1
+            for kind, value in self.buffer:
+                if kind == "mark":
+                    self.inbound.put_nowait({"event": "mark", "mark": {"name": value}})
+            self.buffer.clear()
+        self.wake.set()
+
+    async def play(self):
+        while True:
+            if not self.buffer:
+                self.wake.clear()
+                await self.wake.wait()
+                continue
+            kind, value = self.buffer.popleft()
+            if kind == "mark":
+                self.inbound.put_nowait({"event": "mark", "mark": {"name": value}})
+                continue
+            if self.interrupted_at is not None:
+                self.heard_after += value // 8
+            await asyncio.sleep(value / 8000)
+            self.played_ms += value // 8
+
+    async def receive(self):
+        return {"text": json.dumps(await self.inbound.get())}
+
+    async def close(self):
+        pass
+
+
+class FakeRealtime:
+    """Realtime session that answers every response.create with audio"""
+
+    def __init__(self, reply_ms: int):
+        self.reply_ms = reply_ms
+        self.events = asyncio.Queue()
+        self.cancelled = False
+        self.truncations = []
+        self.conversation = SimpleNamespace(item=SimpleNamespace(create=self._item_create, truncate=self._truncate))
+        self.response = SimpleNamespace(create=self._response_create, cancel=self._cancel)
+        self._tasks = set()
+
+    def emit(self, event: dict):
+        self.events.put_nowait(json.dumps(event).encode())
+
+    async def recv_bytes(self):
+        return await self.events.get()
+
+    def parse_event(self, raw: bytes):
+        return SimpleNamespace(**json.loads(raw))
+
+    async def send_raw(self, text: str):
+        pass
+
+    async def _item_create(self, item):
+        pass
+
+    async def _truncate(self, **kwargs):
+        self.truncations.append(kwargs)
+
+    async def _cancel(self, **kwargs):
+        self.cancelled = True
+
+    async def _response_create(self, **kwargs):
+        task = asyncio.create_task(self._stream("item_ai_1"))
+        self._tasks.add(task)
+
+    async def _stream(self, item_id: str):
+        self.emit({"type": "response.created"})
+        delta = base64.b64encode(b"\xff" * (8 * DELTA_MS)).decode()
+        for _ in range(self.reply_ms // DELTA_MS):
+            if self.cancelled:
+                # One delta was already on the wire when the cancel arrived
+                self.emit({"type": "response.audio.delta", "item_id": item_id, "delta": delta})
+                break
+            self.emit({"type": "response.audio.delta", "item_id": item_id, "delta": delta})
+            await asyncio.sleep(DELTA_MS / 1000 / 4)
+        self.emit({"type": "response.done"})
+
+
+async def run_call(reply_ms: int, interrupt_ms: int, barge_in: bool):
+    playback.BARGE_IN = barge_in
+    twilio = FakeTwilio()
+    realtime = FakeRealtime(reply_ms)
+
+    @asynccontextmanager
+    async def session():
+        yield realtime
+
+    async def resolve(business_id):
+        return SimpleNamespace(name="Check", allowed_actions={"rag_search": False}, forwarding_number=None)
+
+    llm_realtime.realtime_session = session
+    llm_realtime.resolve_by_id = resolve
+    llm_realtime.get_session_update = lambda business: "{}"
+
+    player = asyncio.create_task(twilio.play())
+    bridge = asyncio.create_task(llm_realtime.handle_realtime_audio(twilio, 1, "MZcheck"))
+
+    # Wait for the caller to have heard interrupt_ms of the reply, then talk over it
+    while twilio.played_ms < interrupt_ms:
+        await asyncio.sleep(0.005)
+    played_at_interrupt = twilio.played_ms
+    twilio.interrupted_at = time.perf_counter()
+    realtime.emit({"type": "input_audio_buffer.speech_started", "audio_start_ms": 0, "item_id": "item_caller_1"})
+
+    # Long enough to hear whatever is left of the reply
+    await asyncio.sleep(reply_ms / 1000 + 0.5)
+
+    stopped_at = time.perf_counter()
+    twilio.inbound.put_nowait({"event": "stop"})
+    await asyncio.wait({bridge}, timeout=2)
+    if bridge.done():
+        twilio.stop_to_end_ms = (time.perf_counter() - stopped_at) * 1000
+    for task in (bridge, player, *realtime._tasks):
+        task.cancel()
+    await asyncio.gather(bridge, player, *realtime._tasks, return_exceptions=True)
+    return twilio, realtime, played_at_interrupt
+
+
+def check(label: str, ok: bool):
+    print(f"   {'✅' if ok else '❌'} {label}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reply-ms", type=int, default=5000)
+    parser.add_argument("--interrupt-ms", type=int, default=800)
+    args = parser.parse_args()
+
+    print(f"\n✋ {args.reply_ms}ms AI reply, caller talks over it after {args.interrupt_ms}ms")
+    twilio, _, _ = asyncio.run(run_call(args.reply_ms, args.interrupt_ms, barge_in=False))
+    print(f"   barge-in off: caller hears {twilio.heard_after}ms more AI audio")
+
+    twilio, realtime, played = asyncio.run(run_call(args.reply_ms, args.interrupt_ms, barge_in=True))
+    stats = playback.stats()
+    print(f"   barge-in on:  caller hears {twilio.heard_after}ms more AI audio, "
+          f"interrupt-to-silence p50 {stats['silence_p50_ms']}ms")
+
+    results = [
+        check("Twilio buffer cleared", twilio.cleared == 1),
+        check(f"no more than one 20ms frame heard after the interruption ({twilio.heard_after}ms)",
+              twilio.heard_after <= 20),
+        check("in-progress response cancelled", realtime.cancelled),
+    ]
+    truncation = realtime.truncations[0] if realtime.truncations else {}
+    results.append(check(
+        f"assistant item truncated at {truncation.get('audio_end_ms')}ms (caller heard {played}ms)",
+        truncation.get("item_id") == "item_ai_1" and played - DELTA_MS <= truncation.get("audio_end_ms", -1) <= played
+    ))
+    results.append(check(f"late deltas dropped ({stats['dropped_deltas']})", stats["dropped_deltas"] >= 1))
+    results.append(check("interrupt-to-silence recorded", stats["interruptions"] == 1 and stats["silence_p50_ms"] is not None))
+    ended = f"{twilio.stop_to_end_ms:.0f}ms" if twilio.stop_to_end_ms is not None else "not within 2s"
+    results.append(check(f"bridge ended after Twilio stop ({ended})", twilio.stop_to_end_ms is not None))
+    print()
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
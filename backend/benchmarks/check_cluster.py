@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Multi-Worker Cluster Check
+Starts two uvicorn workers in separate processes with CLUSTER_MODE=true and
+a shared Redis and SQLite database, then checks across the two workers:
+
+  1. A business created on worker A reaches worker B over pub/sub. Its
+     database row is deleted first, so B can only route the call from the
+     pushed snapshot.
+  2. The per-business call limit holds across workers: with a limit of 2,
+     a third call is sent to the overflow TwiML even though each worker
+     only holds one call itself.
+  3. A stream can land on a different worker than the /call/inbound that
+     reserved it. The slot is released when that stream ends, and a new
+     call is admitted again.
+  4. Knowledge ingested on worker A is found by a search on worker B right
+     away, even though B has cached results for the same question.
+
+Uses a fakeredis TCP server unless --redis-url points at a real Redis.
+
+Usage:
+    python benchmarks/check_cluster.py
+    python benchmarks/check_cluster.py --redis-url redis://localhost:6379/15
+"""
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+import redis
+from websockets.sync.client import connect as ws_connect
+
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), "..")
+PHONE = "+15550107777"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_fake_redis() -> str:
+    from fakeredis import TcpFakeServer
+
+    server = TcpFakeServer(("127.0.0.1", 0), server_type="redis")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    return f"redis://{host}:{port}/0"
+
+
+def start_worker(port: int, env: dict) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_ready(base_url: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(base_url + "/", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{base_url} did not start")
+
+
+def inbound(base_url: str, call_sid: str) -> str:
+    response = httpx.post(base_url + "/call/inbound", data={"To": PHONE, "From": "+15550001111", "CallSid": call_sid})
+    response.raise_for_status()
+    text = response.text
+    if "<Stream" in text:
+        return "stream"
+    if "<Dial>" in text or "<Record" in text:
+        return "overflow"
+    return "unrouted"
+
+
+def check(label: str, ok: bool):
+    print(f"   {'✅' if ok else '❌'} {label}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--redis-url", help="real Redis to use instead of fakeredis (will be flushed)")
+    args = parser.parse_args()
+
+    redis_url = args.redis_url or start_fake_redis()
+    redis.Redis.from_url(redis_url).flushdb()
+
+    workdir = tempfile.mkdtemp(prefix="cluster-check-")
+    db_path = os.path.join(workdir, "app.db")
+    env = {
+        **os.environ,
+        "CLUSTER_MODE": "true",
+        "REDIS_URL": redis_url,
+        "DATABASE_URL": f"sqlite:///{db_path}",
+        "BUSINESSES_DIR": os.path.join(workdir, "businesses"),
+        "MAX_CALLS_PER_BUSINESS": "2",
+        "CALL_OVERFLOW_ACTION": "voicemail",
+        "REALTIME_POOL_SIZE": "0",
+        "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "cluster-check"),
+        # Realtime connections fail fast, so streams end right after they start
+        "OPENAI_BASE_URL": "http://127.0.0.1:9/v1",
+        "TWILIO_ACCOUNT_SID": "ACcluster",
+        "TWILIO_AUTH_TOKEN": "cluster",
+        "API_URL": "http://127.0.0.1",
+        "LOG_LEVEL": "WARNING",
+        # Knowledge stays in-process: no Weaviate or embedding API needed
+        "VECTOR_STORE": "local",
+        "VECTOR_STORE_DIR": os.path.join(workdir, "vectors"),
+        "EMBEDDING_PROVIDER": "hashing",
+    }
+
+    ports = [free_port(), free_port()]
+    workers = [start_worker(port, env) for port in ports]
+    worker_a, worker_b = (f"http://127.0.0.1:{port}" for port in ports)
+    results = []
+
+    try:
+        for base_url in (worker_a, worker_b):
+            wait_ready(base_url)
+        print(f"\n🌐 Two workers on ports {ports[0]} and {ports[1]}, Redis {redis_url}")
+
+        # 1. Config change propagates over pub/sub
+        business = httpx.post(worker_a + "/business/create", json={"name": "Cluster Dental", "phone_number": PHONE}).json()
+        time.sleep(1.0)
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("DELETE FROM businesses WHERE id = ?", (business["id"],))
+        results.append(check("business created on A routes on B without a DB row", inbound(worker_b, "CA-probe") == "stream"))
+
+        # Probe reservation would count against the limit; let the test start clean
+        redis.Redis.from_url(redis_url).delete("rx:calls", f"rx:calls:biz:{business['id']}", "rx:call:CA-probe")
+
+        # 2. Global per-business limit
+        first = inbound(worker_a, "CA1")
+        second = inbound(worker_b, "CA2")
+        third = inbound(worker_a, "CA3")
+        results.append(check(f"limit 2 across workers: {first}, {second}, {third}", (first, second, third) == ("stream", "stream", "overflow")))
+
+        stats = httpx.get(worker_b + "/call/stats").json()
+        results.append(check(f"cluster-wide count is {stats['cluster'].get('calls')} (worker B alone reserved {stats['reserved_calls']})", stats["cluster"].get("calls") == 2))
+
+        # 3. Stream for CA1 (reserved on A) lands on B, then ends
+        with ws_connect(f"ws://127.0.0.1:{ports[1]}/call/stream") as ws:
+            ws.send(json.dumps({
+                "event": "start",
+                "start": {"streamSid": "MZ1", "callSid": "CA1", "customParameters": {"business_id": str(business["id"])}},
+            }))
+            try:
+                while True:
+                    ws.recv(timeout=10)
+            except Exception:
+                pass
+        time.sleep(0.5)
+        results.append(check("CA1 slot released after its stream ended on the other worker", inbound(worker_a, "CA4") == "stream"))
+
+        # 4. Knowledge changes reach the other worker's search caches
+        knowledge = httpx.post(worker_a + "/business/create", json={"name": "Cluster Parking"}).json()
+
+        def ingest(text):
+            httpx.post(worker_a + "/rag/ingest", json={"business_id": knowledge["id"], "text": text}, timeout=30).raise_for_status()
+
+        def search_b():
+            response = httpx.post(worker_b + "/rag/search", json={"business_id": knowledge["id"], "query": "hours and parking"}, timeout=30)
+            return " ".join(result["text"] for result in response.json()["results"])
+
+        ingest("Our hours are nine to five on weekdays.")
+        search_b()
+        ingest("Parking is free behind the building.")
+        time.sleep(0.5)
+        results.append(check("knowledge ingested on A is found on B despite B's cached results", "Parking" in search_b()))
+    finally:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.wait(timeout=10)
+
+    print()
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
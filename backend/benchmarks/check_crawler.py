@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Website Crawler Check
+Runs app/services/crawler.py against a local fixture site served by
+http.server and checks:
+
+  1. The crawled page set: same-site links followed to the depth limit,
+     sitemap-only pages found, off-site, nofollow, non-HTML and
+     robots.txt-disallowed URLs left alone.
+  2. Pages are fetched concurrently and yielded as they arrive.
+  3. A re-crawl with the stored validators gets 304s for every page,
+     downloads no page bodies, and still follows the remembered links.
+  4. After one page changes, only that page is downloaded again.
+
+Usage:
+    python benchmarks/check_crawler.py
+"""
+import argparse
+import hashlib
+import os
+import sys
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.services import crawler
+
+
+RESPONSE_DELAY = 0.1
+LAST_MODIFIED = formatdate(1_700_000_000, usegmt=True)
+
+
+def page(title: str, *links: str) -> str:
+    anchors = "".join(f'<li><a href="{href}">{href}</a></li>' for href in links)
+    return (
+        f"<html><head><title>{title}</title><script>var x = 1;</script></head>"
+        f"<body><h1>{title}</h1><p>Welcome to the {title} page.</p><ul>{anchors}</ul></body></html>"
+    )
+
+
+SITE = {
+    "/": page(
+        "Home", "/menu", "/services#top", "/private/secret", "http://other.example/offsite",
+        "/logo.png", "mailto:hello@example.com", "/menu?utm=x",
+    ) + '<a rel="nofollow" href="/hidden">hidden</a>',
+    "/menu": page("Menu", "/faq", "/services", "/"),
+    "/services": page("Services", "/deep1"),
+    "/deep1": page("Deep 1", "/deep2"),
+    "/deep2": page("Deep 2", "/deep3"),
+    "/deep3": page("Deep 3", "/deep4"),
+    "/deep4": page("Deep 4"),
+    "/faq": page("FAQ"),
+    "/orphan": page("Orphan"),
+    "/hidden": page("Hidden"),
+    "/private/secret": page("Secret"),
+    "/menu?utm=x": page("Menu (tracking)"),
+}
+
+
+class FixtureState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.bodies = []        # paths answered with a full 200 page
+        self.not_modified = []  # paths answered with 304
+
+
+def make_handler(state: FixtureState, base_url: callable):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body=b"", content_type="text/html; charset=utf-8", headers=None):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/robots.txt":
+                body = f"User-agent: *\nDisallow: /private\nSitemap: {base_url()}/sitemap.xml\n"
+                return self._send(200, body.encode(), "text/plain")
+            if self.path == "/sitemap.xml":
+                body = (
+                    '<?xml version="1.0" encoding="UTF-8"?>'
+                    '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                    f"<url><loc>{base_url()}/</loc></url><url><loc>{base_url()}/orphan</loc></url>"
+                    "</urlset>"
+                )
+                return self._send(200, body.encode(), "application/xml")
+            if self.path == "/logo.png":
+                return self._send(200, b"\x89PNG", "image/png")
+            if self.path not in SITE:
+                return self._send(404, b"not found")
+
+            with state.lock:
+                state.in_flight += 1
+                state.max_in_flight = max(state.max_in_flight, state.in_flight)
+            try:
+                time.sleep(RESPONSE_DELAY)
+                body = SITE[self.path].encode()
+                etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    with state.lock:
+                        state.not_modified.append(self.path)
+                    return self._send(304, headers={"ETag": etag})
+                with state.lock:
+                    state.bodies.append(self.path)
+                self._send(200, body, headers={"ETag": etag, "Last-Modified": LAST_MODIFIED})
+            finally:
+                with state.lock:
+                    state.in_flight -= 1
+
+    return Handler
+
+
+def check(label: str, ok: bool):
+    print(f"   {'✅' if ok else '❌'} {label}")
+    return ok
+
+
+def crawl(start_url: str, validators: dict = None, **options):
+    started = time.perf_counter()
+    first_at = None
+    pages = []
+    for crawled in crawler.iter_site_pages(start_url, validators=validators, **options):
+        if first_at is None:
+            first_at = time.perf_counter() - started
+        pages.append(crawled)
+    return pages, first_at, time.perf_counter() - started
+
+
+def paths(pages: list, base_url: str, status: str = None) -> set:
+    return {p.url[len(base_url):] or "/" for p in pages if status is None or p.status == status}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--max-depth", type=int, default=3)
+    args = parser.parse_args()
+
+    state = FixtureState()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), None)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    server.RequestHandlerClass = make_handler(state, lambda: base_url)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    options = {"concurrency": args.concurrency, "max_depth": args.max_depth}
+    results = []
+    try:
+        print(f"\n🌐 Fixture site at {base_url} ({RESPONSE_DELAY * 1000:.0f} ms per page)")
+
+        # 1. Page set
+        pages, first_at, total = crawl(base_url + "/", **options)
+        expected = {"/", "/menu", "/services", "/faq", "/orphan", "/deep1", "/deep2", "/menu?utm=x"}
+        got = paths(pages, base_url, crawler.OK)
+        results.append(check(f"crawled {sorted(got)}", got == expected))
+        results.append(check("robots.txt, nofollow, off-site and depth limit respected",
+                             not got & {"/private/secret", "/hidden", "/deep3", "/deep4"}))
+        home = next(p for p in pages if p.url == base_url + "/")
+        results.append(check("page text keeps headings, drops scripts",
+                             home.text.startswith("# Home") and "var x" not in home.text))
+
+        # 2. Concurrency and streaming
+        max_in_flight = state.max_in_flight
+        _, _, sequential = crawl(base_url + "/", **{**options, "concurrency": 1})
+        results.append(check(f"{len(pages)} pages in {total * 1000:.0f} ms vs {sequential * 1000:.0f} ms one at a time, "
+                             f"up to {max_in_flight} requests in flight", max_in_flight > 1 and total < sequential * 0.75))
+        results.append(check(f"first page yielded after {first_at * 1000:.0f} ms", first_at < total / 2))
+
+        # 3. Conditional re-crawl
+        validators = {
+            p.url: {"etag": p.etag, "last_modified": p.last_modified, "links": p.links}
+            for p in pages if p.status == crawler.OK
+        }
+        state.bodies.clear()
+        pages, _, _ = crawl(base_url + "/", validators, **options)
+        results.append(check(f"re-crawl: {len(paths(pages, base_url, crawler.NOT_MODIFIED))} not modified, "
+                             f"{len(state.bodies)} bodies downloaded",
+                             paths(pages, base_url, crawler.NOT_MODIFIED) == expected and not state.bodies))
+
+        # 4. One page changes
+        SITE["/faq"] = page("FAQ", "/orphan") + "<p>We now open on Saturdays.</p>"
+        state.bodies.clear()
+        pages, _, _ = crawl(base_url + "/", validators, **options)
+        changed = next(p for p in pages if p.url == base_url + "/faq")
+        results.append(check(f"after an edit only {state.bodies} is downloaded",
+                             state.bodies == ["/faq"] and "Saturdays" in changed.text))
+    finally:
+        server.shutdown()
+
+    print()
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Inbound VAD Check
+Feeds call audio through app/services/inbound_vad.py frame by frame, the
+way the bridge does, and checks on each fixture:
+
+  1. every frame at or above the threshold is forwarded
+  2. after the caller stops talking, at least the server VAD's
+     silence_duration_ms of silence is forwarded, so OpenAI still ends
+     the turn
+  3. the INBOUND_VAD_PREFIX_MS before speech that follows suppressed
+     silence is forwarded ahead of it
+  4. forwarded frames keep their order
+and reports how much of the call was suppressed.
+
+Fixtures are 8kHz μ-law call recordings: raw .ulaw (Twilio's media
+format) or 16-bit PCM .wav files, passed with --fixture. Without any, a
+set of generated calls is used. They contain voiced speech with
+syllable envelopes and soft onsets, pauses within a turn, long listening
+silences and low-level line noise. For the generated calls, every frame
+labelled as speech is also checked to be forwarded.
+
+Usage:
+    python benchmarks/check_inbound_vad.py
+    python benchmarks/check_inbound_vad.py --fixture call1.ulaw --fixture call2.wav
+"""
+import argparse
+import base64
+import os
+import sys
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("OPENAI_API_KEY", "check")
+
+from app.services import inbound_vad
+
+
+RATE = 8000
+FRAME = inbound_vad.FRAME_BYTES
+SERVER_SILENCE_MS = inbound_vad.BASE_SESSION["turn_detection"]["silence_duration_ms"]
+
+
+def ulaw_encode(samples: np.ndarray) -> bytes:
+    """16-bit linear -> G.711 μ-law"""
+    x = np.clip(samples.astype(np.int32), -32635, 32635)
+    sign = (x < 0).astype(np.int32) << 7
+    magnitude = np.abs(x) + 0x84
+    exponent = np.clip(np.floor(np.log2(magnitude)).astype(np.int32) - 7, 0, 7)
+    mantissa = (magnitude >> (exponent + 3)) & 0x0F
+    return (~(sign | (exponent << 4) | mantissa) & 0xFF).astype(np.uint8).tobytes()
+
+
+def make_call(seed: int, seconds: float = 60.0):
+    """Generated call audio (μ-law) and a speech label per 20ms frame"""
+    rng = np.random.default_rng(seed)
+    total = int(seconds * RATE)
+    signal = rng.normal(0, 32768 * 10 ** (-62 / 20), total)    # line noise, about -62 dBFS
+    speech = np.zeros(total, dtype=bool)
+
+    position = int(rng.uniform(1.0, 2.0) * RATE)
+    while position < total - RATE:
+        # One turn: a few phrases separated by short pauses
+        for _ in range(rng.integers(1, 4)):
+            if position >= total - RATE // 10:
+                break
+            length = int(rng.uniform(0.6, 2.5) * RATE)
+            end = min(position + length, total)
+            t = np.arange(end - position) / RATE
+            f0 = rng.uniform(100, 220)
+            voiced = sum(np.sin(2 * np.pi * f0 * k * t + rng.uniform(0, 6.3)) / k for k in range(1, 8))
+            syllables = 0.55 + 0.45 * np.sin(2 * np.pi * rng.uniform(3, 5) * t) ** 2
+            # Soft onset and release, like a real word
+            ramp = np.minimum(1.0, np.minimum(t, t[-1] - t) / 0.06)
+            level = 32768 * 10 ** (rng.uniform(-26, -16) / 20) / 1.7
+            signal[position:end] += level * voiced * syllables * ramp
+            speech[position:end] = True
+            position = end + int(rng.uniform(0.15, 0.5) * RATE)
+        # The AI answers while the caller listens
+        position += int(rng.uniform(2.5, 8.0) * RATE)
+
+    audio = ulaw_encode(signal)
+    frames = len(audio) // FRAME
+    labels = speech[:frames * FRAME].reshape(frames, FRAME).mean(axis=1) > 0.5
+    return audio[:frames * FRAME], labels
+
+
+def load_fixture(path: str) -> bytes:
+    if path.lower().endswith(".wav"):
+        with wave.open(path) as f:
+            if f.getframerate() != RATE or f.getsampwidth() != 2:
+                raise ValueError(f"{path}: expected 8kHz 16-bit PCM")
+            samples = np.frombuffer(f.readframes(f.getnframes()), dtype="<i2")
+            samples = samples.reshape(-1, f.getnchannels())[:, 0]
+        audio = ulaw_encode(samples)
+    else:
+        with open(path, "rb") as f:
+            audio = f.read()
+    return audio[:len(audio) - len(audio) % FRAME]
+
+
+def run_vad(audio: bytes):
+    """Forwarded frame indices, in the order the bridge would send them"""
+    vad = inbound_vad.InboundVad()
+    forwarded, held = [], []
+    for i in range(len(audio) // FRAME):
+        out = vad.process(base64.b64encode(audio[i * FRAME:(i + 1) * FRAME]).decode())
+        if out:
+            # The returned payloads are the newest held frames, then this one
+            forwarded += held[len(held) - (len(out) - 1):] if len(out) > 1 else []
+            forwarded.append(i)
+            held = []
+        else:
+            held.append(i)
+    vad.close()
+    return forwarded, vad
+
+
+def check(label: str, ok: bool):
+    print(f"   {'✅' if ok else '❌'} {label}")
+    return ok
+
+
+def check_fixture(name: str, audio: bytes, labels=None) -> list:
+    forwarded, vad = run_vad(audio)
+    sent = np.zeros(len(audio) // FRAME, dtype=bool)
+    sent[forwarded] = True
+    loud = inbound_vad.frame_levels(audio) >= vad.threshold_db
+    frame_ms = FRAME // inbound_vad.ULAW_BYTES_PER_MS
+
+    print(f"\n🎧 {name}: {len(sent) * frame_ms / 1000:.0f}s, {vad.suppressed} of {vad.frames} frames "
+          f"suppressed ({100 * vad.suppressed / max(vad.frames, 1):.0f}%)")
+    results = [check("every frame above the threshold forwarded", bool(sent[loud].all()))]
+    if labels is not None:
+        results.append(check(f"every labelled speech frame forwarded ({int(labels.sum())})", bool(sent[labels].all())))
+
+    # Silence after each speech run, up to the server's silence_duration_ms
+    tail = SERVER_SILENCE_MS // frame_ms
+    ends = np.flatnonzero(loud[:-1] & ~loud[1:]) + 1
+    results.append(check(f"{SERVER_SILENCE_MS}ms of silence forwarded after each of {len(ends)} speech ends",
+                         all(sent[end:end + tail].all() for end in ends)))
+
+    prefix = inbound_vad.INBOUND_VAD_PREFIX_MS // frame_ms
+    onsets = [i for i in np.flatnonzero(~loud[:-1] & loud[1:]) + 1 if not sent[max(0, i - prefix - 1)]]
+    results.append(check(f"{inbound_vad.INBOUND_VAD_PREFIX_MS}ms prefix sent before {len(onsets)} onsets after suppressed silence",
+                         all(sent[max(0, i - prefix):i].all() for i in onsets)))
+    results.append(check("forwarded frames in order, none twice",
+                         forwarded == sorted(set(forwarded))))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixture", action="append", default=[], help="8kHz μ-law .ulaw or 16-bit PCM .wav")
+    parser.add_argument("--calls", type=int, default=3, help="generated calls when no fixture is given")
+    args = parser.parse_args()
+
+    print(f"\n🔇 threshold {inbound_vad.INBOUND_VAD_THRESHOLD_DB:g} dBFS, "
+          f"hangover {inbound_vad.INBOUND_VAD_HANGOVER_MS}ms, prefix {inbound_vad.INBOUND_VAD_PREFIX_MS}ms")
+    results = []
+    if args.fixture:
+        for path in args.fixture:
+            results += check_fixture(os.path.basename(path), load_fixture(path))
+    else:
+        for seed in range(args.calls):
+            audio, labels = make_call(seed)
+            results += check_fixture(f"generated call {seed}", audio, labels)
+    print()
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Retrieval Evaluation
+Offline recall@k / MRR / latency for the retrieval modes in
+app/services/hybrid_search.py on a labeled query set:
+
+  vector        cosine top-k (what Weaviate near_vector returns)
+  lexical       BM25 over the same chunks
+  rrf / alpha   both fused, without and with the local rerank
+
+The default dataset (benchmarks/data/retrieval_eval.json) is a small
+dental-practice + bakery knowledge base with caller-style questions,
+including exact lookups (phone numbers, prices, addresses, item codes).
+--distractors pads the corpus with generated filler chunks to see how
+quality and latency hold up at size.
+
+Embeddings (the providers in app/services/embeddings.py):
+  --embeddings hashing   offline stand-in: hashed word + character-trigram
+                         vectors. Runs anywhere, but is itself partly
+                         lexical, so it understates what fusion adds.
+  --embeddings onnx      the local model in LOCAL_EMBEDDING_MODEL_PATH.
+  --embeddings openai    the configured OpenAI model (OPENAI_EMBEDDINGS);
+                         vectors are cached in --cache for offline reruns.
+
+Latency is retrieval only (query embeddings are computed up front).
+
+Usage:
+    python benchmarks/eval_retrieval.py
+    python benchmarks/eval_retrieval.py --embeddings openai --cache /tmp/eval-vectors.npz --distractors 5000
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("OPENAI_API_KEY", "eval")
+
+from app.services import hybrid_search, embeddings
+
+
+DEFAULT_DATASET = os.path.join(os.path.dirname(__file__), "data", "retrieval_eval.json")
+KS = (1, 3, 5)
+
+WORDS = (
+    "appointment service customers schedule available weekdays evenings office team "
+    "treatment consultation payment plans accepted coverage booking pickup delivery "
+    "order menu staff location hours price quote repair warranty membership visit "
+    "open closed holiday weekend parking call book cancel reschedule fee deposit"
+).split()
+STREETS = ("Mission", "Valencia", "Market", "Geary", "Clement", "Irving", "Haight", "Fillmore")
+
+
+def openai_embed(texts: list, cache_path: str = None) -> np.ndarray:
+    provider = embeddings.get_provider("openai")
+
+    cache = {}
+    if cache_path and os.path.exists(cache_path):
+        with np.load(cache_path) as data:
+            cache = {key: data[key] for key in data.files}
+
+    keys = [hashlib.sha1(f"{provider.model}:{text}".encode()).hexdigest() for text in texts]
+    missing = [text for key, text in zip(keys, texts) if key not in cache]
+    if missing:
+        vectors = provider.embed(missing)
+        missing_keys = [key for key in keys if key not in cache]
+        for key, vector in zip(missing_keys, vectors):
+            cache[key] = np.asarray(vector, dtype=np.float32)
+        if cache_path:
+            np.savez(cache_path, **cache)
+
+    vectors = np.stack([cache[key] for key in keys])
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-9)
+
+
+def make_distractors(count: int, seed: int = 3) -> list:
+    """
+    Filler chunks from other businesses: common service words plus prices,
+    phone numbers and times, so exact lookups have numeric noise to beat.
+    """
+    rng = random.Random(seed)
+    noise = [
+        lambda: f"${rng.randint(20, 5000)}",
+        lambda: f"415-555-{rng.randint(0, 9999):04d}",
+        lambda: f"{rng.randint(6, 11)}am to {rng.randint(1, 9)}pm",
+        lambda: f"{rng.randint(1, 9999)} {rng.choice(STREETS)} Street",
+    ]
+    chunks = []
+    for _ in range(count):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(25, 60))]
+        for _ in range(rng.randint(1, 3)):
+            words.insert(rng.randrange(len(words)), rng.choice(noise)())
+        chunks.append(" ".join(words).capitalize() + ".")
+    return chunks
+
+
+def vector_search(doc_vectors: np.ndarray, texts: list, query_vector: np.ndarray, limit: int) -> list:
+    scores = doc_vectors @ query_vector
+    top = np.argpartition(-scores, min(limit, len(scores) - 1))[:limit]
+    top = top[np.argsort(-scores[top])]
+    return [(texts[i], float(scores[i])) for i in top]
+
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dataset", default=DEFAULT_DATASET)
+    parser.add_argument("--embeddings", choices=("hashing", "onnx", "openai"), default="hashing")
+    parser.add_argument("--cache", help="npz file for OpenAI vectors")
+    parser.add_argument("--distractors", type=int, default=0)
+    parser.add_argument("--candidates", type=int, default=20, help="candidates per retriever before fusion")
+    parser.add_argument("--alpha", type=float, default=hybrid_search.RAG_HYBRID_ALPHA)
+    parser.add_argument("--repeat", type=int, default=5, help="timing passes per query")
+    args = parser.parse_args()
+
+    with open(args.dataset) as f:
+        dataset = json.load(f)
+    documents = dataset["documents"]
+    queries = dataset["queries"]
+    text_to_id = {doc["text"]: doc["id"] for doc in documents}
+    texts = [doc["text"] for doc in documents] + make_distractors(args.distractors)
+
+    if args.embeddings == "openai":
+        embed = lambda items: openai_embed(items, args.cache)
+    elif args.embeddings == "onnx":
+        embed = embeddings.get_provider("onnx").embed_array
+    else:
+        embed = embeddings.HashingProvider(512).embed_array
+    started = time.perf_counter()
+    doc_vectors = embed(texts)
+    query_vectors = embed([q["query"] for q in queries])
+    index = hybrid_search.BM25Index(texts)
+    setup_s = time.perf_counter() - started
+
+    limit = max(KS)
+    candidates = args.candidates
+
+    def hybrid(method, use_rerank):
+        def run(query, vector):
+            vector_hits = vector_search(doc_vectors, texts, vector, candidates)
+            lexical_hits = index.search(query, candidates)
+            return hybrid_search.combine(query, vector_hits, lexical_hits, limit, index=index,
+                                         method=method, alpha=args.alpha, use_rerank=use_rerank)
+        return run
+
+    modes = {
+        "vector": lambda query, vector: [t for t, _ in vector_search(doc_vectors, texts, vector, limit)],
+        "lexical": lambda query, vector: [t for t, _ in index.search(query, limit)],
+        "rrf": hybrid("rrf", False),
+        "rrf + rerank": hybrid("rrf", True),
+        f"alpha {args.alpha:g}": hybrid("alpha", False),
+        f"alpha {args.alpha:g} + rerank": hybrid("alpha", True),
+    }
+
+    print(f"\n🔎 {len(documents)} labeled chunks + {args.distractors} distractors, {len(queries)} queries, "
+          f"{args.embeddings} embeddings (setup {setup_s:.1f}s)")
+    print(f"   {'mode':<20}" + "".join(f"  recall@{k}" for k in KS) + "     MRR   p50 ms   p99 ms")
+
+    for name, run in modes.items():
+        recalls = {k: [] for k in KS}
+        reciprocal_ranks = []
+        latencies = []
+        misses = []
+        for query, vector in zip(queries, query_vectors):
+            relevant = set(query["relevant"])
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                results = run(query["query"], vector)
+                latencies.append((time.perf_counter() - start) * 1000)
+            ranked = [text_to_id.get(text) for text in results]
+            for k in KS:
+                recalls[k].append(len(relevant & set(ranked[:k])) / len(relevant))
+            rank = next((i for i, doc_id in enumerate(ranked, start=1) if doc_id in relevant), None)
+            reciprocal_ranks.append(1 / rank if rank else 0.0)
+            if not rank or rank > 3:
+                misses.append(query["query"])
+        print(
+            f"   {name:<20}"
+            + "".join(f"  {statistics.mean(recalls[k]):8.2f}" for k in KS)
+            + f"  {statistics.mean(reciprocal_ranks):6.2f}  {percentile(latencies, 0.5):7.2f}  {percentile(latencies, 0.99):7.2f}"
+        )
+        if misses and os.getenv("EVAL_SHOW_MISSES"):
+            for miss in misses:
+                print(f"      ✗ {miss}")
+    print()
+
+
+if __name__ == "__main__":
+    main()